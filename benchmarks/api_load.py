@@ -0,0 +1,159 @@
+"""
+JSON API サーバー (service/api_server.py) の負荷試験。
+
+一時DBで API サーバーを子プロセスとして起動し（--url 指定時は起動済みのサーバーを使用）、
+N 本のクライアントスレッドが keep-alive 接続で要求を送り続けて、1秒あたりの処理件数と応答時間を表示します。
+要求は「機器詳細」「修理履歴」「部門での機器検索」「マスタ（If-None-Match 付き）」を順に混在させます。
+
+使用例:
+    python benchmarks/api_load.py
+    python benchmarks/api_load.py --clients 20 --seconds 10 --pool-size 8
+    python benchmarks/api_load.py --url http://127.0.0.1:8765 --equipments 5000
+"""
+import argparse
+import http.client
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stress_concurrency import create_db  # noqa: E402
+from models.master_model import MasterModel  # noqa: E402
+
+
+def create_masters(path: str) -> None:
+    """create_db の機器・修理テーブルに、既定値のマスタテーブルを追加する"""
+    conn = sqlite3.connect(path)
+    for table in MasterModel.MASTER_TABLES:
+        conn.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+        rows = MasterModel.DEFAULT_MASTER_DATA.get(table) or [(i, f"{table}{i}") for i in range(1, 21)]
+        conn.executemany(f"INSERT INTO {table} VALUES (?, ?)", rows)
+    conn.execute("CREATE INDEX idx_repair_code ON repair(equipment_code)")
+    conn.commit()
+    conn.close()
+
+
+def wait_for_server(host: str, port: int, timeout: float = 10.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=1)
+            conn.request("GET", "/api/masters")
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("API サーバーが起動しませんでした")
+
+
+def client(host: str, port: int, seconds: float, equipment_count: int, seed: int, results: list) -> None:
+    """1クライアント分の処理: 4種類の要求を時間いっぱい繰り返す"""
+    rnd = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    etags = {}
+    latencies = []
+    counts = {"ok": 0, "not_modified": 0, "errors": 0}
+    deadline = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < deadline:
+        code = f"{rnd.randrange(equipment_count):05d}"
+        kind = i % 4
+        i += 1
+        headers = {}
+        if kind == 0:
+            path = f"/api/equipments/{code}"
+        elif kind == 1:
+            path = f"/api/equipments/{code}/repairs"
+        elif kind == 2:
+            path = f"/api/equipments?department_id={rnd.randint(1, 6)}&limit=100"
+        else:
+            table = rnd.choice(MasterModel.MASTER_TABLES)
+            path = f"/api/masters/{table}"
+            if table in etags:
+                headers["If-None-Match"] = etags[table]
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status == 304:
+                counts["not_modified"] += 1
+            elif response.status in (200, 404):
+                counts["ok"] += 1
+                if kind == 3 and response.getheader("ETag"):
+                    etags[table] = response.getheader("ETag")
+            else:
+                counts["errors"] += 1
+        except (OSError, http.client.HTTPException):
+            counts["errors"] += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    results.append((counts, latencies))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JSON API サーバーの負荷試験")
+    parser.add_argument("--url", help="起動済みサーバーのURL（省略時は一時DBでサーバーを起動）")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--pool-size", type=int, default=4, help="起動するサーバーのDB読み取り同時実行数")
+    parser.add_argument("--equipments", type=int, default=5000)
+    args = parser.parse_args()
+
+    server = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            path = os.path.join(tmp, "api_load.db")
+            create_db(path, args.equipments)
+            create_masters(path)
+            host, port = "127.0.0.1", 18765
+            server = subprocess.Popen(
+                [sys.executable, "-m", "service.api_server", "--db", path,
+                 "--port", str(port), "--pool-size", str(args.pool_size)],
+                cwd=ROOT, stdout=subprocess.DEVNULL,
+            )
+        try:
+            wait_for_server(host, port)
+            results: list = []
+            threads = [
+                threading.Thread(target=client, args=(host, port, args.seconds, args.equipments, seed, results))
+                for seed in range(args.clients)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    ok = sum(c["ok"] for c, _ in results)
+    not_modified = sum(c["not_modified"] for c, _ in results)
+    errors = sum(c["errors"] for c, _ in results)
+    latencies = sorted(x for _, lat in results for x in lat)
+    total = ok + not_modified
+    print(f"clients={args.clients} seconds={args.seconds} pool_size={args.pool_size}")
+    print(f"  処理件数: {total:7d} 件 ({total / args.seconds:8.1f} 件/秒)  うち 304: {not_modified} 件")
+    if latencies:
+        print(f"  応答時間: 中央値 {latencies[len(latencies) // 2] * 1000:.1f} ms / "
+              f"95% {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms")
+    print(f"  エラー: {errors} 件")
+
+
+if __name__ == "__main__":
+    main()
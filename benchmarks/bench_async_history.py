@@ -0,0 +1,97 @@
+"""
+修理履歴の一括取得を、同期版と非同期版 (models.async_models) で比較するベンチマーク。
+
+一時DBに機器・修理データを作成し、M 台分の修理履歴を次の方法で取得して所要時間を表示します。
+  - 同期版: RepairModel.get_history_by_equipment を順番に呼び出す
+  - 非同期版: AsyncDB.gather（AsyncRepairModel.get_histories と同じ処理）で同時実行数を変えながら並行取得する
+
+ネットワーク共有上のDBでは1回の問い合わせごとに往復の待ち時間がかかるため、
+--latency-ms で問い合わせごとの待ち時間を模擬します（0 を指定するとローカルディスクのまま計測）。
+
+使用例:
+    python benchmarks/bench_async_history.py
+    python benchmarks/bench_async_history.py --lookups 2000 --concurrency 1 4 8 16
+    python benchmarks/bench_async_history.py --latency-ms 0
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Any, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.api_load import create_masters  # noqa: E402
+from benchmarks.stress_concurrency import create_db  # noqa: E402
+from models.async_models import AsyncDB  # noqa: E402
+from models.db_manager import DBManager  # noqa: E402
+from models.repair_model import RepairModel  # noqa: E402
+
+
+def add_repairs(path: str, equipment_count: int, repairs: int) -> None:
+    rnd = random.Random(0)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO repair (equipment_code, repairstatuses, request_date, repairtype, vendor, technician, details)"
+        " VALUES (?, ?, ?, ?, ?, 'bench', '詳細')",
+        ((f"{rnd.randrange(equipment_count):05d}", rnd.randint(1, 5),
+          f"20{rnd.randint(15, 24)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+          rnd.randint(1, 5), rnd.randint(1, 20)) for _ in range(repairs)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def make_fetch(latency_ms: float):
+    """問い合わせごとに latency_ms の待ちを加えた履歴取得関数（待ちの間は GIL を解放する）"""
+    if not latency_ms:
+        return RepairModel.get_history_by_equipment
+
+    def fetch(equipment_code: str) -> List[Tuple[Any, ...]]:
+        time.sleep(latency_ms / 1000)
+        return RepairModel.get_history_by_equipment(equipment_code)
+    return fetch
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="修理履歴の一括取得（同期 / 非同期）の比較")
+    parser.add_argument("--equipments", type=int, default=5000)
+    parser.add_argument("--repairs", type=int, default=50000)
+    parser.add_argument("--lookups", type=int, default=1000, help="履歴を取得する機器の台数")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="問い合わせごとに加える待ち時間（ミリ秒）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        DBManager.DB_NAME = os.path.join(tmp, "bench.db")
+        create_db(DBManager.DB_NAME, args.equipments)
+        create_masters(DBManager.DB_NAME)
+        add_repairs(DBManager.DB_NAME, args.equipments, args.repairs)
+        codes = [f"{i:05d}" for i in random.Random(1).sample(range(args.equipments), args.lookups)]
+
+        fetch = make_fetch(args.latency_ms)
+        DBManager.enable_pool()
+        start = time.perf_counter()
+        expected = [fetch(code) for code in codes]
+        sync_time = time.perf_counter() - start
+        print(f"lookups={args.lookups} repairs={args.repairs} latency_ms={args.latency_ms}")
+        print(f"  同期（順番に取得）      : {sync_time:6.2f} 秒 ({args.lookups / sync_time:8.1f} 件/秒)")
+
+        for concurrency in args.concurrency:
+            AsyncDB.configure(concurrency)
+            start = time.perf_counter()
+            result = asyncio.run(AsyncDB.gather(fetch, [(code,) for code in codes]))
+            elapsed = time.perf_counter() - start
+            assert result == expected
+            print(f"  非同期（同時実行 {concurrency:3d}） : {elapsed:6.2f} 秒 ({args.lookups / elapsed:8.1f} 件/秒)"
+                  f"  x{sync_time / elapsed:.2f}")
+        AsyncDB.configure(AsyncDB.MAX_CONCURRENCY)
+        DBManager.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+バックアップ (models/backup_manager.py) の所要時間の計測。
+
+数百MBの一時DB（機器・修理・マスタ＋添付PDFのダミーファイル）を作成し、次を計測します。
+- 単純なファイルコピー（従来の手作業のバックアップに相当。稼働中は壊れたコピーになりうる）
+- BackupManager.backup のコピー・整合性チェック・圧縮の各段階と、圧縮率
+- バックアップ中に別スレッドで検索を続けたときの応答時間（読み取りが妨げられないこと）
+- --writers を指定した場合は、バックアップ中の修理登録の件数と失敗件数
+- BackupManager.verify と restore
+
+使用例:
+    python benchmarks/bench_backup.py
+    python benchmarks/bench_backup.py --size-mb 500 --attachments 2000 --writers 1
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.api_load import create_masters  # noqa: E402
+from benchmarks.stress_concurrency import create_db  # noqa: E402
+from models.backup_manager import BackupManager  # noqa: E402
+from models.db_manager import DBManager  # noqa: E402
+from models.equipment_model import EquipmentModel  # noqa: E402
+from models.repair_model import RepairModel  # noqa: E402
+
+WORDS = ["電源", "基板", "交換", "点検", "異音", "校正", "部品", "取寄せ", "モーター", "センサー",
+         "ファン", "清掃", "動作確認", "ヒーター", "温度", "表示", "エラー", "ランプ", "メーカー", "修理完了"]
+
+
+def fill_repairs(path: str, size_mb: int, equipment_count: int) -> int:
+    """DBファイルが size_mb に達するまで修理データを追加し、追加件数を返す"""
+    rnd = random.Random(0)
+    conn = sqlite3.connect(path)
+    total = 0
+    while os.path.getsize(path) < size_mb * 1024 * 1024:
+        rows = [
+            (f"{rnd.randrange(equipment_count):05d}", rnd.randint(1, 4), f"20{rnd.randint(15, 25)}-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}",
+             rnd.randint(1, 3), rnd.randint(1, 10), f"技術者{rnd.randint(1, 50)}",
+             "、".join(rnd.choice(WORDS) for _ in range(rnd.randint(40, 120))), f"見積番号 {rnd.getrandbits(32):08x}")
+            for _ in range(20000)
+        ]
+        conn.executemany(
+            "INSERT INTO repair (equipment_code, repairstatuses, request_date, repairtype, vendor, technician, details, remarks)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+        total += len(rows)
+    conn.close()
+    return total
+
+
+def create_attachments(root: str, count: int) -> None:
+    """attached_pdfs/<修理ID>/<ファイル名>.pdf と同じ構成のダミーファイルを作成する"""
+    rnd = random.Random(1)
+    for i in range(count):
+        folder = os.path.join(root, str(rnd.randint(1, count * 2)))
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"見積書_{i}.pdf"), "wb") as f:
+            f.write(b"%PDF-1.4\n" + os.urandom(rnd.randint(1024, 8192)))
+
+
+def reader(stop: threading.Event, latencies: list) -> None:
+    rnd = random.Random(2)
+    while not stop.is_set():
+        start = time.perf_counter()
+        EquipmentModel.search_equipments(department_id=rnd.randint(1, 6))
+        RepairModel.get_history_by_equipment(f"{rnd.randrange(1000):05d}")
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.01)
+
+
+def writer(stop: threading.Event, counts: dict) -> None:
+    while not stop.is_set():
+        if RepairModel.add_repair_record({
+            "equipment_code": "00001", "repairstatuses": 1, "request_date": "2025-01-01",
+            "repairtype": 1, "technician": "bench", "details": "バックアップ中の登録",
+        }):
+            counts["ok"] += 1
+        else:
+            counts["failed"] += 1
+        time.sleep(0.2)
+
+
+def describe(label: str, latencies: list) -> str:
+    if not latencies:
+        return f"{label}: 計測なし"
+    latencies = sorted(latencies)
+    return (f"{label}: {len(latencies)} 回 / 中央値 {latencies[len(latencies) // 2] * 1000:.1f} ms / "
+            f"最大 {latencies[-1] * 1000:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="オンラインバックアップの所要時間の計測")
+    parser.add_argument("--size-mb", type=int, default=300)
+    parser.add_argument("--equipments", type=int, default=20000)
+    parser.add_argument("--attachments", type=int, default=1000)
+    parser.add_argument("--writers", type=int, default=0, help="バックアップ中に修理登録を続けるスレッド数")
+    parser.add_argument("--pages-per-step", type=int, default=BackupManager.PAGES_PER_STEP)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_backup.db")
+        start = time.perf_counter()
+        create_db(path, args.equipments)
+        create_masters(path)
+        repairs = fill_repairs(path, args.size_mb, args.equipments)
+        create_attachments(os.path.join(tmp, "attached_pdfs"), args.attachments)
+        print(f"DB作成: {os.path.getsize(path) / 1024 / 1024:.0f} MB（修理 {repairs} 件）・"
+              f"添付 {args.attachments} 件 / {time.perf_counter() - start:.1f} 秒")
+
+        DBManager.DB_NAME = path
+        BackupManager.ATTACHMENT_DIR = os.path.join(tmp, "attached_pdfs")
+        BackupManager.PAGES_PER_STEP = args.pages_per_step
+        backup_dir = os.path.join(tmp, "backups")
+
+        start = time.perf_counter()
+        shutil.copyfile(path, os.path.join(tmp, "plain_copy.db"))
+        print(f"単純なファイルコピー: {time.perf_counter() - start:.2f} 秒")
+        os.remove(os.path.join(tmp, "plain_copy.db"))
+
+        # 検索のみの応答時間（比較用）
+        stop = threading.Event()
+        idle: list = []
+        t = threading.Thread(target=reader, args=(stop, idle))
+        t.start()
+        time.sleep(2)
+        stop.set()
+        t.join()
+
+        for compress in (False, True):
+            stop = threading.Event()
+            busy: list = []
+            counts = {"ok": 0, "failed": 0}
+            threads = [threading.Thread(target=reader, args=(stop, busy))]
+            threads += [threading.Thread(target=writer, args=(stop, counts)) for _ in range(args.writers)]
+            for t in threads:
+                t.start()
+            start = time.perf_counter()
+            manifest = BackupManager.backup(backup_dir, compress=compress)
+            elapsed = time.perf_counter() - start
+            stop.set()
+            for t in threads:
+                t.join()
+
+            timings = manifest["timings"]
+            print(f"\nBackupManager.backup (compress={compress}): 合計 {elapsed:.2f} 秒")
+            print(f"  コピー {timings['copy_sec']:.2f} 秒 / 整合性チェック {timings['verify_sec']:.2f} 秒 / "
+                  f"{'圧縮' if compress else 'ハッシュ'} {timings['compress_sec']:.2f} 秒 / "
+                  f"添付一覧 {manifest['attachments']['count']} 件")
+            print(f"  {manifest['db_bytes'] / 1024 / 1024:.0f} MB -> {manifest['file_bytes'] / 1024 / 1024:.0f} MB "
+                  f"({manifest['file_bytes'] / manifest['db_bytes'] * 100:.0f}%)")
+            print("  " + describe("検索の応答時間（バックアップなし）", idle))
+            print("  " + describe("検索の応答時間（バックアップ中）", busy))
+            if args.writers:
+                print(f"  バックアップ中の修理登録: 成功 {counts['ok']} 件 / 失敗 {counts['failed']} 件")
+
+        start = time.perf_counter()
+        BackupManager.verify(manifest["path"])
+        print(f"\nBackupManager.verify (展開・SHA-256・整合性チェック): {time.perf_counter() - start:.2f} 秒")
+
+        start = time.perf_counter()
+        BackupManager.restore(manifest["path"])
+        print(f"BackupManager.restore (復元前の退避を含む): {time.perf_counter() - start:.2f} 秒")
+
+
+if __name__ == "__main__":
+    main()
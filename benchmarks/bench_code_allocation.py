@@ -0,0 +1,170 @@
+"""
+器材番号の採番 (models/equipment_code_allocator.py) の計測。
+
+分類ごとに器材番号（分類コード2桁 + 連番3桁）を登録し、一部を削除して空き番号を作った一時DBで、次を比較します。
+- 従来の MAX(equipment_code) + 1（削除で空いた番号は再利用しない。分類ごとの範囲も考慮しない）
+- SQL で空き番号を探す方法（番号 + 1 が存在しない最小の番号を NOT EXISTS で探す）
+- ビットマップ (EquipmentCodeAllocator.peek) による空き番号の検索
+さらに複数プロセスから同じ分類に同時に採番・登録し、処理件数・失敗件数と番号の重複が無いことを確認します。
+
+equipment_code の型は、db_create.py と同じ INTEGER（"01001" が整数 1001 として保存される）と TEXT の両方で
+実行します（--code-type で片方だけにできます）。INTEGER では、登録済みの番号を避けて採番できることも確認します。
+
+使用例:
+    python benchmarks/bench_code_allocation.py
+    python benchmarks/bench_code_allocation.py --categories 20 --fill 900 --clients 8 --per-client 50
+    python benchmarks/bench_code_allocation.py --code-type INTEGER
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stress_concurrency import create_db  # noqa: E402
+from models.audit_log import AuditLog  # noqa: E402
+from models.db_manager import DBManager  # noqa: E402
+from models.equipment_code_allocator import EquipmentCodeAllocator  # noqa: E402
+from models.equipment_model import EquipmentModel  # noqa: E402
+
+
+def fill(path: str, categories: int, count: int, hole_ratio: float) -> None:
+    """分類ごとに count 件登録し、hole_ratio の割合で削除して空き番号を作る"""
+    rnd = random.Random(0)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO equipment (equipment_code, name, categorie_id) VALUES (?, ?, ?)",
+        ((EquipmentCodeAllocator.format_code(cat, serial), f"機器{cat}-{serial}", cat)
+         for cat in range(1, categories + 1) for serial in range(1, count + 1)),
+    )
+    ids = [row[0] for row in conn.execute("SELECT id FROM equipment")]
+    conn.executemany("DELETE FROM equipment WHERE id = ?",
+                     ((i,) for i in rnd.sample(ids, int(len(ids) * hole_ratio))))
+    conn.commit()
+    conn.close()
+
+
+def timed(func, repeat: int) -> float:
+    """1回あたりの所要時間 (ms)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def check_schema(path: str, prefix: int) -> None:
+    """採番した番号が登録済みの番号と重ならず、削除した番号を再利用することを確認する"""
+    conn = sqlite3.connect(path)
+    used = {int(row[0]) for row in conn.execute("SELECT equipment_code FROM equipment")}
+    conn.close()
+    code = EquipmentModel.add_equipment({"categorie_id": prefix, "name": "型の確認"})
+    assert code is not None, "登録に失敗しました"
+    assert int(code) not in used, f"登録済みの番号を採番しました: {code}"
+    expected = min(serial for serial in range(1, EquipmentCodeAllocator.MAX_SERIAL + 1)
+                   if prefix * 1000 + serial not in used)
+    assert code == EquipmentCodeAllocator.format_code(prefix, expected), f"最小の空き番号ではありません: {code}"
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM equipment WHERE equipment_code = ?", (code,))
+    conn.commit()
+    conn.close()
+    assert EquipmentCodeAllocator.peek(prefix) == code, "削除した番号が再利用されません"
+
+
+def max_scan(conn: sqlite3.Connection, prefix: int) -> str:
+    max_code = conn.execute("SELECT MAX(equipment_code) FROM equipment").fetchone()[0]
+    return f"{int(max_code) + 1:05d}"
+
+
+def gap_scan(conn: sqlite3.Connection, prefix: int) -> str:
+    low, high = EquipmentCodeAllocator.format_code(prefix, 0), EquipmentCodeAllocator.format_code(prefix, 999)
+    row = conn.execute(
+        "SELECT MIN(CAST(e.equipment_code AS INTEGER) + 1) FROM equipment e"
+        " WHERE e.equipment_code BETWEEN ? AND ? AND NOT EXISTS ("
+        "  SELECT 1 FROM equipment n WHERE n.equipment_code = printf('%05d', CAST(e.equipment_code AS INTEGER) + 1))",
+        (low, high),
+    ).fetchone()
+    return f"{row[0]:05d}" if row[0] is not None else EquipmentCodeAllocator.format_code(prefix, 1)
+
+
+def client(db_path: str, prefix: int, count: int, results) -> None:
+    """1端末分の処理: 同じ分類に count 件登録する"""
+    DBManager.DB_NAME = db_path
+    codes, errors = [], 0
+    for i in range(count):
+        code = EquipmentModel.add_equipment({"categorie_id": prefix, "name": f"同時登録{os.getpid()}-{i}"})
+        if code is None:
+            errors += 1
+        else:
+            codes.append(code)
+    results.put((codes, errors))
+
+
+def run(args: argparse.Namespace, code_type: str) -> None:
+    print(f"equipment_code {code_type}:")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "codes.db")
+        create_db(path, 0, code_type)
+        fill(path, args.categories, args.fill, args.holes)
+        DBManager.DB_NAME = path
+
+        start = time.perf_counter()
+        with DBManager.get_write_cursor() as cursor:
+            EquipmentCodeAllocator.install(cursor)
+        print(f"  ビットマップの作成: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        conn = sqlite3.connect(path)
+        prefix = max(1, args.categories // 2)
+        print(f"  分類 {prefix:02d} の次の番号 ({args.repeat} 回の平均):")
+        for label, func in (
+            ("MAX(equipment_code) + 1", lambda: max_scan(conn, prefix)),
+            ("SQL の空き番号検索", lambda: gap_scan(conn, prefix)),
+            ("ビットマップ (peek)", lambda: EquipmentCodeAllocator.peek(prefix)),
+        ):
+            print(f"    {label:24s} {func():>6s}  {timed(func, args.repeat):8.3f} ms")
+        conn.close()
+
+        check_schema(path, prefix)
+        print("  登録済みの番号を避け、削除した番号を再利用することを確認しました")
+
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=client, args=(path, prefix, args.per_client, results))
+                 for _ in range(args.clients)]
+        start = time.perf_counter()
+        for p in procs:
+            p.start()
+        totals = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        codes = [code for t in totals for code in t[0]]
+        errors = sum(t[1] for t in totals)
+        print(f"  同時登録: {args.clients} プロセス x {args.per_client} 件 -> 登録 {len(codes)} 件"
+              f" ({len(codes) / elapsed:.1f} 件/秒), 失敗 {errors} 件, 重複 {len(codes) - len(set(codes))} 件")
+        print(f"  分類 {prefix:02d} の使用状況 (使用中, 空き): {EquipmentCodeAllocator.usage().get(prefix)}")
+        # check_schema で記録した監査ログを、一時DBを消す前に書き込む
+        AuditLog.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="器材番号の採番の計測")
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--fill", type=int, default=900, help="分類ごとの登録件数（999 まで）")
+    parser.add_argument("--holes", type=float, default=0.05, help="削除して空き番号にする割合")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--per-client", type=int, default=20)
+    parser.add_argument("--code-type", choices=("INTEGER", "TEXT"), help="equipment_code の型（既定は両方）")
+    args = parser.parse_args()
+
+    for code_type in [args.code_type] if args.code_type else ["INTEGER", "TEXT"]:
+        run(args, code_type)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+重複登録の検出 (models/duplicate_detector.py) の所要時間と検出率の計測。
+
+一時DBに機器を作成し、その一部を「全角/半角・空白・カタカナ/ひらがな・型番の区切り」を変えて重複登録したうえで、
+- 全件の照合（DuplicateDetector.scan(full=True)）の所要時間・比較した組の数・検出できた重複の割合
+- 新しく追加した機器だけの差分の照合の所要時間と検出率
+を表示します。総当たりで比較した場合の組の数も参考に表示します。
+
+equipment_code は db_create.py と同じ INTEGER で作成し、重複の一部には修理履歴を登録して、
+修理履歴の多い機器が「残す機器」に選ばれる割合も表示します（repair.equipment_code は TEXT）。
+
+使用例:
+    python benchmarks/bench_duplicates.py
+    python benchmarks/bench_duplicates.py --equipments 100000 --dup-ratio 0.02 --new 500
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stress_concurrency import create_db  # noqa: E402
+from models.change_log import ChangeLog  # noqa: E402
+from models.db_manager import DBManager  # noqa: E402
+from models.duplicate_detector import DuplicateDetector  # noqa: E402
+
+NAMES = ["デジタルマイクロスコープ", "遠心分離機", "インキュベーター", "オートクレーブ", "パルスオキシメーター",
+         "シリンジポンプ", "輸液ポンプ", "超音波診断装置", "心電計", "血球計数装置", "生化学分析装置",
+         "クリーンベンチ", "ディープフリーザー", "ホモジナイザー", "分光光度計", "電子天秤", "恒温槽", "pHメーター"]
+
+_HIRAGANA = {code: code + 0x60 for code in range(ord("ぁ"), ord("ゖ") + 1)}
+
+
+def variant(text: str, rnd: random.Random) -> str:
+    """入力の揺れ（長音の代わりのハイフン・全角英数・空白・ひらがな・長音の有無）を加えた文字列"""
+    choice = rnd.randrange(5)
+    if choice == 0:
+        return text.replace("ー", "-") + " "
+    if choice == 1:
+        return "".join(chr(ord(ch) + 0xFEE0) if "!" <= ch <= "~" else ch for ch in text)
+    if choice == 2:
+        return text[:len(text) // 2] + "　" + text[len(text) // 2:]
+    if choice == 3:
+        return text.translate({v: k for k, v in _HIRAGANA.items()})
+    return text.rstrip("ー") if text.endswith("ー") else text + " "
+
+
+def model_variant(model: str, rnd: random.Random) -> str:
+    return rnd.choice([model.replace("-", ""), model.lower(), unicodedata.normalize("NFKC", model).replace("-", " "),
+                       "".join(chr(ord(ch) + 0xFEE0) if "!" <= ch <= "~" else ch for ch in model)])
+
+
+def rows(count: int, start: int, rnd: random.Random):
+    for i in range(start, start + count):
+        manufacturer = rnd.randint(1, 50)
+        name = rnd.choice(NAMES)
+        yield (i + 1, f"{name} {rnd.choice(['', 'II', '2型', 'Pro'])}".strip(), None, rnd.randint(1, 10),
+               rnd.randint(1, 6), rnd.randint(1, 20), rnd.randint(1, 200), manufacturer,
+               f"20{rnd.randint(10, 24)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+               f"{chr(65 + manufacturer % 26)}{chr(65 + rnd.randrange(26))}-{rnd.randint(100, 999)}")
+
+
+def insert(conn: sqlite3.Connection, values) -> None:
+    conn.executemany(
+        "INSERT INTO equipment (equipment_code, name, name_kana, categorie_id, statuse_id, department_id, room_id,"
+        " manufacturer_id, purchase_date, model) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+    conn.commit()
+
+
+# 重複として登録する機器の器材番号 = 元の番号 + オフセット
+DUP_OFFSET = 10_000_000
+NEW_DUP_OFFSET = 20_000_000
+
+
+def duplicates_of(originals, offset: int, rnd: random.Random):
+    for row in originals:
+        yield (row[0] + offset, variant(row[1], rnd)) + row[2:9] + (model_variant(row[9], rnd),)
+
+
+def add_repairs(conn: sqlite3.Connection, codes, rnd: random.Random) -> None:
+    """修理履歴を登録する（画面からの登録と同じく TEXT。半分は 5桁にそろえた形）"""
+    conn.executemany(
+        "INSERT INTO repair (equipment_code, request_date) VALUES (?, '2024-04-01')",
+        [(str(code) if i % 2 else f"{code:05d}",) for i, code in enumerate(codes) for _ in range(rnd.randint(1, 3))])
+    conn.commit()
+
+
+def kept_repaired(result, codes) -> float:
+    """修理履歴のある重複が、残す機器に選ばれた割合"""
+    codes = set(codes)
+    clusters = [(p["keep"]["equipment_code"],
+                 {p["keep"]["equipment_code"], *(d["equipment_code"] for d in p["duplicates"])})
+                for p in result["proposals"]]
+    found = [keep in codes for keep, members in clusters if members & codes]
+    return sum(found) / max(len(found), 1)
+
+
+def recall(result, pairs) -> float:
+    found = {frozenset((p["keep"]["equipment_code"], d["equipment_code"]))
+             for p in result["proposals"] for d in p["duplicates"]}
+    # まとまりの中で直接の組になっていない場合も、同じ候補に入っていれば検出とする
+    clusters = [{p["keep"]["equipment_code"], *(d["equipment_code"] for d in p["duplicates"])}
+                for p in result["proposals"]]
+    hit = sum(1 for a, b in pairs if frozenset((a, b)) in found or any(a in c and b in c for c in clusters))
+    return hit / max(len(pairs), 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="重複登録の検出の計測")
+    parser.add_argument("--equipments", type=int, default=100000)
+    parser.add_argument("--dup-ratio", type=float, default=0.02)
+    parser.add_argument("--new", type=int, default=500, help="差分の照合で追加する機器の件数")
+    args = parser.parse_args()
+    rnd = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dedup.db")
+        create_db(path, 0, "INTEGER")
+        conn = sqlite3.connect(path)
+        ChangeLog.install(conn)
+        base = list(rows(args.equipments, 0, rnd))
+        originals = rnd.sample(base, int(len(base) * args.dup_ratio))
+        insert(conn, base)
+        insert(conn, duplicates_of(originals, DUP_OFFSET, rnd))
+        pairs = [(row[0], row[0] + DUP_OFFSET) for row in originals]
+        repaired = [row[0] + DUP_OFFSET for row in originals[::2]]
+        add_repairs(conn, repaired, rnd)
+        DBManager.DB_NAME = path
+
+        total = args.equipments + len(originals)
+        result = DuplicateDetector.scan(full=True)
+        print(f"全件の照合: {total} 件 / {result['seconds']:.2f} 秒")
+        print(f"  比較した組: {result['comparisons']:,} （総当たりなら {total * (total - 1) // 2:,}）")
+        print(f"  候補: {len(result['proposals'])} 件 / 重複の検出率: {recall(result, pairs) * 100:.1f}%")
+        print(f"  修理履歴のある機器を残す機器に選んだ割合: {kept_repaired(result, repaired) * 100:.1f}%")
+
+        new = list(rows(args.new, args.equipments, rnd))
+        new_originals = rnd.sample(new, len(new) // 10)
+        insert(conn, new)
+        insert(conn, duplicates_of(new_originals, DUP_OFFSET, rnd))
+        # 既存の機器と重複する新規登録
+        old = rnd.sample(base, len(new) // 10)
+        insert(conn, duplicates_of(old, NEW_DUP_OFFSET, rnd))
+        new_pairs = ([(row[0], row[0] + DUP_OFFSET) for row in new_originals]
+                     + [(row[0], row[0] + NEW_DUP_OFFSET) for row in old])
+        conn.close()
+
+        result = DuplicateDetector.scan()
+        print(f"差分の照合 ({result['mode']}): {result['rows']} 件 / {result['seconds']:.3f} 秒")
+        print(f"  比較した組: {result['comparisons']:,} / 候補: {len(result['proposals'])} 件"
+              f" / 新規登録の重複の検出率: {recall(result, new_pairs) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+ラベルの PDF 出力 (service/label_service.py) の計測。
+
+一時フォルダをキャッシュにして、N 枚（既定 5,000枚）のラベルを次の条件で出力し、所要時間と
+Python のメモリ使用量の最大値 (tracemalloc) を表示します。
+- 1プロセスで画像を作成（キャッシュなし）
+- プロセスプールで画像を作成（キャッシュなし）
+- 2回目の実行（全件キャッシュから）
+
+reportlab・qrcode・python-barcode[images] が必要です。
+
+使用例:
+    python benchmarks/bench_labels.py
+    python benchmarks/bench_labels.py --labels 5000 --symbology qr --workers 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from service.label_service import LabelError, LabelService  # noqa: E402
+
+
+def labels(count: int):
+    for i in range(count):
+        yield f"{i % 99 + 1:02d}{i // 99 % 999 + 1:03d}", f"デジタルマイクロスコープ {i}", f"病理検査室 {i % 30 + 1}"
+
+
+def run(label: str, count: int, output: str, symbology: str, workers: int) -> None:
+    tracemalloc.start()
+    stats = LabelService.generate(labels(count), output, symbology=symbology, workers=workers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:28s} {stats['seconds']:7.2f} 秒  作成 {stats['rendered']:5d} / キャッシュ {stats['cached']:5d}"
+          f"  メモリ最大 {peak / 1024 / 1024:6.1f} MB  PDF {os.path.getsize(output) / 1024 / 1024:.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ラベルの PDF 出力の計測")
+    parser.add_argument("--labels", type=int, default=5000)
+    parser.add_argument("--symbology", choices=LabelService.SYMBOLOGIES, default="code128")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "labels.pdf")
+        print(f"{args.labels} 枚 / {args.symbology} / {args.workers} プロセス")
+        try:
+            LabelService.CACHE_DIR = os.path.join(tmp, "cache_single")
+            run("1プロセス（キャッシュなし）", args.labels, output, args.symbology, 1)
+            LabelService.CACHE_DIR = os.path.join(tmp, "cache_pool")
+            run("プロセスプール（キャッシュなし）", args.labels, output, args.symbology, args.workers)
+            run("2回目（キャッシュあり）", args.labels, output, args.symbology, args.workers)
+        except LabelError as e:
+            print(f"[-] {e}")
+
+
+if __name__ == "__main__":
+    main()
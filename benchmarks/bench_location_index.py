@@ -0,0 +1,99 @@
+"""
+部門・部屋別の機器数 (models/location_index.py) の計測。
+
+一時DBに部屋・機器を作成し、次を比較します。
+- 部屋ごとに状態別の件数を検索する方法（EquipmentModel.count_by を部屋の数だけ実行。従来の「部屋ごとに1回検索」に相当）
+- 全件を1回で GROUP BY する方法
+- 集計表からの読み込み (LocationIndex.tree)
+あわせて、集計表のトリガーによる登録・状態変更の所要時間の増加を表示します。
+
+使用例:
+    python benchmarks/bench_location_index.py
+    python benchmarks/bench_location_index.py --equipments 100000 --rooms 300
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stress_concurrency import create_db  # noqa: E402
+from models.db_manager import DBManager  # noqa: E402
+from models.equipment_model import EquipmentModel  # noqa: E402
+from models.location_index import LocationIndex  # noqa: E402
+
+
+def create_rooms(path: str, rooms: int, departments: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE room_master (id INTEGER PRIMARY KEY, name TEXT NOT NULL, department_id INTEGER)")
+    conn.executemany("INSERT INTO room_master VALUES (?, ?, ?)",
+                     ((i, f"部屋{i}", i % departments + 1) for i in range(1, rooms + 1)))
+    conn.execute(f"UPDATE equipment SET room_id = abs(random()) % {rooms} + 1")
+    conn.commit()
+    conn.close()
+
+
+def timed_writes(path: str, count: int, rnd: random.Random) -> float:
+    """状態の変更 count 件の1件あたりの所要時間 (ms)"""
+    conn = sqlite3.connect(path)
+    total = conn.execute("SELECT MAX(id) FROM equipment").fetchone()[0]
+    start = time.perf_counter()
+    for _ in range(count):
+        conn.execute("UPDATE equipment SET statuse_id = ? WHERE id = ?", (rnd.randint(1, 4), rnd.randint(1, total)))
+        conn.commit()
+    elapsed = (time.perf_counter() - start) * 1000 / count
+    conn.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="部門・部屋別の機器数の計測")
+    parser.add_argument("--equipments", type=int, default=100000)
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--departments", type=int, default=6)
+    parser.add_argument("--writes", type=int, default=300)
+    args = parser.parse_args()
+    rnd = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "location.db")
+        create_db(path, args.equipments)
+        create_rooms(path, args.rooms, args.departments)
+        DBManager.DB_NAME = path
+
+        before = timed_writes(path, args.writes, rnd)
+
+        start = time.perf_counter()
+        for room_id in range(1, args.rooms + 1):
+            EquipmentModel.count_by("statuse_id", room_id=room_id)
+        per_room = time.perf_counter() - start
+
+        conn = sqlite3.connect(path)
+        start = time.perf_counter()
+        conn.execute("SELECT room_id, categorie_id, statuse_id, COUNT(*) FROM equipment GROUP BY 1, 2, 3").fetchall()
+        group_by = time.perf_counter() - start
+        conn.close()
+
+        start = time.perf_counter()
+        LocationIndex.tree()
+        install = time.perf_counter() - start
+        start = time.perf_counter()
+        nodes = LocationIndex.tree()
+        index = time.perf_counter() - start
+
+        after = timed_writes(path, args.writes, rnd)
+
+    print(f"機器 {args.equipments} 件 / 部屋 {args.rooms} / 階層のノード {len(nodes)}")
+    print(f"  部屋ごとに検索 ({args.rooms} 回): {per_room * 1000:9.1f} ms")
+    print(f"  全件を GROUP BY               : {group_by * 1000:9.1f} ms")
+    print(f"  集計表の作成（初回のみ）      : {install * 1000:9.1f} ms")
+    print(f"  集計表から読み込み            : {index * 1000:9.1f} ms")
+    print(f"  状態の変更 1件: トリガーなし {before:.3f} ms / あり {after:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+検索結果の保持方法によるメモリ使用量の比較。
+
+一時DBに機器データを N 件 (既定 100,000 件) 作成し、次の2通りを tracemalloc で計測します。
+  - 従来方式: fetchall() の生タプル + Treeview 用表示タプル + Excel出力用に読み戻したタプル
+  - 新方式  : EquipmentResultSet (EquipmentRecord の __slots__ + 重複文字列の共有)
+
+使用例:
+    python benchmarks/bench_result_memory.py
+    python benchmarks/bench_result_memory.py 50000
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.equipment_result import EquipmentResultSet  # noqa: E402
+
+LOOKUPS = {
+    "categorie_master": {1: "検査機器", 2: "一般備品", 3: "消耗品", 4: "その他"},
+    "statuse_master": {1: "使用中", 2: "良好", 3: "修理中", 4: "廃棄"},
+    "department_master": {1: "検査科", 2: "検体検査", 3: "生理検査", 4: "細菌検査", 5: "病理検査", 6: "採血室"},
+    "room_master": {1: "受付_染色室", 2: "鏡検室", 3: "臓器固定・切出室", 4: "標本作製室"},
+    "manufacturer_master": {i: f"製造元{i}" for i in range(1, 201)},
+    "celler_master": {i: f"販売元{i}" for i in range(1, 101)},
+}
+
+
+def create_db(path: str, count: int) -> None:
+    rnd = random.Random(0)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE equipment (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, equipment_code TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL, name_kana TEXT, categorie_id INTEGER, statuse_id INTEGER,
+            department_id INTEGER, room_id INTEGER, manufacturer_id INTEGER, celler_id INTEGER,
+            remarks TEXT, purchase_date TEXT, model TEXT)
+    """)
+    conn.executemany(
+        "INSERT INTO equipment VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (f"{i:06d}", f"遠心分離機 タイプ{i % 300}", f"エンシンブンリキ{i % 300}",
+             rnd.randint(1, 4), rnd.randint(1, 4), rnd.randint(1, 6), rnd.randint(1, 4),
+             rnd.randint(1, 200), rnd.randint(1, 100), "" if i % 5 else "定期点検対象",
+             f"20{rnd.randint(10, 24)}-{rnd.randint(1, 12):02d}-01", f"MDL-{i % 500}")
+            for i in range(count)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy(conn: sqlite3.Connection):
+    """従来方式: 生タプル・表示タプル・出力用タプルの3コピー"""
+    raw = conn.execute("SELECT * FROM equipment").fetchall()
+    display = []
+    for r in raw:
+        display.append((
+            LOOKUPS["categorie_master"].get(r[4], "不明"), r[1], r[2],
+            LOOKUPS["statuse_master"].get(r[5], "不明"), LOOKUPS["department_master"].get(r[6], "不明"),
+            LOOKUPS["room_master"].get(r[7], "不明"), LOOKUPS["manufacturer_master"].get(r[8], "不明"),
+            LOOKUPS["celler_master"].get(r[9], "不明"), r[10], r[11], r[12],
+        ))
+    # Treeview.item(..., "values") は Tcl から新しい文字列として読み戻される
+    exported = [tuple(str(v) for v in row) for row in display]
+    return raw, display, exported
+
+
+def compact(conn: sqlite3.Connection):
+    """新方式: EquipmentResultSet に1度だけ変換"""
+    return EquipmentResultSet.from_rows(conn.execute("SELECT * FROM equipment"), LOOKUPS)
+
+
+def measure(label: str, func, conn: sqlite3.Connection) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(conn)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} 保持: {current / 1024 / 1024:8.1f} MiB  ピーク: {peak / 1024 / 1024:8.1f} MiB  時間: {elapsed:6.2f} 秒")
+    del result
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        create_db(path, count)
+        conn = sqlite3.connect(path)
+        print(f"件数: {count:,}")
+        measure("従来方式", legacy, conn)
+        measure("新方式", compact, conn)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+検索SQLの正規化と接続の文キャッシュによる効果の計測。
+
+一時DBに機器データを作成し、ランダムな条件の組み合わせで EquipmentModel.search_equipments を
+繰り返し実行して、次の2通りの1件あたりの時間と文キャッシュのヒット率を表示します。
+  - 呼び出しごとに接続を開く（従来どおり。文キャッシュは毎回捨てられる）
+  - DBManager.enable_pool() で接続を使い回す（解析済みの文が再利用される）
+
+使用例:
+    python benchmarks/bench_statement_cache.py
+    python benchmarks/bench_statement_cache.py --searches 5000 --shapes 64
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stress_concurrency import create_db  # noqa: E402
+from models.db_manager import DBManager  # noqa: E402
+from models.equipment_model import EquipmentModel  # noqa: E402
+
+# 条件に与える値（部分一致の文字列 / マスタID）
+SAMPLE_VALUES = {
+    "equipment_code": "01", "name": "機器1", "name_kana": "キ", "remarks": "",
+    "category_id": 2, "statuse_id": 3, "department_id": 5, "room_id": 4,
+    "manufacturer_id": 7, "celler_id": 3,
+}
+
+
+def make_conditions(rnd: random.Random, shapes: int):
+    """shapes 通りの条件の組み合わせから1つを選んで検索条件にする"""
+    mask = rnd.randrange(shapes)
+    return {
+        name: SAMPLE_VALUES[name]
+        for bit, (name, _, _) in enumerate(EquipmentModel.SEARCH_FILTERS)
+        if mask >> bit & 1
+    }
+
+
+def run(searches: int, shapes: int) -> float:
+    rnd = random.Random(0)
+    DBManager.reset_statement_cache_stats()
+    start = time.perf_counter()
+    for _ in range(searches):
+        EquipmentModel.search_equipments(**make_conditions(rnd, shapes))
+    return (time.perf_counter() - start) / searches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="検索SQLの文キャッシュの効果を計測します")
+    parser.add_argument("--searches", type=int, default=2000)
+    parser.add_argument("--shapes", type=int, default=32, help="使用する条件の組み合わせ数 (最大 1024)")
+    parser.add_argument("--equipments", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        DBManager.DB_NAME = os.path.join(tmp, "bench.db")
+        create_db(DBManager.DB_NAME, args.equipments)
+
+        per_call = run(args.searches, args.shapes)
+        per_call_stats = DBManager.statement_cache_stats()
+
+        DBManager.enable_pool()
+        pooled = run(args.searches, args.shapes)
+        pooled_stats = DBManager.statement_cache_stats()
+        DBManager.close_pool()
+
+    sql_info = EquipmentModel.cache_stats()["sql_text"]
+    print(f"searches={args.searches} shapes={args.shapes} equipments={args.equipments}")
+    print(f"  SQL文の生成: {sql_info['shapes']} 通り (メモ化ヒット {sql_info['hits']} / 生成 {sql_info['misses']})")
+    print(f"  毎回接続    : {per_call * 1000:7.3f} ms/件  文キャッシュ ヒット率 {per_call_stats['hit_rate']:.1%}")
+    print(f"  接続の再利用: {pooled * 1000:7.3f} ms/件  文キャッシュ ヒット率 {pooled_stats['hit_rate']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
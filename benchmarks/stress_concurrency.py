@@ -0,0 +1,117 @@
+"""
+複数端末からの同時アクセスを模した負荷試験。
+
+一時DBを作成し、N 個のプロセス（既定 10）が検索と修理登録を混在させて一定時間実行します。
+各プロセスは DBManager の設定（busy_timeout・journal_mode・BEGIN IMMEDIATE＋再試行）を使い、
+処理件数と「database is locked」などのエラー件数を集計して表示します。
+
+使用例:
+    python benchmarks/stress_concurrency.py
+    python benchmarks/stress_concurrency.py --clients 10 --seconds 10 --journal-mode wal
+    python benchmarks/stress_concurrency.py --journal-mode delete --write-ratio 0.3
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.db_manager import DBManager  # noqa: E402
+from models.equipment_model import EquipmentModel  # noqa: E402
+from models.repair_model import RepairModel  # noqa: E402
+
+
+def create_db(path: str, count: int, code_type: str = "TEXT") -> None:
+    """
+    負荷試験用の一時DBを作成する。
+    code_type に "INTEGER" を指定すると、db_create.py と同じく equipment_code を INTEGER で宣言する
+    （"01001" は整数 1001 として保存される）。
+    """
+    conn = sqlite3.connect(path)
+    conn.executescript(f"""
+        CREATE TABLE equipment (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, equipment_code {code_type} UNIQUE NOT NULL,
+            name TEXT NOT NULL, name_kana TEXT, categorie_id INTEGER, statuse_id INTEGER,
+            department_id INTEGER, room_id INTEGER, manufacturer_id INTEGER, celler_id INTEGER,
+            remarks TEXT, purchase_date TEXT, model TEXT);
+        CREATE TABLE repair (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, equipment_code TEXT NOT NULL,
+            repairstatuses INTEGER, request_date TEXT, completion_date TEXT, repairtype INTEGER,
+            vendor INTEGER, technician TEXT, details TEXT, remarks TEXT, cost REAL);
+    """)
+    conn.executemany(
+        "INSERT INTO equipment VALUES (NULL, ?, ?, '', ?, ?, ?, ?, ?, ?, '', '2024-04-01', '')",
+        ((f"{i:05d}", f"機器{i}", i % 4 + 1, i % 4 + 1, i % 6 + 1, i % 8 + 1, i % 20 + 1, i % 10 + 1)
+         for i in range(count)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def client(db_path: str, journal_mode: str, seconds: float, write_ratio: float, equipment_count: int, results):
+    """1端末分の処理: 検索と修理登録を時間いっぱい繰り返す"""
+    DBManager.DB_NAME = db_path
+    DBManager.JOURNAL_MODE = journal_mode
+    rnd = random.Random(os.getpid())
+    reads = writes = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        code = f"{rnd.randrange(equipment_count):05d}"
+        try:
+            if rnd.random() < write_ratio:
+                if RepairModel.add_repair_record({
+                    "equipment_code": code, "repairstatuses": 1, "request_date": "2025-01-01",
+                    "repairtype": 1, "technician": "stress", "details": "負荷試験",
+                }):
+                    writes += 1
+                else:
+                    errors += 1
+            else:
+                EquipmentModel.search_equipments(department_id=rnd.randint(1, 6))
+                reads += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    results.put((reads, writes, errors))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="共有DBの同時アクセス負荷試験")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--journal-mode", default="wal", help="delete / wal など")
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--equipments", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "stress.db")
+        create_db(path, args.equipments)
+
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=client, args=(
+                path, args.journal_mode, args.seconds, args.write_ratio, args.equipments, results))
+            for _ in range(args.clients)
+        ]
+        for p in procs:
+            p.start()
+        totals = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+    reads = sum(t[0] for t in totals)
+    writes = sum(t[1] for t in totals)
+    errors = sum(t[2] for t in totals)
+    print(f"journal_mode={args.journal_mode} clients={args.clients} seconds={args.seconds}")
+    print(f"  検索: {reads:7d} 件 ({reads / args.seconds:8.1f} 件/秒)")
+    print(f"  登録: {writes:7d} 件 ({writes / args.seconds:8.1f} 件/秒)")
+    print(f"  エラー: {errors} 件")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import sqlite3
+from models.db_manager import DBManager
 class MasterDataFetcher:
     """
     マスターテーブルからデータを取得するクラス。
@@ -13,7 +13,7 @@ class MasterDataFetcher:
         :return: [(id, name), ...] の形式のリスト
         """
         try:
-            conn = sqlite3.connect(self.db_name)
+            conn = DBManager.connect(self.db_name)
             cursor = conn.cursor()
             cursor.execute(f"SELECT id, name FROM {table_name}")
             data = cursor.fetchall()  # [(id1, name1), (id2, name2), ...]
@@ -31,7 +31,7 @@ class MasterDataFetcher:
         :return: 対応する名前、見つからなければ None
         """
         try:
-            conn = sqlite3.connect(self.db_name)
+            conn = DBManager.connect(self.db_name)
             cursor = conn.cursor()
             cursor.execute(f"SELECT name FROM {table_name} WHERE id = ?", (record_id,))
             result = cursor.fetchone()
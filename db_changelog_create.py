@@ -0,0 +1,11 @@
+from models.db_manager import DBManager
+from models.change_log import ChangeLog
+
+# 共有DB（config.json の db_name）に接続
+conn = DBManager.connect()
+
+# change_log テーブルと、equipment・repair・各マスタの変更記録トリガーを作成
+ChangeLog.install(conn)
+print("変更記録テーブルとトリガーが正常に作成されました:", ", ".join(ChangeLog.existing_tables(conn)))
+
+conn.close()
@@ -1,6 +1,7 @@
 import os
 import shutil
-import sqlite3
+from models.db_manager import DBManager
+from models.audit_log import AuditLog
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from tkcalendar import DateEntry
@@ -38,7 +39,7 @@ class EditRepairWindow(tk.Toplevel):
     # ========= マスター読込 =========
     def fetch_master(self, table_name):
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with DBManager.connect(self.db_name) as conn:
                 cursor = conn.cursor()
                 cursor.execute(f"SELECT id, name FROM {table_name}")
                 return dict(cursor.fetchall())
@@ -130,7 +131,7 @@ class EditRepairWindow(tk.Toplevel):
     # ========= 修理情報の読込 =========
     def load_repair_data(self, repair_id):
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with DBManager.connect(self.db_name) as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT repairstatuses, request_date, completion_date, repairtype, vendor,
@@ -157,9 +158,13 @@ class EditRepairWindow(tk.Toplevel):
             repairtype_id = self.get_id_from_name(new_values["対応"], self.types)
             vendor_id = self.get_id_from_name(new_values["業者"], self.vendors)
 
-            with sqlite3.connect(self.db_name) as conn:
+            with DBManager.connect(self.db_name) as conn:
+                # 他端末と同時に保存しても「database is locked」にならないよう、先に書き込みロックを確保
+                DBManager.begin_immediate(conn)
                 cursor = conn.cursor()
 
+                # 監査ログ用に保存前の行を取得する（新規の場合は空）
+                before = AuditLog.snapshot(cursor, "repair", "id = ?", (self.repair_id,)) if self.repair_id else {}
                 if self.repair_id:  # 更新
                     cursor.execute("""
                         UPDATE repair
@@ -183,8 +188,10 @@ class EditRepairWindow(tk.Toplevel):
                         new_values["詳細"], new_values["備考"]
                     ))
                     self.repair_id = cursor.lastrowid
+                after = AuditLog.snapshot(cursor, "repair", "id = ?", (self.repair_id,))
 
                 conn.commit()
+            AuditLog.record("repair", before, after)
 
             messagebox.showinfo("保存完了", "修理情報を保存しました。")
             if self.refresh_callback:
@@ -201,9 +208,13 @@ class EditRepairWindow(tk.Toplevel):
             repairtype_id = self.get_id_from_name(new_values["対応"], self.types)
             vendor_id = self.get_id_from_name(new_values["業者"], self.vendors)
 
-            with sqlite3.connect(self.db_name) as conn:
+            with DBManager.connect(self.db_name) as conn:
+                # 他端末と同時に保存しても「database is locked」にならないよう、先に書き込みロックを確保
+                DBManager.begin_immediate(conn)
                 cursor = conn.cursor()
 
+                # 監査ログ用に保存前の行を取得する（新規の場合は空）
+                before = AuditLog.snapshot(cursor, "repair", "id = ?", (self.repair_id,)) if self.repair_id else {}
                 if self.repair_id:  # 既存修理データを更新
                     cursor.execute("""
                         UPDATE repair
@@ -227,8 +238,10 @@ class EditRepairWindow(tk.Toplevel):
                         new_values["詳細"], new_values["備考"]
                     ))
                     self.repair_id = cursor.lastrowid
+                after = AuditLog.snapshot(cursor, "repair", "id = ?", (self.repair_id,))
 
                 conn.commit()
+            AuditLog.record("repair", before, after)
 
             # ウィンドウは閉じず、リロードのみ行う
             if self.refresh_callback:
@@ -1,15 +1,16 @@
 import sqlite3
+from models.db_manager import DBManager
+from models.audit_log import AuditLog
 import json
 import tkinter as tk
 from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
 from cls_master_data_fetcher import MasterDataFetcher
-from cls_new_equipment_number import EquipmentManager
+from models.equipment_code_allocator import EquipmentCodeAllocator, EquipmentCodeAllocationError
 
 # データベース接続設定
 db_name = "equipment_management.db"
 fetcher = MasterDataFetcher(db_name)
-manager = EquipmentManager()  # 新しいequipment番号を生成
 
 # 各マスタテーブルからデータ取得
 categories = fetcher.fetch_all("categorie_master")
@@ -29,10 +30,10 @@ def get_id_from_name(name, data_list):
 def add_equipment():
     """新規器材をデータベースに登録"""
     new_data = {key: var.get() for key, var in input_vars.items()}
-    new_data["equipment_code"] = equipment_code  # 事前に取得したIDを使用
 
     try:
-        conn = sqlite3.connect(db_name)
+        conn = DBManager.connect(db_name)
+        DBManager.begin_immediate(conn)
         cursor = conn.cursor()
 
         # 各IDを取得
@@ -43,6 +44,9 @@ def add_equipment():
         room_id = get_id_from_name(new_data["room_name"], rooms)
         celler_id = get_id_from_name(new_data["celler_name"], cellers)
 
+        # 器材番号は分類ごとの空き番号から、登録と同じトランザクションで採番する
+        new_data["equipment_code"] = EquipmentCodeAllocator.allocate(cursor, categorie_id or 0)
+
         query = """
         INSERT INTO equipment (equipment_code, categorie_id, name, statuse_id, department_id, room_id, manufacturer_id, celler_id, purchase_date, remarks)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
@@ -59,8 +63,13 @@ def add_equipment():
             new_data["purchase_date"],
             new_data["remarks"]
         ))
+        after = AuditLog.snapshot(cursor, "equipment", "rowid = ?", (cursor.lastrowid,))
         conn.commit()
-        messagebox.showinfo("成功", "新しい器材が追加されました。")
+        AuditLog.record("equipment", {}, after)
+        messagebox.showinfo("成功", f"新しい器材が追加されました。\n器材番号: {new_data['equipment_code']}")
+    except EquipmentCodeAllocationError as e:
+        conn.rollback()
+        messagebox.showerror("採番エラー", str(e))
     except sqlite3.Error as e:
         messagebox.showerror("データベースエラー", str(e))
     finally:
@@ -72,12 +81,18 @@ root_add = tk.Tk()
 root_add.title("新規器材登録")
 root_add.geometry("400x550")
 
-# ** 事前に新しい equipment_code を取得 **
-equipment_code = manager.get_next_equipment_code()
-
-# ** equipment_code の表示 **
+# ** equipment_code の表示（分類を選ぶと、その分類で次に採番される番号を表示する）**
 tk.Label(root_add, text="器材番号").grid(row=0, column=0, padx=10, pady=5)
-tk.Label(root_add, text=equipment_code, fg="blue", font=("Arial", 12, "bold")).grid(row=0, column=1, padx=10, pady=5)
+code_label = tk.Label(root_add, text="（分類を選択してください）", fg="blue", font=("Arial", 12, "bold"))
+code_label.grid(row=0, column=1, padx=10, pady=5)
+
+
+def show_next_code(*args):
+    categorie_id = get_id_from_name(input_vars["categorie_name"].get(), categories)
+    try:
+        code_label.config(text=EquipmentCodeAllocator.peek(categorie_id) if categorie_id else "")
+    except EquipmentCodeAllocationError as e:
+        code_label.config(text=str(e))
 
 # ** 各種入力フィールド **
 input_vars = {}
@@ -100,6 +115,8 @@ for i, (label, key) in enumerate(zip(labels, keys)):
     entry.grid(row=i+1, column=1, padx=10, pady=5)
 
 # ** ボタン **
+input_vars["categorie_name"].trace_add("write", show_next_code)
+
 tk.Button(root_add, text="保存", command=add_equipment).grid(row=len(labels)+1, column=0, pady=20)
 tk.Button(root_add, text="キャンセル", command=root_add.destroy).grid(row=len(labels)+1, column=1, pady=20)
 
@@ -8,6 +8,8 @@ from tkinter import messagebox
 from tkcalendar import DateEntry
 from cls_master_data_fetcher import MasterDataFetcher
 import sqlite3
+from models.db_manager import DBManager
+from models.audit_log import AuditLog
 from cls_new_equipment_number import EquipmentManager
 
 # データベース接続設定
@@ -54,7 +56,7 @@ def get_id_from_name(name, data_list):
     return None  # 該当なしの場合はNone
 
 def display_repair_history(equipment_code):
-    conn = sqlite3.connect(DB_NAME)
+    conn = DBManager.connect(DB_NAME)
     cursor = conn.cursor()
     cursor.execute("""
         SELECT status, request_date, completion_date, category, vendor, technician
@@ -86,7 +88,8 @@ def save_equipment():
     
     if updated_data:
         try:
-            conn = sqlite3.connect(DB_NAME)
+            conn = DBManager.connect(DB_NAME)
+            DBManager.begin_immediate(conn)
             cursor = conn.cursor()
 
             # 各名称に対応するIDを取得
@@ -102,6 +105,9 @@ def save_equipment():
             SET categorie_id = ?, name = ?, statuse_id = ?, department_id = ?, room_id = ?, manufacturer_id=?, celler_id = ?, purchase_date = ?, remarks = ?, model = ?
             WHERE equipment_code = ?;
             """
+            # 監査ログ用に更新前後の行を取得する
+            audit_key = ("equipment_code = ?", (equipment_data["equipment_code"],))
+            before = AuditLog.snapshot(cursor, "equipment", *audit_key)
             cursor.execute(query, (
                 categorie_id,
                 updated_data.get("name", equipment_data["name"]),
@@ -115,11 +121,13 @@ def save_equipment():
                 updated_data.get("model", equipment_data["model"]),
                 equipment_data["equipment_code"]
             ))
+            after = AuditLog.snapshot(cursor, "equipment", *audit_key)
 
             conn.commit()
         except sqlite3.Error as e:
             print("データベースエラー:", e)
         else:
+            AuditLog.record("equipment", before, after)
             messagebox.showinfo("成功", "データが更新されました。")
         finally:
             conn.close()
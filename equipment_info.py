@@ -5,7 +5,8 @@ import os
 import sys  
 import subprocess
 import json
-import sqlite3
+from models.db_manager import DBManager
+from models.master_model import MasterModel
 from datetime import datetime
 
 from equipment_sarch import fetch_data
@@ -37,12 +38,13 @@ if not rooms:
     rooms = [(1, "受付_染色室"), (2, "鏡検室"), (3, "臓器固定・切出室"), (4, "標本作製室"),(5, "病理標本保人室"),(6, "病理診断室"),(8, "剖検室"),(9, "剖検前室")]
 
 def populate_master_menu():
-    conn = sqlite3.connect(DB_NAME)
+    conn = DBManager.connect(DB_NAME)
     cursor = conn.cursor()
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
     tables = [table[0] for table in cursor.fetchall()]
     conn.close()
-    return tables
+    # マスタ編集画面で扱えるのはマスタテーブルのみ
+    return [table for table in tables if table in MasterModel.MASTER_TABLES]
 
 def search():
     # 選択されたカテゴリー名を取得
@@ -131,7 +133,7 @@ def search():
             category_name, record[1], record[2], statuse_name, department_name, 
             room_name, manufacturer_name, celler_name, record[10], record[11], record[12]
         ), tags=(tag,))
-        set_fixed_column_widths(tree)
+    set_fixed_column_widths(tree)
 
     # ★ カラム幅自動調整機能の追加（文字幅に応じて）
 def export_to_excel():
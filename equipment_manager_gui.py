@@ -3,7 +3,8 @@ from tkinter import ttk, messagebox
 import tkinter.font as tkFont
 import subprocess
 import json
-import sqlite3
+from models.db_manager import DBManager
+from models.master_model import MasterModel
 import os
 import sys
 from datetime import datetime
@@ -100,12 +101,13 @@ class EquipmentManagerApp:
         self.root.config(menu=menubar)
 
     def _populate_master_menu(self):
-        conn = sqlite3.connect(self.db_name)
+        conn = DBManager.connect(self.db_name)
         cursor = conn.cursor()
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
         tables = [row[0] for row in cursor.fetchall()]
         conn.close()
-        return tables
+        # マスタ編集画面で扱えるのはマスタテーブルのみ
+        return [table for table in tables if table in MasterModel.MASTER_TABLES]
 
     # ===== メイン画面 =====
     def _create_widgets(self):
@@ -1,4 +1,4 @@
-import sqlite3
+from models.db_manager import DBManager
 import tkinter as tk
 from tkinter import ttk
 import os,json
@@ -13,7 +13,7 @@ def fetch_data(equipment_code=None, name=None, name_kana=None, categorie_id=None
 
     DB_NAME = config.get("db_name", "default.db")
 
-    with sqlite3.connect(DB_NAME) as conn:
+    with DBManager.connect(DB_NAME) as conn:
         cursor = conn.cursor()
         
         # 検索条件のリストとパラメータリストを準備
@@ -2,12 +2,31 @@ import tkinter as tk
 from tkinter import ttk
 import sys
 import os
+import multiprocessing
 
 # 自作した views パッケージからメイン画面クラスをインポート
 from views.main_window import EquipmentManagerMainWindow
+from models.replica_manager import ReplicaManager
+from models.db_manager import DBManager
+from models.backup_manager import BackupManager
+from views.ui_state import UIState
 
 def main():
     """アプリケーションのエントリーポイント"""
+    # 画面状態（列幅・ウィンドウ位置など）の読み込みを、DBの準備と並行して始める
+    UIState.preload()
+
+    # 読み取り接続を使い回し、検索の解析済みSQL文（文キャッシュ）を画面操作をまたいで再利用する
+    DBManager.enable_pool()
+
+    # ローカル複製が有効な場合は、バックグラウンドで準備・同期を開始（準備完了までは共有DBを読む）
+    if ReplicaManager.ENABLED:
+        ReplicaManager.start()
+
+    # 定期バックアップが有効な場合は、前回から interval_hours 経過するごとにバックグラウンドで作成
+    if BackupManager.ENABLED:
+        BackupManager.start()
+
     # Tkinterのルートウィンドウを生成
     root = tk.Tk()
     
@@ -22,7 +41,12 @@ def main():
     # イベントループの開始（画面を閉じられるまで待機）
     root.mainloop()
 
+    # 未保存の画面状態を書き込んでから終了する
+    UIState.flush()
+
 if __name__ == "__main__":
     # カレントディレクトリをこのファイルの場所に合わせてインポートエラーを防ぐ
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    # ラベル作成のプロセスプールを、exe 化した場合にも使えるようにする
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,100 @@
+from typing import List, Tuple, Any, Dict, Optional
+from .db_manager import DBManager
+
+
+class AnalyticsModel:
+    """
+    修理（repair）と機器（equipment）を集計し、予算検討用の信頼性指標を算出するモデル。
+    MTBF・停止日数・修理費用を、製造元／販売元／部門／機器分類ごと・期間ごとに
+    ウィンドウ関数を使った1本のSQLでまとめて求めます。
+    """
+
+    # 集計軸: (画面表示名, equipment側のカラム, 結合するマスタテーブル)
+    DIMENSIONS: Dict[str, Tuple[str, str, str]] = {
+        "manufacturer": ("製造元", "manufacturer_id", "manufacturer_master"),
+        "celler": ("販売元", "celler_id", "celler_master"),
+        "department": ("部門", "department_id", "department_master"),
+        "category": ("機器分類", "categorie_id", "categorie_master"),
+    }
+
+    # 期間の粒度と、依頼日から期間キーを作る strftime 書式
+    PERIOD_FORMATS: Dict[str, str] = {
+        "month": "%Y-%m",
+        "year": "%Y",
+    }
+
+    # fetch_rollup が返す各行の並び
+    COLUMNS = (
+        "period", "group_id", "group_name", "failures", "equipments",
+        "mtbf_days", "downtime_days", "total_cost",
+    )
+
+    @staticmethod
+    def period_key(date_text: Optional[str], granularity: str) -> Optional[str]:
+        """'YYYY-MM-DD' 形式の日付文字列から、指定粒度の期間キーを返します"""
+        if not date_text:
+            return None
+        length = 7 if granularity == "month" else 4
+        return str(date_text)[:length]
+
+    @classmethod
+    def fetch_rollup(
+        cls,
+        dimension: str,
+        granularity: str = "month",
+        since_period: Optional[str] = None
+    ) -> List[Tuple[Any, ...]]:
+        """
+        指定した集計軸・粒度で、期間ごとの信頼性指標を取得します。
+        since_period を指定すると、その期間以降だけを返します（キャッシュの部分再計算用）。
+
+        - MTBF: 同一機器の前回修理（完了日、未完了なら依頼日）から今回依頼日までの平均日数
+        - 停止日数: completion_date - request_date の合計（未完了は含めない）
+        - 修理費用: cost の合計
+
+        LAG は期間で絞り込む前の全件に対して計算するため、期間をまたぐ間隔も正しく求まります。
+        """
+        if dimension not in cls.DIMENSIONS:
+            raise ValueError(f"未対応の集計軸です: {dimension}")
+        if granularity not in cls.PERIOD_FORMATS:
+            raise ValueError(f"未対応の期間粒度です: {granularity}")
+
+        _, column, master_table = cls.DIMENSIONS[dimension]
+        query = f"""
+            WITH failures AS (
+                SELECT
+                    r.id,
+                    r.equipment_code,
+                    strftime(?, r.request_date) AS period,
+                    COALESCE(r.cost, 0) AS cost,
+                    julianday(r.completion_date) - julianday(r.request_date) AS downtime_days,
+                    julianday(r.request_date) - julianday(
+                        LAG(COALESCE(r.completion_date, r.request_date)) OVER (
+                            PARTITION BY r.equipment_code
+                            ORDER BY r.request_date, r.id
+                        )
+                    ) AS tbf_days
+                FROM repair r
+                WHERE r.request_date IS NOT NULL AND r.request_date <> ''
+            )
+            SELECT
+                f.period,
+                e.{column} AS group_id,
+                COALESCE(g.name, '未設定') AS group_name,
+                COUNT(*) AS failures,
+                COUNT(DISTINCT f.equipment_code) AS equipments,
+                AVG(f.tbf_days) AS mtbf_days,
+                SUM(CASE WHEN f.downtime_days > 0 THEN f.downtime_days ELSE 0 END) AS downtime_days,
+                SUM(f.cost) AS total_cost
+            FROM failures f
+            JOIN equipment e ON e.equipment_code = f.equipment_code
+            LEFT JOIN {master_table} g ON e.{column} = g.id
+            WHERE f.period IS NOT NULL AND f.period >= ?
+            GROUP BY f.period, e.{column}
+            ORDER BY f.period, total_cost DESC
+        """
+        params = (cls.PERIOD_FORMATS[granularity], since_period or "")
+
+        with DBManager.get_cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
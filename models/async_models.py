@@ -0,0 +1,181 @@
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from .db_manager import DBManager
+from .equipment_model import EquipmentModel
+from .master_model import MasterModel
+from .repair_model import RepairModel
+
+T = TypeVar("T")
+
+
+class _CancelToken:
+    """実行中の問い合わせの接続を保持し、取り消し時に interrupt() する"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.cancelled = False
+
+    def attach(self, conn: Optional[sqlite3.Connection]) -> None:
+        with self._lock:
+            self._conn = conn
+            if conn is not None and self.cancelled:
+                conn.interrupt()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            if self._conn is not None:
+                self._conn.interrupt()
+
+
+class AsyncDB:
+    """
+    同期のモデルメソッドを asyncio から呼び出すための実行基盤。
+
+    aiosqlite 等を追加せず、専用のスレッドプールでモデルの同期メソッドをそのまま実行します
+    （SQL の定義は同期版と共通）。sqlite3 は問い合わせ中に GIL を解放するため、読み取りは並列に進みます。
+    - 同時実行数は MAX_CONCURRENCY（config.json の "async_concurrency"）で制限します。
+    - await 中のタスクが取り消されると、実行中の読み取りを conn.interrupt() で中断します
+      （書き込みは途中で中断せず、完了を待たずに戻ります）。
+    - 読み取り接続は DBManager の接続プールで使い回します。
+    """
+
+    MAX_CONCURRENCY: int = DBManager._config.get("async_concurrency", 8)
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    # イベントループごとのセマフォ（asyncio のプリミティブはループをまたいで使えない）
+    _semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, max_concurrency: int) -> None:
+        """同時実行数を変更します（実行中の処理が無いときに呼び出してください）"""
+        with cls._lock:
+            cls.MAX_CONCURRENCY = max_concurrency
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=False)
+            cls._executor = None
+            cls._semaphores = {}
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        with cls._lock:
+            if cls._executor is None:
+                DBManager.enable_pool()
+                cls._executor = ThreadPoolExecutor(max_workers=cls.MAX_CONCURRENCY, thread_name_prefix="async-db")
+            return cls._executor
+
+    @classmethod
+    def _get_semaphore(cls, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        with cls._lock:
+            semaphore = cls._semaphores.get(loop)
+            if semaphore is None:
+                # 閉じたループのセマフォは残さない
+                cls._semaphores = {l: s for l, s in cls._semaphores.items() if not l.is_closed()}
+                semaphore = cls._semaphores[loop] = asyncio.Semaphore(cls.MAX_CONCURRENCY)
+            return semaphore
+
+    @classmethod
+    async def run(cls, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """同期関数をスレッドプールで実行し、結果を待ちます"""
+        loop = asyncio.get_running_loop()
+        token = _CancelToken()
+
+        def call() -> T:
+            if token.cancelled:
+                raise asyncio.CancelledError()
+            with DBManager.track_read_connections(token.attach):
+                return func(*args, **kwargs)
+
+        async with cls._get_semaphore(loop):
+            future = loop.run_in_executor(cls._get_executor(), call)
+            try:
+                return await future
+            except asyncio.CancelledError:
+                token.cancel()
+                raise
+
+    @classmethod
+    async def gather(cls, func: Callable[..., T], args_list: Iterable[Tuple[Any, ...]]) -> List[T]:
+        """
+        同じ関数を引数を変えて並行実行し、結果を引数の順に返します。
+        いずれかが失敗・取り消しされた場合は、残りの処理もすべて取り消します。
+        """
+        tasks = [asyncio.ensure_future(cls.run(func, *args)) for args in args_list]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+
+class AsyncEquipmentModel:
+    """EquipmentModel の非同期版（引数・戻り値は同期版と同じ）"""
+
+    @staticmethod
+    async def search_equipments(**conditions: Any) -> List[Tuple[Any, ...]]:
+        return await AsyncDB.run(EquipmentModel.search_equipments, **conditions)
+
+    @staticmethod
+    async def search_records(lookups: Dict[str, Dict[int, str]], **conditions: Any):
+        return await AsyncDB.run(EquipmentModel.search_records, lookups, **conditions)
+
+    @staticmethod
+    async def count_by(column: str, **conditions: Any) -> List[Tuple[Any, int]]:
+        return await AsyncDB.run(EquipmentModel.count_by, column, **conditions)
+
+
+class AsyncRepairModel:
+    """RepairModel の非同期版（引数・戻り値は同期版と同じ）"""
+
+    @staticmethod
+    async def get_equipment_detail_by_code(equipment_code: str) -> Optional[Dict[str, Any]]:
+        return await AsyncDB.run(RepairModel.get_equipment_detail_by_code, equipment_code)
+
+    @staticmethod
+    async def get_history_by_equipment(equipment_code: str) -> List[Tuple[Any, ...]]:
+        return await AsyncDB.run(RepairModel.get_history_by_equipment, equipment_code)
+
+    @staticmethod
+    async def get_histories(equipment_codes: Iterable[str]) -> Dict[str, List[Tuple[Any, ...]]]:
+        """複数機器の修理履歴を並行して取得し、{機器コード: 履歴} で返します"""
+        codes = list(equipment_codes)
+        histories = await AsyncDB.gather(RepairModel.get_history_by_equipment, [(code,) for code in codes])
+        return dict(zip(codes, histories))
+
+    @staticmethod
+    async def get_repair_record_by_id(repair_id: int) -> Optional[Tuple[Any, ...]]:
+        return await AsyncDB.run(RepairModel.get_repair_record_by_id, repair_id)
+
+    @staticmethod
+    async def add_repair_record(data: dict) -> bool:
+        return await AsyncDB.run(RepairModel.add_repair_record, data)
+
+    @staticmethod
+    async def update_repair_record(repair_id: int, data: dict) -> bool:
+        return await AsyncDB.run(RepairModel.update_repair_record, repair_id, data)
+
+
+class AsyncMasterModel:
+    """MasterModel の非同期版（引数・戻り値は同期版と同じ）"""
+
+    @staticmethod
+    async def fetch_all(table_name: str) -> List[Tuple[int, str]]:
+        return await AsyncDB.run(MasterModel.fetch_all, table_name)
+
+    @staticmethod
+    async def get_kv_lookup(table_name: str) -> Dict[int, str]:
+        return await AsyncDB.run(MasterModel.get_kv_lookup, table_name)
+
+    @staticmethod
+    async def get_kv_lookups(table_names: Iterable[str]) -> Dict[str, Dict[int, str]]:
+        """複数のマスタを並行して取得し、{テーブル名: {id: name}} で返します"""
+        names = list(table_names)
+        lookups = await AsyncDB.gather(MasterModel.get_kv_lookup, [(name,) for name in names])
+        return dict(zip(names, lookups))
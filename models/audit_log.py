@@ -0,0 +1,327 @@
+import atexit
+import getpass
+import json
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .db_manager import DBManager
+
+
+class AuditLog:
+    """
+    equipment・repair の変更履歴（誰が・いつ・どの列を・何から何へ）を追記専用で記録する監査ログ。
+
+    使い方（保存処理の書き込みトランザクション内で前後の行を読み、コミット後に記録する）:
+        before = AuditLog.snapshot(cursor, "equipment", "equipment_code = ?", (code,))
+        cursor.execute("UPDATE equipment SET ... WHERE equipment_code = ?", ...)
+        after = AuditLog.snapshot(cursor, "equipment", "equipment_code = ?", (code,))
+        conn.commit()
+        AuditLog.record("equipment", before, after)
+
+    - 変更のあった列だけを1列1行で audit_log に記録します。
+      操作者・テーブル名・列名は audit_name の整数IDで持ち、日時は UNIX 秒の整数にして行を小さくしています。
+    - record() はメモリ上に溜めるだけで、BATCH_SIZE 件たまるか FLUSH_INTERVAL_SEC 秒ごとに
+      バックグラウンドでまとめて書き込みます（保存処理の応答時間を増やさない）。終了時にも書き出します。
+    - 一括変更 (EquipmentBulkEdit) は行ごとではなく、record_batch() で1回につき1件だけ記録します。
+    - compact() で保持期間を過ぎた記録の削除と、同じ人が短時間に同じ列を繰り返し変更した記録の統合を行います。
+    """
+
+    TABLE = "audit_log"
+    NAME_TABLE = "audit_name"
+
+    _settings: Dict[str, Any] = DBManager._config.get("audit", {})
+    ENABLED: bool = bool(_settings.get("enabled", True))
+    BATCH_SIZE: int = _settings.get("batch_size", 200)
+    FLUSH_INTERVAL_SEC: float = _settings.get("flush_interval_sec", 2.0)
+    RETENTION_DAYS: int = _settings.get("retention_days", 3650)
+    # この秒数以内に同じ人が同じ列を続けて変更した記録は、compact() で1件にまとめる
+    MERGE_WINDOW_SEC: int = _settings.get("merge_window_sec", 600)
+
+    # 記録しない列（主キー）
+    IGNORED_COLUMNS = ("id",)
+
+    _buffer: List[Tuple[Any, ...]] = []
+    _lock = threading.Lock()
+    _flush_lock = threading.Lock()
+    _wakeup = threading.Event()
+    _thread: Optional[threading.Thread] = None
+    _actor: Optional[str] = None
+    # (DBパス, 種別, 名称) -> ID
+    _name_ids: Dict[Tuple[str, str, str], int] = {}
+    _installed: set = set()
+
+    # ---- 記録 ----
+
+    @staticmethod
+    def snapshot(cursor: sqlite3.Cursor, table: str, where: str, params: Sequence[Any]) -> Dict[int, Dict[str, Any]]:
+        """条件に一致する行を {rowid: {列名: 値}} で返します（書き込みトランザクション内で呼び出す）"""
+        cursor.execute(f"SELECT rowid, * FROM {table} WHERE {where}", tuple(params))
+        columns = [d[0] for d in cursor.description][1:]
+        return {row[0]: dict(zip(columns, row[1:])) for row in cursor.fetchall()}
+
+    @classmethod
+    def actor(cls) -> str:
+        """操作者名（Windows のログインユーザー名@端末名）"""
+        if cls._actor is None:
+            try:
+                user = getpass.getuser()
+            except Exception:
+                user = "unknown"
+            cls._actor = f"{user}@{socket.gethostname()}"
+        return cls._actor
+
+    @classmethod
+    def record(cls, table: str, before: Dict[int, Dict[str, Any]], after: Dict[int, Dict[str, Any]]) -> int:
+        """
+        snapshot の前後を比べ、変更された列を記録待ちに追加します。追加した件数を返します。
+        before に無い行は追加 (I)、after に無い行は削除 (D) として全列を記録します。
+        """
+        if not cls.ENABLED:
+            return 0
+        now = int(time.time())
+        actor = cls.actor()
+        entries = []
+        for rowid in before.keys() | after.keys():
+            old_row, new_row = before.get(rowid), after.get(rowid)
+            op = "I" if old_row is None else "D" if new_row is None else "U"
+            source = new_row if new_row is not None else old_row
+            equipment_code = source.get("equipment_code")
+            for column in source:
+                if column in cls.IGNORED_COLUMNS:
+                    continue
+                old = None if old_row is None else old_row.get(column)
+                new = None if new_row is None else new_row.get(column)
+                if op == "U" and old == new:
+                    continue
+                if op != "U" and old is None and new is None:
+                    continue
+                entries.append((now, actor, table, rowid, equipment_code, column, op, old, new))
+        if entries:
+            with cls._lock:
+                cls._buffer.extend(entries)
+                pending = len(cls._buffer)
+            cls._start()
+            if pending >= cls.BATCH_SIZE:
+                cls._wakeup.set()
+        return len(entries)
+
+    @classmethod
+    def record_batch(cls, table: str, batch_id: int, changes: Dict[str, Any], row_count: int,
+                     undo: bool = False) -> None:
+        """
+        一括変更を1件の記録（操作 "B"。取り消しは undo=True で操作 "R"）として記録待ちに追加します。
+        行ID に一括変更の番号、列名に変更した列（カンマ区切り）、変更前に対象件数、変更後に変更内容 (JSON) を入れます。
+        取り消しの場合は、取り消した一括変更の変更内容を渡します（取り消し元の番号は bulk_edit_batch.undo_of）。
+        機器ごとの変更前の値は一括変更側のスナップショット (bulk_edit_row) に残ります。
+        """
+        if not cls.ENABLED:
+            return
+        entry = (int(time.time()), cls.actor(), table, batch_id, None, ",".join(changes), "R" if undo else "B",
+                 row_count, json.dumps(changes, ensure_ascii=False))
+        with cls._lock:
+            cls._buffer.append(entry)
+        cls._start()
+
+    @classmethod
+    def _start(cls) -> None:
+        if cls._thread is None:
+            cls._thread = threading.Thread(target=cls._run, name="audit-log", daemon=True)
+            cls._thread.start()
+            atexit.register(cls.flush)
+
+    @classmethod
+    def _run(cls) -> None:
+        while True:
+            cls._wakeup.wait(cls.FLUSH_INTERVAL_SEC)
+            cls._wakeup.clear()
+            try:
+                cls.flush()
+            except Exception as e:
+                print(f"[-] 監査ログの書き込みエラー: {e}")
+
+    @classmethod
+    def flush(cls) -> int:
+        """記録待ちの変更を1つのトランザクションでまとめて書き込み、件数を返します"""
+        with cls._flush_lock:
+            with cls._lock:
+                entries, cls._buffer = cls._buffer, []
+            if not entries:
+                return 0
+            try:
+                with DBManager.get_write_cursor() as cursor:
+                    cls._ensure_installed(cursor)
+                    path = DBManager.DB_NAME
+                    rows = [
+                        (ts, cls._name_id(cursor, path, "actor", actor), cls._name_id(cursor, path, "table", table),
+                         rowid, code, cls._name_id(cursor, path, "column", column), op, old, new)
+                        for ts, actor, table, rowid, code, column, op, old, new in entries
+                    ]
+                    cursor.executemany(
+                        f"INSERT INTO {cls.TABLE} (ts, actor_id, table_id, row_id, equipment_code, column_id, op,"
+                        f" old_value, new_value) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+            except Exception:
+                # 書き込めなかった分は次回に持ち越す（名称IDのキャッシュもロールバックに合わせて破棄）
+                with cls._lock:
+                    cls._buffer[:0] = entries
+                cls._name_ids.clear()
+                raise
+            return len(entries)
+
+    # ---- テーブル ----
+
+    @classmethod
+    def install(cls, cursor: sqlite3.Cursor) -> None:
+        """監査ログのテーブルと索引を作成します（作成済みなら何もしない）"""
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {cls.NAME_TABLE} (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                name TEXT NOT NULL,
+                UNIQUE (kind, name)
+            )
+        """)
+        # old_value / new_value は型指定なし（数値は数値のまま格納され、文字列化で大きくならない）
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {cls.TABLE} (
+                id INTEGER PRIMARY KEY,
+                ts INTEGER NOT NULL,
+                actor_id INTEGER NOT NULL,
+                table_id INTEGER NOT NULL,
+                row_id INTEGER NOT NULL,
+                equipment_code TEXT,
+                column_id INTEGER NOT NULL,
+                op TEXT NOT NULL,
+                old_value,
+                new_value
+            )
+        """)
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{cls.TABLE}_ts ON {cls.TABLE} (ts)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{cls.TABLE}_equipment ON {cls.TABLE} (equipment_code, ts)")
+
+    @classmethod
+    def _ensure_installed(cls, cursor: sqlite3.Cursor) -> None:
+        if DBManager.DB_NAME not in cls._installed:
+            cls.install(cursor)
+            cls._installed.add(DBManager.DB_NAME)
+
+    @classmethod
+    def _name_id(cls, cursor: sqlite3.Cursor, path: str, kind: str, name: str) -> int:
+        """操作者・テーブル名・列名の ID（未登録なら登録する）"""
+        key = (path, kind, name)
+        name_id = cls._name_ids.get(key)
+        if name_id is None:
+            cursor.execute(f"INSERT OR IGNORE INTO {cls.NAME_TABLE} (kind, name) VALUES (?, ?)", (kind, name))
+            cursor.execute(f"SELECT id FROM {cls.NAME_TABLE} WHERE kind = ? AND name = ?", (kind, name))
+            name_id = cls._name_ids[key] = cursor.fetchone()[0]
+        return name_id
+
+    # ---- 参照 ----
+
+    @classmethod
+    def history(
+        cls,
+        equipment_code: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[Any, ...]]:
+        """
+        監査ログを新しい順に返します（記録待ちの分も先に書き込む）。
+        行の並び: (日時 'YYYY-MM-DD HH:MM:SS', 操作者, テーブル, 行ID, 機器コード, 列名, 操作, 変更前, 変更後)
+        since / until は UNIX 秒で指定します。
+        """
+        cls.flush()
+        query = f"""
+            SELECT datetime(a.ts, 'unixepoch', 'localtime'), actor.name, tbl.name, a.row_id,
+                   a.equipment_code, col.name, a.op, a.old_value, a.new_value
+            FROM {cls.TABLE} a
+            JOIN {cls.NAME_TABLE} actor ON actor.id = a.actor_id
+            JOIN {cls.NAME_TABLE} tbl ON tbl.id = a.table_id
+            JOIN {cls.NAME_TABLE} col ON col.id = a.column_id
+            WHERE 1=1
+        """
+        params: List[Any] = []
+        if equipment_code:
+            query += " AND a.equipment_code = ?"
+            params.append(equipment_code)
+        if since is not None:
+            query += " AND a.ts >= ?"
+            params.append(int(since))
+        if until is not None:
+            query += " AND a.ts < ?"
+            params.append(int(until))
+        query += " ORDER BY a.ts DESC, a.id DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        try:
+            # 監査ログはローカル複製には無いため、共有DBから読む
+            with closing(DBManager.connect()) as conn:
+                return conn.execute(query, params).fetchall()
+        except sqlite3.OperationalError as e:
+            # 監査ログがまだ1件も書かれていない（テーブル未作成）
+            if "no such table" in str(e):
+                return []
+            raise
+
+    # ---- 保持期間・統合 ----
+
+    @classmethod
+    def compact(cls, retention_days: Optional[int] = None, merge_window_sec: Optional[int] = None) -> Dict[str, int]:
+        """
+        保持期間を過ぎた記録を削除し、同じ人が MERGE_WINDOW_SEC 以内に同じ列を続けて変更した更新記録を
+        1件（最初の変更前の値 → 最後の変更後の値）にまとめます。結果として値が変わっていない場合は削除します。
+        戻り値: {"expired": 削除件数, "merged": 統合で削除した件数}
+        """
+        cls.flush()
+        retention_days = cls.RETENTION_DAYS if retention_days is None else retention_days
+        window = cls.MERGE_WINDOW_SEC if merge_window_sec is None else merge_window_sec
+        now = int(time.time())
+        with DBManager.get_write_cursor() as cursor:
+            cls._ensure_installed(cursor)
+            cursor.execute(f"DELETE FROM {cls.TABLE} WHERE ts < ?", (now - retention_days * 86400,))
+            expired = cursor.rowcount
+
+            # 直近 window 秒の記録はまだ続きがあり得るため対象外
+            cursor.execute(f"""
+                SELECT id, ts, old_value, new_value,
+                       LAG(ts) OVER w AS prev_ts,
+                       table_id, row_id, column_id, actor_id
+                FROM {cls.TABLE}
+                WHERE op = 'U' AND ts < ?
+                WINDOW w AS (PARTITION BY table_id, row_id, column_id, actor_id ORDER BY ts, id)
+                ORDER BY table_id, row_id, column_id, actor_id, ts, id
+            """, (now - window,))
+            updates: List[Tuple[Any, Any, int]] = []
+            deletes: List[int] = []
+            chain: List[Tuple[Any, ...]] = []
+
+            def close_chain() -> None:
+                if len(chain) < 2:
+                    return
+                first, last = chain[0], chain[-1]
+                deletes.extend(row[0] for row in chain[1:])
+                if first[2] == last[3]:
+                    deletes.append(first[0])
+                else:
+                    updates.append((last[3], last[1], first[0]))
+
+            previous_key = None
+            for row in cursor.fetchall():
+                key = row[5:]
+                if key != previous_key or row[4] is None or row[1] - row[4] > window:
+                    close_chain()
+                    chain = []
+                chain.append(row)
+                previous_key = key
+            close_chain()
+
+            cursor.executemany(f"UPDATE {cls.TABLE} SET new_value = ?, ts = ? WHERE id = ?", updates)
+            cursor.executemany(f"DELETE FROM {cls.TABLE} WHERE id = ?", [(i,) for i in deletes])
+        return {"expired": expired, "merged": len(deletes)}
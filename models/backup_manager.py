@@ -0,0 +1,369 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .change_log import ChangeLog
+from .db_manager import DBManager
+from .replica_manager import ReplicaManager
+
+# 進捗の通知先: (コピー済みページ数, 全ページ数)
+ProgressCallback = Callable[[int, int], None]
+
+
+class BackupError(Exception):
+    """バックアップの作成・検証・復元に失敗した場合の例外"""
+
+
+class _BackupRestarted(Exception):
+    """コピー中に他端末の書き込みでバックアップが最初からやり直しになった"""
+
+
+class BackupManager:
+    """
+    sqlite3 のオンラインバックアップAPIによる、共有DBの世代バックアップと復元の管理クラス。
+
+    稼働中のDBファイルをそのままコピーすると、書き込み途中の内容が混ざった壊れたコピーになるおそれがあります。
+    ここではバックアップAPIで PAGES_PER_STEP ページずつコピーし、各ステップの間はロックを手放して
+    他端末の読み書きを妨げないようにします（途中で他端末が書き込むと、SQLite がコピーを最初からやり直します）。
+
+    1. ローカルの BACKUP_DIR に一時ファイルとしてコピー
+    2. コピーに PRAGMA integrity_check を実行して検証
+    3. gzip で圧縮し（compress が有効な場合）、内容の SHA-256 と添付PDFの一覧をマニフェスト (.json) に記録
+    4. 古い世代を削除して KEEP 世代だけ残す
+
+    マニフェストはバックアップが完了した時点で最後に書き込むため、マニフェストの無いファイルは作成途中とみなします。
+    start() で定期実行（INTERVAL_HOURS ごと）を開始できるほか、タスクスケジューラから
+    `python -m service.cli backup` を実行しても同じ処理になります。
+
+    config.json の設定例:
+        "backup": {"enabled": true, "dir": "D:\\\\EquipmentBackup", "keep": 14, "interval_hours": 24,
+                   "compress": true}
+    """
+
+    _settings: Dict[str, Any] = DBManager._config.get("backup", {})
+    ENABLED: bool = bool(_settings.get("enabled", False))
+    BACKUP_DIR: str = _settings.get(
+        "dir", os.path.join(os.path.expanduser("~"), ".equipment_management", "backups"))
+    KEEP: int = _settings.get("keep", 14)
+    INTERVAL_HOURS: float = _settings.get("interval_hours", 24)
+    COMPRESS: bool = bool(_settings.get("compress", True))
+    # 圧縮レベル（1〜9）。数百MBのDBでは 6 以上にしても縮小はわずかで、時間が2倍以上かかる
+    COMPRESS_LEVEL: int = _settings.get("compress_level", 3)
+    # 1ステップでコピーするページ数と、ステップ間で他端末にロックを譲る秒数
+    PAGES_PER_STEP: int = _settings.get("pages_per_step", 1024)
+    STEP_SLEEP_SEC: float = _settings.get("step_sleep_sec", 0.005)
+    # 書き込みが続いてコピーがこの回数やり直しになったら、1ステップでまとめてコピーする
+    # （その間は他端末の書き込みだけを待たせる。読み取りは妨げない）
+    MAX_RESTARTS: int = _settings.get("max_restarts", 3)
+    ATTACHMENT_DIR: str = _settings.get("attachment_dir", "attached_pdfs")
+
+    FILE_PREFIX = "equipment_management_"
+    CHECK_INTERVAL_SEC = 600
+    CHUNK_SIZE = 1024 * 1024
+
+    _lock = threading.Lock()
+    _thread: Optional[threading.Thread] = None
+    _stop = threading.Event()
+    _last_error: Optional[str] = None
+
+    # ========= 定期実行 =========
+    @classmethod
+    def start(cls) -> None:
+        """前回のバックアップから INTERVAL_HOURS 経過するごとに、バックグラウンドでバックアップを作成します"""
+        if cls._thread is not None:
+            return
+        cls._stop.clear()
+        cls._thread = threading.Thread(target=cls._run, name="db-backup", daemon=True)
+        cls._thread.start()
+
+    @classmethod
+    def stop(cls) -> None:
+        cls._stop.set()
+        cls._thread = None
+
+    @classmethod
+    def _run(cls) -> None:
+        # 起動直後の画面表示と競合しないよう、最初の確認は少し待ってから行う
+        delay = 60
+        while not cls._stop.wait(delay):
+            delay = cls.CHECK_INTERVAL_SEC
+            try:
+                latest = cls.list_backups()[:1]
+                if latest and time.time() - latest[0]["created_at"] < cls.INTERVAL_HOURS * 3600:
+                    continue
+                cls.backup()
+                cls.rotate()
+                cls._last_error = None
+            except Exception as e:
+                cls._last_error = str(e)
+                print(f"[-] 定期バックアップのエラー: {e}")
+
+    # ========= バックアップ =========
+    @classmethod
+    def backup(cls, backup_dir: Optional[str] = None, compress: Optional[bool] = None,
+               progress: Optional[ProgressCallback] = None, label: str = "") -> Dict[str, Any]:
+        """
+        共有DBのバックアップを作成し、マニフェストの内容（dict）を返します。
+        label を指定するとファイル名に付け加えます（復元前の退避など）。
+        """
+        backup_dir = backup_dir or cls.BACKUP_DIR
+        compress = cls.COMPRESS if compress is None else compress
+        os.makedirs(backup_dir, exist_ok=True)
+
+        with cls._lock:
+            name = cls.FILE_PREFIX + datetime.now().strftime("%Y%m%d_%H%M%S") + (f"_{label}" if label else "")
+            staging = os.path.join(backup_dir, name + ".db.tmp")
+            final = os.path.join(backup_dir, name + (".db.gz" if compress else ".db"))
+            timings: Dict[str, float] = {}
+            try:
+                start = time.perf_counter()
+                cls._copy(DBManager.DB_NAME, staging, progress)
+                timings["copy_sec"] = time.perf_counter() - start
+
+                start = time.perf_counter()
+                info = cls._verify_file(staging)
+                timings["verify_sec"] = time.perf_counter() - start
+
+                start = time.perf_counter()
+                if compress:
+                    digest = cls._compress(staging, final + ".tmp")
+                    os.replace(final + ".tmp", final)
+                    os.remove(staging)
+                else:
+                    digest = cls._sha256(staging)
+                    os.replace(staging, final)
+                timings["compress_sec"] = time.perf_counter() - start
+            except BaseException:
+                for path in (staging, final + ".tmp"):
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise
+
+            manifest = {
+                "file": os.path.basename(final),
+                "created_at": time.time(),
+                "source": os.path.abspath(DBManager.DB_NAME),
+                "compressed": compress,
+                "db_bytes": info["page_size"] * info["page_count"],
+                "file_bytes": os.path.getsize(final),
+                "page_size": info["page_size"],
+                "page_count": info["page_count"],
+                "sha256": digest,
+                "integrity": "ok",
+                "attachments": cls._attachment_manifest(),
+                "timings": timings,
+            }
+            with open(cls._manifest_path(final), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=1)
+            manifest["path"] = final
+            return manifest
+
+    @classmethod
+    def _copy(cls, source: str, target_path: str, progress: Optional[ProgressCallback]) -> None:
+        """
+        オンラインバックアップAPIで source を target_path へコピーします。
+        やり直しが MAX_RESTARTS 回を超えたら、残りは1ステップでまとめてコピーし直します。
+        """
+        src = DBManager.connect(source)
+        try:
+            try:
+                cls._copy_steps(src, target_path, cls.PAGES_PER_STEP, progress)
+            except _BackupRestarted:
+                cls._copy_steps(src, target_path, -1, progress)
+        finally:
+            src.close()
+
+    @classmethod
+    def _copy_steps(cls, src: sqlite3.Connection, target_path: str, pages: int,
+                    progress: Optional[ProgressCallback]) -> None:
+        if os.path.exists(target_path):
+            os.remove(target_path)
+        target = sqlite3.connect(target_path)
+        state = {"remaining": None, "restarts": 0}
+
+        def on_progress(status: int, remaining: int, total: int) -> None:
+            # 残りページ数が増えた = 他端末の書き込みでコピーが最初からやり直しになった
+            if state["remaining"] is not None and remaining > state["remaining"]:
+                state["restarts"] += 1
+                if state["restarts"] > cls.MAX_RESTARTS:
+                    raise _BackupRestarted()
+            state["remaining"] = remaining
+            if progress is not None:
+                progress(total - remaining, total)
+
+        try:
+            src.backup(target, pages=pages, progress=on_progress, sleep=cls.STEP_SLEEP_SEC)
+        finally:
+            target.close()
+
+    @staticmethod
+    def _verify_file(path: str) -> Dict[str, int]:
+        """DBファイルに integrity_check を実行し、ページサイズ・ページ数を返します（異常時は BackupError）"""
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            problems = [row[0] for row in conn.execute("PRAGMA integrity_check(10)")]
+            if problems != ["ok"]:
+                raise BackupError("整合性チェックに失敗しました: " + " / ".join(problems))
+            return {
+                "page_size": conn.execute("PRAGMA page_size").fetchone()[0],
+                "page_count": conn.execute("PRAGMA page_count").fetchone()[0],
+            }
+        except sqlite3.DatabaseError as e:
+            raise BackupError(f"DBファイルとして読み込めません: {e}") from e
+        finally:
+            conn.close()
+
+    @classmethod
+    def _compress(cls, source: str, target: str) -> str:
+        """source を gzip 圧縮して target に書き込み、元の内容の SHA-256 を返します"""
+        digest = hashlib.sha256()
+        with open(source, "rb") as fin, gzip.open(target, "wb", compresslevel=cls.COMPRESS_LEVEL) as fout:
+            for chunk in iter(lambda: fin.read(cls.CHUNK_SIZE), b""):
+                digest.update(chunk)
+                fout.write(chunk)
+        return digest.hexdigest()
+
+    @classmethod
+    def _sha256(cls, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(cls.CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @classmethod
+    def _attachment_manifest(cls) -> Dict[str, Any]:
+        """
+        添付PDF（DBの外にファイルとして保存）の一覧を記録します。
+        ファイル自体はコピーしませんが、復元後にどの添付が失われた・増えたかを照合できます。
+        """
+        files = []
+        total = 0
+        if os.path.isdir(cls.ATTACHMENT_DIR):
+            for dirpath, _, filenames in os.walk(cls.ATTACHMENT_DIR):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append([os.path.relpath(path, cls.ATTACHMENT_DIR), stat.st_size, int(stat.st_mtime)])
+                    total += stat.st_size
+        files.sort()
+        return {"count": len(files), "total_bytes": total, "files": files}
+
+    # ========= 世代管理 =========
+    @staticmethod
+    def _manifest_path(backup_path: str) -> str:
+        return backup_path + ".json"
+
+    @classmethod
+    def list_backups(cls, backup_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+        """完了しているバックアップのマニフェストを新しい順に返します（各要素に "path" を追加）"""
+        backup_dir = backup_dir or cls.BACKUP_DIR
+        if not os.path.isdir(backup_dir):
+            return []
+        backups = []
+        for filename in os.listdir(backup_dir):
+            if not (filename.startswith(cls.FILE_PREFIX) and filename.endswith(".json")):
+                continue
+            path = os.path.join(backup_dir, filename[:-len(".json")])
+            try:
+                with open(os.path.join(backup_dir, filename), "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[-] マニフェストの読み込みエラー: {filename}: {e}")
+                continue
+            if os.path.exists(path):
+                manifest["path"] = path
+                backups.append(manifest)
+        backups.sort(key=lambda m: m["created_at"], reverse=True)
+        return backups
+
+    @classmethod
+    def rotate(cls, keep: Optional[int] = None, backup_dir: Optional[str] = None) -> List[str]:
+        """新しい順に keep 世代を残して古いバックアップを削除し、削除したファイルのパスを返します"""
+        keep = cls.KEEP if keep is None else keep
+        removed = []
+        for manifest in cls.list_backups(backup_dir)[keep:]:
+            for path in (manifest["path"], cls._manifest_path(manifest["path"])):
+                try:
+                    os.remove(path)
+                    removed.append(path)
+                except OSError as e:
+                    print(f"[-] 古いバックアップの削除エラー: {path}: {e}")
+        return removed
+
+    # ========= 検証・復元 =========
+    @classmethod
+    def _load_manifest(cls, backup_path: str) -> Dict[str, Any]:
+        try:
+            with open(cls._manifest_path(backup_path), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise BackupError(f"マニフェストがありません（作成途中のバックアップの可能性があります）: {backup_path}")
+
+    @classmethod
+    def _extract(cls, backup_path: str) -> str:
+        """バックアップをローカルの一時ファイルに展開し、SHA-256 と整合性を検証してパスを返します"""
+        manifest = cls._load_manifest(backup_path)
+        fd, tmp_path = tempfile.mkstemp(suffix=".db", prefix="restore_")
+        try:
+            digest = hashlib.sha256()
+            opener = gzip.open if manifest.get("compressed") else open
+            with opener(backup_path, "rb") as fin, os.fdopen(fd, "wb") as fout:
+                for chunk in iter(lambda: fin.read(cls.CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    fout.write(chunk)
+            if digest.hexdigest() != manifest["sha256"]:
+                raise BackupError(f"バックアップの内容がマニフェストと一致しません: {backup_path}")
+            cls._verify_file(tmp_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return tmp_path
+
+    @classmethod
+    def verify(cls, backup_path: str) -> Dict[str, Any]:
+        """バックアップファイルを展開して検証し、マニフェストを返します（異常時は BackupError）"""
+        os.remove(cls._extract(backup_path))
+        return cls._load_manifest(backup_path)
+
+    @classmethod
+    def restore(cls, backup_path: str, progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """
+        バックアップの内容で共有DBを置き換え、復元前に退避したバックアップのマニフェストを返します。
+
+        ファイルの上書きではなくバックアップAPIで共有DBへ書き戻すため、他端末が開いたままでも
+        DBが壊れることはありません（書き戻しの間、他端末の読み書きは busy_timeout まで待たされます）。
+        ローカル複製を使っている場合は、復元後に複製を作り直します。
+        change_log の seq は復元前の最大値より先へ進め、置き換えの記録を追加します
+        （他端末の複製・変更検知は、その記録で複製の作り直し・全件の読み直しを行う）。
+        """
+        tmp_path = cls._extract(backup_path)
+        try:
+            saved = cls.backup(os.path.dirname(os.path.abspath(backup_path)), label="pre_restore")
+            src = sqlite3.connect(tmp_path)
+            target = DBManager.connect()
+            try:
+                floor_seq = ChangeLog.sequence(target)
+                src.backup(target, pages=-1, progress=(
+                    None if progress is None else lambda status, remaining, total: progress(total - remaining, total)))
+                ChangeLog.mark_reset(target, floor_seq)
+            finally:
+                target.close()
+                src.close()
+        finally:
+            os.remove(tmp_path)
+
+        # 使い回している読み取り接続は、次の読み取りで SQLite が変更を検知して読み直すため閉じなくてよい
+        if ReplicaManager.status()["active"]:
+            ReplicaManager.rebuild()
+        return saved
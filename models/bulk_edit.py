@@ -0,0 +1,198 @@
+import json
+import sqlite3
+import time
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .audit_log import AuditLog
+from .db_manager import DBManager
+from .events import ModelEvents
+
+
+class BulkEditError(Exception):
+    """一括変更の指定が不正な場合や、取り消せない場合の例外"""
+
+
+class EquipmentBulkEdit:
+    """
+    選択した複数の機器に、同じ項目の変更（部屋の移動・廃棄への変更など）を一括で適用するクラス。
+
+    - 対象の機器コードを一時テーブルに入れ、UPDATE ... WHERE equipment_code IN (SELECT ...) の1文で
+      1つのトランザクション内でまとめて更新します。
+    - 変更前の値は取り消し用のスナップショット（bulk_edit_row）に機器ごとに保存し、undo() で元に戻せます。
+    - 監査ログには行ごとではなく、一括変更1回につき1件（操作 "B"。取り消しは "R"）を記録します。
+      行ごとの変更前の値はスナップショットから参照できます。
+    """
+
+    BATCH_TABLE = "bulk_edit_batch"
+    ROW_TABLE = "bulk_edit_row"
+    TEMP_TABLE = "bulk_edit_codes"
+
+    # 一括変更できる equipment のカラム
+    COLUMNS = ("categorie_id", "statuse_id", "department_id", "room_id", "manufacturer_id", "celler_id", "remarks")
+
+    _installed: set = set()
+
+    @classmethod
+    def _ensure_installed(cls, cursor: sqlite3.Cursor) -> None:
+        if DBManager.DB_NAME in cls._installed:
+            return
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {cls.BATCH_TABLE} (
+                id INTEGER PRIMARY KEY,
+                ts INTEGER NOT NULL,
+                actor TEXT NOT NULL,
+                changes TEXT NOT NULL,
+                row_count INTEGER NOT NULL,
+                undo_of INTEGER,
+                undone_by INTEGER
+            )
+        """)
+        # 機器ごとの変更前の値（変更した列だけを JSON で保持）
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {cls.ROW_TABLE} (
+                batch_id INTEGER NOT NULL,
+                equipment_code TEXT NOT NULL,
+                old_values TEXT NOT NULL,
+                PRIMARY KEY (batch_id, equipment_code)
+            ) WITHOUT ROWID
+        """)
+        cls._installed.add(DBManager.DB_NAME)
+
+    @classmethod
+    def _fill_codes(cls, cursor: sqlite3.Cursor, equipment_codes: Sequence[str]) -> None:
+        """対象の機器コードを一時テーブルに入れる（IN 句のプレースホルダ数の上限を気にしなくてよい）"""
+        cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {cls.TEMP_TABLE} (code TEXT PRIMARY KEY)")
+        cursor.execute(f"DELETE FROM {cls.TEMP_TABLE}")
+        cursor.executemany(f"INSERT OR IGNORE INTO {cls.TEMP_TABLE} (code) VALUES (?)",
+                           [(str(code),) for code in equipment_codes])
+
+    @classmethod
+    def apply(cls, equipment_codes: Sequence[str], changes: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        機器コードの一覧に同じ変更 {カラム: 値} を適用し、結果を返します。
+            batch_id: 一括変更の番号（undo() に渡す）
+            updated: 値が実際に変わった機器の件数
+        値がすでに同じ機器は更新せず、スナップショットにも含めません。
+        """
+        unknown = set(changes) - set(cls.COLUMNS)
+        if unknown:
+            raise BulkEditError(f"一括変更できない項目です: {', '.join(sorted(unknown))}")
+        if not changes or not equipment_codes:
+            raise BulkEditError("変更する項目と対象の機器を指定してください")
+        columns = [col for col in cls.COLUMNS if col in changes]
+        new_values = [changes[col] for col in columns]
+        # 値が変わる行だけを対象にする（IS NOT で NULL との比較も正しく扱う）
+        differs = " OR ".join(f"{col} IS NOT ?" for col in columns)
+
+        with DBManager.get_write_cursor() as cursor:
+            cls._ensure_installed(cursor)
+            cls._fill_codes(cursor, equipment_codes)
+            target = f"equipment_code IN (SELECT code FROM {cls.TEMP_TABLE}) AND ({differs})"
+            cursor.execute(f"SELECT id, equipment_code, {', '.join(columns)} FROM equipment WHERE {target}",
+                           new_values)
+            before = cursor.fetchall()
+            if not before:
+                return {"batch_id": None, "updated": 0}
+
+            cursor.execute(
+                f"INSERT INTO {cls.BATCH_TABLE} (ts, actor, changes, row_count) VALUES (?, ?, ?, ?)",
+                (int(time.time()), AuditLog.actor(), json.dumps(changes, ensure_ascii=False), len(before)),
+            )
+            batch_id = cursor.lastrowid
+            cursor.executemany(
+                f"INSERT INTO {cls.ROW_TABLE} (batch_id, equipment_code, old_values) VALUES (?, ?, ?)",
+                [(batch_id, row[1], json.dumps(dict(zip(columns, row[2:])), ensure_ascii=False)) for row in before],
+            )
+            set_clause = ", ".join(f"{col} = ?" for col in columns)
+            cursor.execute(f"UPDATE equipment SET {set_clause} WHERE {target}", new_values + new_values)
+
+        AuditLog.record_batch("equipment", batch_id, changes, len(before))
+        ModelEvents.publish("equipment", {
+            "action": "update",
+            "row_ids": [row[0] for row in before],
+            "equipment_codes": [row[1] for row in before],
+        })
+        return {"batch_id": batch_id, "updated": len(before)}
+
+    @classmethod
+    def undo(cls, batch_id: int) -> Dict[str, Any]:
+        """
+        一括変更を取り消し、スナップショットの値に戻します。
+        一括変更の後に別の操作で値が変えられた機器は上書きせず、skipped に機器コードを返します。
+            batch_id: 取り消しとして記録した一括変更の番号
+            restored: 元に戻した件数 / skipped: 戻さなかった機器コード
+        """
+        with DBManager.get_write_cursor() as cursor:
+            cls._ensure_installed(cursor)
+            cursor.execute(f"SELECT changes, undo_of, undone_by FROM {cls.BATCH_TABLE} WHERE id = ?", (batch_id,))
+            batch = cursor.fetchone()
+            if batch is None:
+                raise BulkEditError(f"一括変更 {batch_id} は見つかりません")
+            if batch[1] is not None or batch[2] is not None:
+                raise BulkEditError(f"一括変更 {batch_id} は取り消し済み、または取り消しの記録です")
+            changes = json.loads(batch[0])
+            columns = [col for col in cls.COLUMNS if col in changes]
+
+            cursor.execute(f"SELECT equipment_code, old_values FROM {cls.ROW_TABLE} WHERE batch_id = ?", (batch_id,))
+            # bulk_edit_row の機器コードは TEXT のため、equipment_code が INTEGER のDBでも文字列で突き合わせる
+            snapshot = {str(code): json.loads(old) for code, old in cursor.fetchall()}
+            cls._fill_codes(cursor, list(snapshot))
+            cursor.execute(
+                f"SELECT id, equipment_code, {', '.join(columns)} FROM equipment"
+                f" WHERE equipment_code IN (SELECT code FROM {cls.TEMP_TABLE})"
+            )
+            restore: List[Tuple[int, str]] = []
+            skipped: List[str] = []
+            for row in cursor.fetchall():
+                current = dict(zip(columns, row[2:]))
+                if current == {col: changes[col] for col in columns}:
+                    restore.append((row[0], row[1]))
+                else:
+                    skipped.append(str(row[1]))
+
+            cursor.execute(
+                f"INSERT INTO {cls.BATCH_TABLE} (ts, actor, changes, row_count, undo_of) VALUES (?, ?, ?, ?, ?)",
+                (int(time.time()), AuditLog.actor(), batch[0], len(restore), batch_id),
+            )
+            undo_id = cursor.lastrowid
+            set_clause = ", ".join(f"{col} = ?" for col in columns)
+            cursor.executemany(
+                f"UPDATE equipment SET {set_clause} WHERE id = ?",
+                [[snapshot[str(code)][col] for col in columns] + [row_id] for row_id, code in restore],
+            )
+            cursor.execute(f"UPDATE {cls.BATCH_TABLE} SET undone_by = ? WHERE id = ?", (undo_id, batch_id))
+
+        AuditLog.record_batch("equipment", undo_id, changes, len(restore), undo=True)
+        if restore:
+            ModelEvents.publish("equipment", {
+                "action": "update",
+                "row_ids": [row_id for row_id, _ in restore],
+                "equipment_codes": [code for _, code in restore],
+            })
+        return {"batch_id": undo_id, "restored": len(restore), "skipped": skipped}
+
+    @classmethod
+    def recent_batches(cls, limit: int = 20, actor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """取り消し可能な一括変更を新しい順に返します（actor を指定するとその操作者の分だけ）"""
+        query = (f"SELECT id, ts, actor, changes, row_count FROM {cls.BATCH_TABLE}"
+                 f" WHERE undo_of IS NULL AND undone_by IS NULL")
+        params: List[Any] = []
+        if actor:
+            query += " AND actor = ?"
+            params.append(actor)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        try:
+            # 一括変更の記録はローカル複製には無いため、共有DBから読む
+            with closing(DBManager.connect()) as conn:
+                rows = conn.execute(query, params).fetchall()
+        except sqlite3.OperationalError as e:
+            # 一括変更がまだ1度も行われていない（テーブル未作成）
+            if "no such table" in str(e):
+                return []
+            raise
+        return [
+            {"batch_id": row[0], "ts": row[1], "actor": row[2], "changes": json.loads(row[3]), "row_count": row[4]}
+            for row in rows
+        ]
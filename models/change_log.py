@@ -0,0 +1,158 @@
+import sqlite3
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class ChangeLog:
+    """
+    equipment・repair・各マスタテーブルの変更を、トリガーで change_log テーブルへ記録する仕組み。
+    ローカル複製の差分同期や、他端末での変更検知に使います。
+
+    change_log には「どのテーブルのどの行 (rowid) が、挿入/更新/削除されたか」だけを記録し、
+    行の内容は必要になった時点で元テーブルから読み直します。
+    """
+
+    TABLE = "change_log"
+
+    TRACKED_TABLES = (
+        "equipment", "repair",
+        "categorie_master", "statuse_master", "department_master", "room_master",
+        "manufacturer_master", "celler_master",
+        "repair_type_master", "repair_status_master", "repair_statuse_master",
+    )
+
+    # 共有DBを丸ごと置き換えた（バックアップからの復元）ことを示す記録の table_name / op
+    RESET_TABLE = "*"
+    RESET_OP = "R"
+
+    @classmethod
+    def _trigger_names(cls, table: str) -> List[Tuple[str, str, str]]:
+        """(トリガー名, タイミング, 記録する rowid の式) のリスト"""
+        return [
+            (f"trg_{table}_change_insert", "INSERT", "NEW.rowid"),
+            (f"trg_{table}_change_update", "UPDATE", "NEW.rowid"),
+            (f"trg_{table}_change_delete", "DELETE", "OLD.rowid"),
+        ]
+
+    @classmethod
+    def existing_tables(cls, conn: sqlite3.Connection) -> List[str]:
+        """TRACKED_TABLES のうち、DBに実在するテーブル名を返します"""
+        rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+        names = {row[0] for row in rows}
+        return [table for table in cls.TRACKED_TABLES if table in names]
+
+    @classmethod
+    def install(cls, conn: sqlite3.Connection) -> None:
+        """change_log テーブルとトリガーを作成します（作成済みなら何もしない）"""
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {cls.TABLE} (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                op TEXT NOT NULL,
+                changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        for table in cls.existing_tables(conn):
+            for trigger, op, rowid_expr in cls._trigger_names(table):
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {trigger}
+                    AFTER {op} ON {table}
+                    BEGIN
+                        INSERT INTO {cls.TABLE} (table_name, row_id, op)
+                        VALUES ('{table}', {rowid_expr}, '{op[0]}');
+                    END
+                """)
+        cls.install_table_index(conn)
+        conn.commit()
+
+    @classmethod
+    def install_table_index(cls, conn: sqlite3.Connection) -> None:
+        """テーブルごとの最新 seq（latest_seqs）を索引だけで求められるようにする"""
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{cls.TABLE}_table_seq ON {cls.TABLE} (table_name, seq)")
+
+    @classmethod
+    def uninstall_triggers(cls, conn: sqlite3.Connection) -> None:
+        """トリガーを削除します（ローカル複製側で変更を二重に記録しないため）"""
+        for table in cls.TRACKED_TABLES:
+            for trigger, _, _ in cls._trigger_names(table):
+                conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        conn.commit()
+
+    @classmethod
+    def is_installed(cls, conn: sqlite3.Connection) -> bool:
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (cls.TABLE,)
+        ).fetchone()
+        return row is not None
+
+    @classmethod
+    def bounds(cls, conn: sqlite3.Connection) -> Tuple[Optional[int], Optional[int]]:
+        """記録されている最小・最大の seq を返します（空なら (None, None)）"""
+        return conn.execute(f"SELECT MIN(seq), MAX(seq) FROM {cls.TABLE}").fetchone()
+
+    @classmethod
+    def latest_seqs(cls, conn: sqlite3.Connection, tables: Sequence[str]) -> Dict[str, int]:
+        """
+        テーブルごとの最新の変更 seq を返します（記録が無いテーブルは 0）。
+        値が同じであれば、その間にそのテーブルは変更されていません。
+        """
+        return {
+            table: conn.execute(f"SELECT MAX(seq) FROM {cls.TABLE} WHERE table_name = ?", (table,)).fetchone()[0] or 0
+            for table in tables
+        }
+
+    @classmethod
+    def changed_row_ids(cls, conn: sqlite3.Connection, table: str, last_seq: int) -> List[int]:
+        """last_seq より後に変更（挿入・更新・削除）された table の rowid を返します（索引だけで求める）"""
+        rows = conn.execute(
+            f"SELECT DISTINCT row_id FROM {cls.TABLE} WHERE table_name = ? AND seq > ?", (table, last_seq)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    @classmethod
+    def sequence(cls, conn: sqlite3.Connection) -> int:
+        """これまでに採番された最大の seq を返します（削除済みの記録も含む。change_log の無いDBでは 0）"""
+        if not cls.is_installed(conn):
+            return 0
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (cls.TABLE,)).fetchone()
+        return max(row[0] if row else 0, cls.bounds(conn)[1] or 0)
+
+    @classmethod
+    def mark_reset(cls, conn: sqlite3.Connection, floor_seq: int) -> int:
+        """
+        共有DBを置き換えた後に呼び、seq を置き換え前の最大値 floor_seq より先へ進めてから
+        置き換えの記録（RESET_OP）を1行追加し、その seq を返します。
+        置き換えで seq が戻ると、取り込み済みの seq を持つ複製・変更検知がそれ以降の変更を読み飛ばすため。
+        """
+        # 置き換え後のDBに change_log が無い場合も、ここで作成する
+        cls.install(conn)
+        cursor = conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (floor_seq, cls.TABLE))
+        if cursor.rowcount == 0:
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (cls.TABLE, floor_seq))
+        cursor = conn.execute(
+            f"INSERT INTO {cls.TABLE} (table_name, row_id, op) VALUES (?, 0, ?)", (cls.RESET_TABLE, cls.RESET_OP)
+        )
+        conn.commit()
+        return cursor.lastrowid
+
+    @classmethod
+    def fetch_since(cls, conn: sqlite3.Connection, last_seq: int, limit: int = 5000) -> List[Tuple[int, str, int, str]]:
+        """last_seq より後の変更を (seq, table_name, row_id, op) の昇順で返します"""
+        return conn.execute(
+            f"SELECT seq, table_name, row_id, op FROM {cls.TABLE} WHERE seq > ? ORDER BY seq LIMIT ?",
+            (last_seq, limit),
+        ).fetchall()
+
+    @classmethod
+    def prune(cls, conn: sqlite3.Connection, keep_days: int = 30) -> int:
+        """
+        指定日数より古い変更記録を削除し、削除件数を返します。
+        テーブルごとの最新の記録は残します（latest_seqs が 0 に戻ると、その後の変更を見落とす版と一致しうるため）。
+        """
+        cursor = conn.execute(
+            f"DELETE FROM {cls.TABLE} WHERE changed_at < datetime('now', ?)"
+            f" AND seq NOT IN (SELECT MAX(seq) FROM {cls.TABLE} GROUP BY table_name)",
+            (f"-{int(keep_days)} days",),
+        )
+        conn.commit()
+        return cursor.rowcount
@@ -0,0 +1,145 @@
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+from .change_log import ChangeLog
+from .db_manager import DBManager
+from .events import ModelEvents
+from .replica_manager import ReplicaManager
+
+
+class ChangeWatcher:
+    """
+    他端末による共有DBの変更を検知し、ModelEvents へ配信するクラス。
+
+    常駐の接続で PRAGMA data_version を確認し（他の接続がコミットした場合だけ値が変わる）、
+    変化があったときだけ change_log を読み、テーブルごとにまとめて通知します。
+    画面からは poll() を after() で定期的に呼び出すため、購読者の処理は画面スレッドで実行されます。
+    """
+
+    POLL_INTERVAL_MS = 2000
+    # change_log を1回に読む件数
+    FETCH_LIMIT = 5000
+
+    # change_log のテーブル名 -> ModelEvents のトピック
+    TOPICS = {"equipment": "equipment", "repair": "repair"}
+
+    _conn: Optional[sqlite3.Connection] = None
+    _data_version: Optional[int] = None
+    _last_seq: Optional[int] = None
+
+    @classmethod
+    def _connection(cls) -> sqlite3.Connection:
+        """data_version を比較するための常駐接続（初回接続時の change_log の最新 seq を起点にする）"""
+        if cls._conn is None:
+            conn = DBManager.connect()
+            if not ChangeLog.is_installed(conn):
+                ChangeLog.install(conn)
+            if cls._last_seq is None:
+                cls._last_seq = ChangeLog.bounds(conn)[1] or 0
+            cls._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            cls._conn = conn
+        return cls._conn
+
+    @classmethod
+    def poll(cls) -> int:
+        """
+        変更があれば通知し、取り込んだ変更件数を返します。
+        変更が無い場合は PRAGMA data_version を1回実行するだけで終わります。
+        """
+        try:
+            conn = cls._connection()
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == cls._data_version:
+                return 0
+            cls._data_version = version
+
+            # 共有DBが置き換えられて seq が戻っている（復元の記録の無いDB）場合は、そこから読み直す
+            max_seq = ChangeLog.bounds(conn)[1] or 0
+            reset = max_seq < cls._last_seq
+            if reset:
+                cls._last_seq = max_seq
+
+            # 1回の取得は FETCH_LIMIT 件までのため、未読が無くなるまで続けて読む
+            # （data_version は更新済みのため、ここで読み残すと次のコミットまで通知されない）
+            changes: List[Tuple[int, str, int, str]] = []
+            while True:
+                batch = ChangeLog.fetch_since(conn, cls._last_seq, cls.FETCH_LIMIT)
+                if batch:
+                    changes.extend(batch)
+                    cls._last_seq = batch[-1][0]
+                if len(batch) < cls.FETCH_LIMIT:
+                    break
+            reset = reset or any(op == ChangeLog.RESET_OP for _, _, _, op in changes)
+            if not changes and not reset:
+                return 0
+        except sqlite3.Error as e:
+            print(f"[-] 変更検知エラー: {e}")
+            cls.close()
+            return 0
+
+        # ローカル複製を読んでいる場合は、購読者が読み直す前に複製を追いつかせる
+        if ReplicaManager.status()["active"]:
+            try:
+                ReplicaManager.catch_up()
+            except Exception as e:
+                print(f"[-] ローカル複製の同期エラー: {e}")
+
+        if reset:
+            # 変更された行を特定できないため、テーブルを指定せずに通知して全体を読み直させる
+            for topic in ("equipment", "repair", "master"):
+                ModelEvents.publish(topic, {"action": "reset", "source": "remote"})
+        else:
+            cls._dispatch(conn, changes)
+        return len(changes)
+
+    @classmethod
+    def _dispatch(cls, conn: sqlite3.Connection, changes: List[Tuple[int, str, int, str]]) -> None:
+        """テーブルごとに変更をまとめ、影響する機器コードを添えて通知する"""
+        by_table: Dict[str, Dict[int, str]] = {}
+        for _, table, row_id, op in changes:
+            # 同じ行への複数回の変更は最後の操作だけを残す
+            by_table.setdefault(table, {})[row_id] = op
+
+        for table, ops in by_table.items():
+            row_ids = list(ops)
+            payload: Dict[str, Any] = {
+                "action": "change",
+                "source": "remote",
+                "table": table,
+                "row_ids": row_ids,
+                "deleted_ids": [row_id for row_id, op in ops.items() if op == "D"],
+            }
+            topic = cls.TOPICS.get(table, "master")
+            try:
+                if table in ("equipment", "repair") and not payload["deleted_ids"]:
+                    # 削除を含まなければ、影響する機器コードを特定してキャッシュの破棄範囲を絞る
+                    payload["equipment_codes"], payload["request_dates"] = cls._affected(conn, table, row_ids)
+            except sqlite3.Error as e:
+                print(f"[-] 変更内容の取得エラー ({table}): {e}")
+            ModelEvents.publish(topic, payload)
+
+    @staticmethod
+    def _affected(conn: sqlite3.Connection, table: str, row_ids: List[int]) -> Tuple[List[Any], List[Any]]:
+        """変更行の機器コード（修理の場合は依頼日も）を取得する"""
+        placeholders = ", ".join("?" * len(row_ids))
+        if table == "repair":
+            rows = conn.execute(
+                f"SELECT equipment_code, request_date FROM repair WHERE rowid IN ({placeholders})", row_ids
+            ).fetchall()
+            # 依頼日が変更された場合の変更前の日付は分からないため、日付による絞り込みは行わない
+            return sorted({row[0] for row in rows}), [None]
+        rows = conn.execute(
+            f"SELECT equipment_code FROM equipment WHERE rowid IN ({placeholders})", row_ids
+        ).fetchall()
+        return sorted({row[0] for row in rows}), []
+
+    @classmethod
+    def close(cls) -> None:
+        """常駐接続を閉じます（次回の poll で再接続）"""
+        if cls._conn is not None:
+            try:
+                cls._conn.close()
+            except sqlite3.Error:
+                pass
+        cls._conn = None
+        cls._data_version = None
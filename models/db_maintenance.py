@@ -0,0 +1,347 @@
+import json
+import socket
+import sqlite3
+import statistics
+import threading
+import time
+from contextlib import closing
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .change_log import ChangeLog
+from .db_manager import DBManager
+from .equipment_model import EquipmentModel
+from .master_model import MasterModel
+from .repair_model import RepairModel
+
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+
+class DBMaintenance:
+    """
+    共有DBの保守処理（統計情報の更新・空き領域の回収・整合性チェック）をまとめたクラス。
+
+    - analyze(): 統計情報が無ければ ANALYZE、あれば PRAGMA optimize で古くなった表だけ更新します。
+      検索の実行計画（どの索引を使うか）は sqlite_stat1 の統計情報をもとに選ばれます。
+    - incremental_vacuum(): 修理の編集・削除で生じた空きページをファイル末尾から切り詰めます。
+      auto_vacuum = INCREMENTAL のDBでのみ有効なため、既存のDBは enable_incremental_vacuum() で一度だけ移行します。
+    - quick_check(): PRAGMA quick_check（索引と表の内容の照合を省いた軽い整合性チェック）
+    - prune_change_log(): CHANGE_LOG_KEEP_DAYS 日より古い change_log の記録を削除します。
+      ローカル複製・変更検知・保存した検索・重複検出は change_log を差分で読むため、保持期間はそれらが
+      止まっている期間より十分長くします（削除済みの範囲に及んだ場合は、複製の全件コピー・全件照合になる）。
+    - run(): 上記を順に実行し、前後のページ統計と標準的な検索の所要時間を比較した結果を返します。
+      結果は maintenance_log に記録し、他端末も含めて INTERVAL_HOURS に1回だけ実行されるようにします
+      （run_in_background() は実行前に書き込みトランザクション内で maintenance_log に行を追加して実行枠を確保するため、
+      複数の端末が同時に待機状態になっても実行するのは1台だけです）。
+
+    CLI (`python -m service.cli maintenance`) のほか、画面が IDLE_MINUTES 分操作されていないときに
+    バックグラウンドで run_in_background() が呼ばれます。
+
+    config.json の設定例:
+        "maintenance": {"enabled": true, "idle_minutes": 10, "interval_hours": 24, "vacuum_pages": 5000,
+                        "change_log_keep_days": 30}
+    """
+
+    LOG_TABLE = "maintenance_log"
+
+    _settings: Dict[str, Any] = DBManager._config.get("maintenance", {})
+    ENABLED: bool = bool(_settings.get("enabled", True))
+    IDLE_MINUTES: float = _settings.get("idle_minutes", 10)
+    INTERVAL_HOURS: float = _settings.get("interval_hours", 24)
+    # 1回の incremental_vacuum で回収する最大ページ数（0 なら全部）。書き込みロックを長く持たないため
+    VACUUM_PAGES: int = _settings.get("vacuum_pages", 5000)
+    # ANALYZE で1つの索引あたりに調べる行数の上限（0 なら全行）。大きな表でも数秒で終わる
+    ANALYSIS_LIMIT: int = _settings.get("analysis_limit", 1000)
+    # change_log の保持日数（0 なら削除しない）
+    CHANGE_LOG_KEEP_DAYS: int = _settings.get("change_log_keep_days", 30)
+    BENCHMARK_REPEAT = 5
+
+    _lock = threading.Lock()
+    _installed: set = set()
+
+    # ========= 統計 =========
+    @classmethod
+    def stats(cls, tables: bool = False) -> Dict[str, Any]:
+        """
+        ページ数・空きページ数などのファイル統計を返します。
+        tables=True の場合は表・索引ごとのページ数も返します（dbstat が使えるDBのみ。全ページを読むため遅い）。
+        ローカル複製を使っている場合も、共有DBのファイルを調べます。
+        """
+        with closing(DBManager.connect()) as conn:
+            cursor = conn.cursor()
+
+            def pragma(name: str) -> Any:
+                return cursor.execute(f"PRAGMA {name}").fetchone()[0]
+
+            page_size = pragma("page_size")
+            page_count = pragma("page_count")
+            freelist = pragma("freelist_count")
+            result = {
+                "page_size": page_size,
+                "page_count": page_count,
+                "freelist_count": freelist,
+                "freelist_ratio": freelist / page_count if page_count else 0.0,
+                "db_bytes": page_size * page_count,
+                "auto_vacuum": AUTO_VACUUM_MODES.get(pragma("auto_vacuum"), "unknown"),
+                "journal_mode": pragma("journal_mode"),
+                "analyzed": cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone() is not None,
+            }
+            if tables:
+                try:
+                    # unused: ページ内の未使用バイト数（大きいほど断片化している）
+                    cursor.execute("""
+                        SELECT name, COUNT(*), SUM(unused) FROM dbstat
+                        GROUP BY name ORDER BY COUNT(*) DESC
+                    """)
+                    result["tables"] = [
+                        {"name": name, "pages": pages, "unused_ratio": unused / (pages * page_size)}
+                        for name, pages, unused in cursor.fetchall()
+                    ]
+                except sqlite3.OperationalError:
+                    result["tables"] = None
+        return result
+
+    # ========= 保守処理 =========
+    @classmethod
+    def quick_check(cls) -> List[str]:
+        """整合性チェックで見つかった問題の一覧を返します（正常なら空のリスト）"""
+        with closing(DBManager.connect()) as conn:
+            problems = [row[0] for row in conn.execute("PRAGMA quick_check(20)")]
+        return [] if problems == ["ok"] else problems
+
+    @classmethod
+    def analyze(cls, full: bool = False) -> str:
+        """統計情報を更新し、実行した処理（"ANALYZE" / "optimize"）を返します"""
+        with DBManager.get_write_cursor() as cursor:
+            analyzed = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone() is not None
+            cursor.execute(f"PRAGMA analysis_limit = {int(cls.ANALYSIS_LIMIT)}")
+            if full or not analyzed:
+                cursor.execute("ANALYZE")
+                return "ANALYZE"
+            cursor.execute("PRAGMA optimize")
+            return "optimize"
+
+    @classmethod
+    def incremental_vacuum(cls, max_pages: Optional[int] = None) -> int:
+        """空きページを最大 max_pages ページ回収し、回収したページ数を返します（INCREMENTAL 以外のDBでは 0）"""
+        max_pages = cls.VACUUM_PAGES if max_pages is None else max_pages
+        with DBManager.get_write_cursor() as cursor:
+            if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                return 0
+            before = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+            # incremental_vacuum は1ステップで1ページ回収するが、sqlite3 モジュールは結果列の無い文を
+            # 1回しかステップしないため、回収したいページ数だけ実行する（文キャッシュが効くので軽い）
+            pages = before if max_pages <= 0 else min(before, max_pages)
+            for _ in range(pages):
+                cursor.execute("PRAGMA incremental_vacuum")
+            return before - cursor.execute("PRAGMA freelist_count").fetchone()[0]
+
+    @classmethod
+    def prune_change_log(cls, keep_days: Optional[int] = None) -> int:
+        """保持日数より古い change_log の記録を削除し、削除件数を返します（change_log の無いDB・保持日数 0 では 0）"""
+        keep_days = cls.CHANGE_LOG_KEEP_DAYS if keep_days is None else keep_days
+        if keep_days <= 0:
+            return 0
+        with closing(DBManager.connect()) as conn:
+            if not ChangeLog.is_installed(conn):
+                return 0
+            return ChangeLog.prune(conn, keep_days)
+
+    @classmethod
+    def enable_incremental_vacuum(cls) -> bool:
+        """
+        auto_vacuum を INCREMENTAL に切り替えます（移行済みなら何もせず False）。
+        切り替えには VACUUM によるファイル全体の書き直しが必要で、その間は他端末から読み書きできません。
+        必ず利用者のいない時間帯に、バックアップを取ってから実行してください。
+        """
+        conn = DBManager.connect()
+        try:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                return False
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            return True
+        finally:
+            conn.close()
+
+    # ========= 検索の所要時間 =========
+    @classmethod
+    def benchmark_queries(cls, repeat: Optional[int] = None) -> Dict[str, float]:
+        """画面で使う標準的な検索の所要時間（repeat 回の中央値、秒）を返します"""
+        repeat = repeat or cls.BENCHMARK_REPEAT
+        with DBManager.get_cursor() as cursor:
+            sample = cursor.execute(
+                "SELECT equipment_code, name, department_id FROM equipment ORDER BY id LIMIT 1 "
+                "OFFSET (SELECT COUNT(*) / 2 FROM equipment)").fetchone()
+        if sample is None:
+            return {}
+        code, name, department_id = sample
+        queries: List[Tuple[str, Callable[[], Any]]] = [
+            ("機器の全件検索", lambda: EquipmentModel.search_equipments()),
+            ("部門で絞り込み", lambda: EquipmentModel.search_equipments(department_id=department_id)),
+            ("機器名の部分一致", lambda: EquipmentModel.search_equipments(name=(name or "")[:2])),
+            ("器材番号で検索", lambda: EquipmentModel.search_equipments(equipment_code=code)),
+            ("機器詳細", lambda: RepairModel.get_equipment_detail_by_code(code)),
+            ("修理履歴", lambda: RepairModel.get_history_by_equipment(code)),
+            ("マスタ一覧", lambda: MasterModel.fetch_all("manufacturer_master")),
+        ]
+        timings = {}
+        for label, query in queries:
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                query()
+                samples.append(time.perf_counter() - start)
+            timings[label] = statistics.median(samples)
+        return timings
+
+    # ========= 一括実行 =========
+    @classmethod
+    def run(cls, analyze: bool = True, vacuum: bool = True, check: bool = True, benchmark: bool = True,
+            full_analyze: bool = False, prune: bool = True,
+            progress: Optional[Callable[[str], None]] = None, log_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        保守処理を順に実行し、結果を返して maintenance_log に記録します
+        （log_id を指定すると、_claim() で確保した行を結果で書き換える）。
+            steps: 各処理の所要時間（秒）と結果
+            before / after: 実行前後の stats()
+            timings_before / timings_after: 実行前後の benchmark_queries()
+            problems: quick_check で見つかった問題
+        """
+        notify = progress or (lambda message: None)
+        with cls._lock:
+            started = time.time()
+            report: Dict[str, Any] = {"steps": {}, "problems": []}
+            report["before"] = cls.stats()
+            if benchmark:
+                notify("検索の所要時間を計測中（実行前）")
+                report["timings_before"] = cls.benchmark_queries()
+
+            def step(name: str, func: Callable[[], Any]) -> None:
+                notify(f"{name} を実行中")
+                start = time.perf_counter()
+                value = func()
+                report["steps"][name] = {"seconds": time.perf_counter() - start, "result": value}
+
+            if check:
+                step("quick_check", cls.quick_check)
+                report["problems"] = report["steps"]["quick_check"]["result"]
+            if prune:
+                # 削除で空いたページは続く incremental_vacuum で回収する
+                step("prune_change_log", cls.prune_change_log)
+            if analyze:
+                step("analyze", lambda: cls.analyze(full_analyze))
+            if vacuum:
+                step("incremental_vacuum", cls.incremental_vacuum)
+
+            report["after"] = cls.stats()
+            if benchmark:
+                notify("検索の所要時間を計測中（実行後）")
+                report["timings_after"] = cls.benchmark_queries()
+            report["duration_sec"] = time.time() - started
+            cls._write_log(started, report, log_id)
+            return report
+
+    @classmethod
+    def is_due(cls) -> bool:
+        """前回の実行（他端末を含む）から INTERVAL_HOURS 以上経過しているか"""
+        last = cls.last_run()
+        return last is None or time.time() - last >= cls.INTERVAL_HOURS * 3600
+
+    @classmethod
+    def _claim(cls) -> Optional[int]:
+        """
+        実行時期になっていれば、maintenance_log に実行中の行を追加して実行枠を確保し、その行の ID を返します。
+        確認と追加を1つの書き込みトランザクション (BEGIN IMMEDIATE) で行うため、他端末と同時に確保されることはありません。
+        実行時期前（他端末が確保済みの場合を含む）は None を返します。
+        """
+        with DBManager.get_write_cursor() as cursor:
+            cls._ensure_installed(cursor)
+            last = cursor.execute(f"SELECT MAX(ts) FROM {cls.LOG_TABLE}").fetchone()[0]
+            now = time.time()
+            if last is not None and now - last < cls.INTERVAL_HOURS * 3600:
+                return None
+            cursor.execute(
+                f"INSERT INTO {cls.LOG_TABLE} (ts, host, duration, report) VALUES (?, ?, 0, ?)",
+                (int(now), socket.gethostname(), json.dumps({"status": "running"})),
+            )
+            return cursor.lastrowid
+
+    @classmethod
+    def run_in_background(cls) -> bool:
+        """
+        実行時期になっていれば、実行枠を確保して別スレッドで run() を開始します（画面の待機中に呼ぶ）。
+        実行中・実行時期前の場合は何もせず False を返します。
+        """
+        if not cls.ENABLED or cls._lock.locked():
+            return False
+        try:
+            # 書き込みロックを取らずに済むよう、明らかに実行時期前であれば確保を試みない
+            if not cls.is_due():
+                return False
+            log_id = cls._claim()
+        except sqlite3.Error as e:
+            print(f"[-] 保守処理の実行時期の確認エラー: {e}")
+            return False
+        if log_id is None:
+            return False
+
+        def work() -> None:
+            try:
+                report = cls.run(log_id=log_id)
+                if report["problems"]:
+                    print(f"[-] 整合性チェックで問題が見つかりました: {report['problems']}")
+            except Exception as e:
+                print(f"[-] 保守処理エラー: {e}")
+                # 確保した行に失敗を記録する（次の実行は INTERVAL_HOURS 後）
+                try:
+                    cls._write_log(time.time(), {"error": str(e), "duration_sec": 0.0}, log_id)
+                except sqlite3.Error as log_error:
+                    print(f"[-] 保守処理の実行記録エラー: {log_error}")
+
+        threading.Thread(target=work, name="db-maintenance", daemon=True).start()
+        return True
+
+    # ========= 実行記録 =========
+    @classmethod
+    def _ensure_installed(cls, cursor: sqlite3.Cursor) -> None:
+        if DBManager.DB_NAME not in cls._installed:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {cls.LOG_TABLE} (
+                    id INTEGER PRIMARY KEY,
+                    ts INTEGER NOT NULL,
+                    host TEXT NOT NULL,
+                    duration REAL NOT NULL,
+                    report TEXT NOT NULL
+                )
+            """)
+            cls._installed.add(DBManager.DB_NAME)
+
+    @classmethod
+    def _write_log(cls, started: float, report: Dict[str, Any], log_id: Optional[int] = None) -> None:
+        with DBManager.get_write_cursor() as cursor:
+            cls._ensure_installed(cursor)
+            if log_id is not None:
+                # 実行枠として確保した行を結果で書き換える（ts は確保した時刻のまま）
+                cursor.execute(
+                    f"UPDATE {cls.LOG_TABLE} SET host = ?, duration = ?, report = ? WHERE id = ?",
+                    (socket.gethostname(), report["duration_sec"], json.dumps(report, ensure_ascii=False), log_id),
+                )
+                if cursor.rowcount:
+                    return
+            cursor.execute(
+                f"INSERT INTO {cls.LOG_TABLE} (ts, host, duration, report) VALUES (?, ?, ?, ?)",
+                (int(started), socket.gethostname(), report["duration_sec"], json.dumps(report, ensure_ascii=False)),
+            )
+
+    @classmethod
+    def last_run(cls) -> Optional[float]:
+        """直近の実行日時（UNIX 秒）。未実行なら None"""
+        with closing(DBManager.connect()) as conn:
+            try:
+                row = conn.execute(f"SELECT MAX(ts) FROM {cls.LOG_TABLE}").fetchone()
+            except sqlite3.OperationalError:
+                # 表がまだ無い
+                return None
+        return row[0] if row else None
@@ -1,26 +1,235 @@
 import sqlite3
 import os
 import json
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
 from contextlib import contextmanager
-from typing import Iterator
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+
+class StatementTrackingCursor(sqlite3.Cursor):
+    """実行したSQL文を接続の文キャッシュ集計へ記録するカーソル"""
+
+    def execute(self, sql, parameters=()):
+        self.connection.note_statement(sql)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.connection.note_statement(sql)
+        return super().executemany(sql, seq_of_parameters)
+
+
+class StatementTrackingConnection(sqlite3.Connection):
+    """
+    文キャッシュのヒット状況を集計する接続。
+    sqlite3 は接続ごとに SQL 文字列をキーとした LRU（cached_statements 件）で解析済みの文を保持しますが、
+    その状況を参照する手段が無いため、同じ大きさの LRU を SQL 文字列で模擬して hit/miss を数えます。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._statements: "OrderedDict[str, None]" = OrderedDict()
+        self._capacity = kwargs.get("cached_statements", 128)
+
+    def note_statement(self, sql: str) -> None:
+        if sql in self._statements:
+            self._statements.move_to_end(sql)
+            DBManager._count_statement(True)
+            return
+        self._statements[sql] = None
+        if len(self._statements) > self._capacity:
+            self._statements.popitem(last=False)
+        DBManager._count_statement(False)
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or StatementTrackingCursor)
+
+    def execute(self, sql, parameters=()):
+        self.note_statement(sql)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.note_statement(sql)
+        return super().executemany(sql, seq_of_parameters)
+
 
 class DBManager:
-    """データベース接続を管理するベースクラス"""
-    
+    """
+    データベース接続を管理するベースクラス
+
+    共有DBに複数の端末から同時にアクセスするため、接続ごとに次の設定を行います。
+    - busy_timeout: 他端末がロック中でも即エラーにせず、指定ミリ秒まで待つ
+    - journal_mode: config.json の "journal_mode" で指定（未指定ならDBの設定のまま）
+    - 書き込みは BEGIN IMMEDIATE で開始し、ロック取得に失敗した場合は指数バックオフで再試行
+
+    ※ WAL モードは全クライアントが同じマシン上でDBを開く場合のみ使用してください。
+      ネットワーク共有 (SMB) 越しのアクセスでは WAL の共有メモリが使えず、DBが破損するおそれがあります。
+    """
+
     # 共通のconfig読み込み
     _config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.json")
     try:
         with open(_config_path, "r", encoding="utf-8") as f:
             _config = json.load(f)
-        DB_NAME = _config.get("db_name", "default.db")
     except FileNotFoundError:
-        DB_NAME = "default.db"
+        _config = {}
+    DB_NAME = _config.get("db_name", "default.db")
+
+    # 同時アクセスの設定 (config.json で上書き可能)
+    JOURNAL_MODE: Optional[str] = _config.get("journal_mode")
+    BUSY_TIMEOUT_MS: int = _config.get("busy_timeout_ms", 5000)
+    WRITE_RETRIES: int = _config.get("write_retries", 5)
+    RETRY_BASE_DELAY: float = _config.get("retry_base_delay", 0.05)
+    # 接続ごとに保持する解析済みSQL文の数（接続を使い回す場合に、同じ検索の解析・実行計画の作成を省く）
+    STATEMENT_CACHE_SIZE: int = _config.get("statement_cache_size", 128)
+
+    # journal_mode を設定済みのDBパス（永続的な設定のため、プロセスごとに1回だけ発行する）
+    _journal_applied: Set[str] = set()
+
+    # 読み取り専用の接続先（ローカル複製を使う場合に ReplicaManager が設定。None なら DB_NAME）
+    READ_DB_NAME: Optional[str] = None
+    # get_write_cursor のコミット後に呼ばれる処理（ローカル複製への反映など）
+    _after_write_hooks: List[Callable[[], None]] = []
+
+    # 読み取り用の接続プール（APIサーバーなど常駐プロセスで enable_pool を呼んだ場合だけ使用）
+    # 要素は (接続先パス, 接続)。読み取り先が切り替わったら古い接続は破棄する
+    _pool: Optional["queue.LifoQueue[Tuple[str, sqlite3.Connection]]"] = None
+
+    # 実行中の読み取り接続を通知する先（スレッドごと）。非同期APIの取り消しで interrupt() するために使用
+    _local = threading.local()
+
+    # 文キャッシュの集計 (StatementTrackingConnection が記録)
+    _statement_hits = 0
+    _statement_misses = 0
+    _stats_lock = threading.Lock()
+
+    @classmethod
+    def connect(cls, db_name: Optional[str] = None, check_same_thread: bool = True) -> sqlite3.Connection:
+        """
+        busy_timeout・journal_mode を設定した接続を返します。
+        旧来の画面で sqlite3.connect を直接呼んでいた箇所もこのメソッドを使います。
+        """
+        path = db_name or cls.DB_NAME
+        conn = sqlite3.connect(path, timeout=cls.BUSY_TIMEOUT_MS / 1000, check_same_thread=check_same_thread,
+                               cached_statements=cls.STATEMENT_CACHE_SIZE, factory=StatementTrackingConnection)
+        if path != cls.DB_NAME:
+            # ローカル複製などの共有DB以外は、journal_mode をそのファイル側の設定に任せる
+            return conn
+        if cls.JOURNAL_MODE and path not in cls._journal_applied:
+            conn.execute(f"PRAGMA journal_mode = {cls.JOURNAL_MODE}")
+            cls._journal_applied.add(path)
+        if (cls.JOURNAL_MODE or "").lower() == "wal":
+            # WAL では NORMAL でもコミット済みデータの整合性は保たれ、書き込みが速くなる
+            conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    @classmethod
+    def begin_immediate(cls, conn: sqlite3.Connection) -> None:
+        """
+        書き込みトランザクションを BEGIN IMMEDIATE で開始します。
+        最初に書き込みロックを確保するため、途中の UPDATE でロック待ちや「database is locked」に
+        なることがありません。ロックが取れない場合は指数バックオフ（ゆらぎ付き）で再試行します。
+        """
+        for attempt in range(cls.WRITE_RETRIES + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                message = str(e).lower()
+                if ("locked" not in message and "busy" not in message) or attempt == cls.WRITE_RETRIES:
+                    raise
+                delay = cls.RETRY_BASE_DELAY * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay))
+
+    @classmethod
+    def enable_pool(cls) -> None:
+        """
+        読み取り接続の使い回しを有効にします。
+        接続の生成（ファイルのオープン・スキーマ読み込み）はネットワーク共有上では遅いため、
+        要求ごとに読み取りを行う常駐プロセスで使用します。プールの大きさは同時に読み取るスレッド数で決まります。
+        """
+        if cls._pool is None:
+            cls._pool = queue.LifoQueue()
+
+    @classmethod
+    def close_pool(cls) -> None:
+        """プール中の接続をすべて閉じ、接続の使い回しを止めます"""
+        pool, cls._pool = cls._pool, None
+        while pool is not None and not pool.empty():
+            pool.get_nowait()[1].close()
+
+    @classmethod
+    def _count_statement(cls, hit: bool) -> None:
+        with cls._stats_lock:
+            if hit:
+                cls._statement_hits += 1
+            else:
+                cls._statement_misses += 1
+
+    @classmethod
+    def statement_cache_stats(cls) -> Dict[str, Any]:
+        """接続の文キャッシュのヒット数・ミス数・ヒット率（プロセス内の全接続の合計）"""
+        with cls._stats_lock:
+            hits, misses = cls._statement_hits, cls._statement_misses
+        total = hits + misses
+        return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+    @classmethod
+    def reset_statement_cache_stats(cls) -> None:
+        with cls._stats_lock:
+            cls._statement_hits = cls._statement_misses = 0
+
+    @classmethod
+    def _acquire_read(cls) -> Tuple[str, sqlite3.Connection]:
+        path = cls.READ_DB_NAME or cls.DB_NAME
+        if cls._pool is None:
+            return path, cls.connect(cls.READ_DB_NAME)
+        while True:
+            try:
+                pooled_path, conn = cls._pool.get_nowait()
+            except queue.Empty:
+                return path, cls.connect(cls.READ_DB_NAME, check_same_thread=False)
+            if pooled_path == path:
+                return path, conn
+            conn.close()
+
+    @classmethod
+    def _release_read(cls, path: str, conn: sqlite3.Connection) -> None:
+        pool = cls._pool
+        if pool is not None and path == (cls.READ_DB_NAME or cls.DB_NAME):
+            pool.put((path, conn))
+        else:
+            conn.close()
+
+    @classmethod
+    @contextmanager
+    def track_read_connections(cls, callback: Callable[[Optional[sqlite3.Connection]], None]) -> Iterator[None]:
+        """
+        このスレッドで get_cursor が接続を使い始めた時に callback(接続)、使い終えた時に callback(None) を呼びます。
+        別スレッドから実行中の問い合わせを conn.interrupt() で中断するために使用します。
+        """
+        previous = getattr(cls._local, "read_callback", None)
+        cls._local.read_callback = callback
+        try:
+            yield
+        finally:
+            cls._local.read_callback = previous
 
     @classmethod
     @contextmanager
     def get_cursor(cls) -> Iterator[sqlite3.Cursor]:
-        """SQLを実行するためのカーソルを提供するコンテキストマネージャ"""
-        conn = sqlite3.connect(cls.DB_NAME)
+        """
+        SQLを実行するためのカーソルを提供するコンテキストマネージャ
+        SELECT は文ごとに自動コミットされるため、読み取りのトランザクションは文の実行中だけで終わります。
+        ローカル複製が有効な場合は、複製側のDBを読み取ります。
+        """
+        path, conn = cls._acquire_read()
+        callback = getattr(cls._local, "read_callback", None)
+        if callback is not None:
+            callback(conn)
         try:
             yield conn.cursor()
             conn.commit()  # 更新系処理のために一応commitを入れる
@@ -28,4 +237,36 @@ class DBManager:
             conn.rollback()
             raise e
         finally:
-            conn.close()
\ No newline at end of file
+            if callback is not None:
+                callback(None)
+            cls._release_read(path, conn)
+
+    @classmethod
+    @contextmanager
+    def get_write_cursor(cls) -> Iterator[sqlite3.Cursor]:
+        """
+        更新系処理用のカーソルを提供するコンテキストマネージャ
+        BEGIN IMMEDIATE（再試行付き）でトランザクションを開始し、ブロックを抜けるとコミットします。
+        """
+        conn = cls.connect()
+        try:
+            cls.begin_immediate(conn)
+            yield conn.cursor()
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+        for hook in list(cls._after_write_hooks):
+            try:
+                hook()
+            except Exception as e:
+                print(f"[-] 書き込み後処理エラー: {e}")
+
+    @classmethod
+    def add_after_write_hook(cls, hook: Callable[[], None]) -> None:
+        """get_write_cursor のコミット後に呼び出す処理を登録します"""
+        if hook not in cls._after_write_hooks:
+            cls._after_write_hooks.append(hook)
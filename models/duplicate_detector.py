@@ -0,0 +1,333 @@
+import json
+import re
+import sqlite3
+import time
+import unicodedata
+from contextlib import closing
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .change_log import ChangeLog
+from .db_manager import DBManager
+
+# カタカナ -> ひらがな の変換表（全角/半角・カタカナ/ひらがなの入力の揺れを吸収する）
+_KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(ord("ァ"), ord("ヶ") + 1)}
+# 比較時に取り除く文字（空白・区切り記号・括弧・長音。NFKC 後の文字で指定）
+_IGNORED_CHARS = re.compile(r"[\s\-‐‑‒–—―−ー_・/\\.,:;()\[\]{}「」『』【】〔〕'\"`~〜]+")
+
+
+class _Entry:
+    """照合用に正規化した機器1件分のデータ"""
+
+    __slots__ = ("id", "equipment_code", "name", "manufacturer_id", "categorie_id", "department_id", "room_id",
+                 "purchase_date", "block", "name_grams", "kana_grams")
+
+    def __init__(self, row: Sequence[Any]):
+        (self.id, self.equipment_code, self.name, name_kana, model, self.manufacturer_id,
+         self.categorie_id, self.department_id, self.room_id, self.purchase_date) = row
+        name_norm = DuplicateDetector.normalize(self.name)
+        self.block = DuplicateDetector.block_key(self.manufacturer_id, model, name_norm)
+        self.name_grams = DuplicateDetector.bigrams(name_norm)
+        self.kana_grams = DuplicateDetector.bigrams(DuplicateDetector.normalize(name_kana))
+
+
+class DuplicateDetector:
+    """
+    equipment の重複登録（同じ機器が全角/半角・空白・カタカナ/ひらがなの違いで2件以上ある）を見つけ、統合の候補を出すクラス。
+
+    - 名称・型番は NFKC・カタカナ→ひらがな・小文字化のうえ、空白・区切り記号・長音を除いてから比較します。
+    - 全件の総当たりはせず、ブロック（製造元ID + 正規化した型番。型番が空なら名称の先頭 NAME_BLOCK_CHARS 文字）
+      が同じ機器どうしだけを比較します。同じ型番の機器が多いブロック（MAX_BLOCK_SIZE 件超）は、部屋・購入日で更に分けます。
+    - 類似度は、名称（またはカナ）の文字2-gramの Dice 係数と、部屋・購入日・部門・分類の一致を WEIGHTS で重み付けした値です。
+      片方が空欄の項目は半分だけ加点します。THRESHOLD 以上の組を機器のまとまりにし、統合の候補とします。
+    - 統合の候補では、修理履歴が最も多い機器（同数なら先に登録された機器）を残す機器とします。
+
+    scan() は前回の実行以降に追加・変更された機器だけを、同じブロックの機器と比較します（change_log で検出）。
+    各機器のブロックは equipment_dedup_key に保存するため、差分の実行では全件を読み直しません。
+    初回・change_log の無いDB・change_log が削除済みの範囲に及ぶ場合と、full=True の場合は全件を比較します。
+
+    config.json の設定例:
+        "duplicate_detection": {"threshold": 0.8, "max_block_size": 200}
+    """
+
+    KEY_TABLE = "equipment_dedup_key"
+    STATE_TABLE = "equipment_dedup_state"
+
+    _settings: Dict[str, Any] = DBManager._config.get("duplicate_detection", {})
+    THRESHOLD: float = _settings.get("threshold", 0.8)
+    MAX_BLOCK_SIZE: int = _settings.get("max_block_size", 200)
+    NAME_BLOCK_CHARS = 4
+
+    # 名称の類似度と、一致した項目の重み（合計 1.0）
+    NAME_WEIGHT = 0.55
+    WEIGHTS = (("room_id", 0.15, "同じ部屋"), ("purchase_date", 0.15, "同じ購入日"),
+               ("department_id", 0.1, "同じ部門"), ("categorie_id", 0.05, "同じ分類"))
+    # 大きなブロックを分ける項目
+    SPLIT_FIELDS = ("room_id", "purchase_date")
+
+    # _Entry に渡す equipment の列
+    COLUMNS = ("id", "equipment_code", "name", "name_kana", "model", "manufacturer_id",
+               "categorie_id", "department_id", "room_id", "purchase_date")
+
+    # ========= 正規化 =========
+    @staticmethod
+    def normalize(value: Any) -> str:
+        """比較用の文字列（全角/半角・カタカナ/ひらがな・大文字/小文字・空白・記号・長音の違いを無くす）"""
+        if value is None:
+            return ""
+        text = unicodedata.normalize("NFKC", str(value)).translate(_KATAKANA_TO_HIRAGANA).casefold()
+        return _IGNORED_CHARS.sub("", text)
+
+    @classmethod
+    def block_key(cls, manufacturer_id: Optional[int], model: Any, name_norm: str) -> str:
+        model_norm = cls.normalize(model)
+        if model_norm:
+            return f"{manufacturer_id or 0}:{model_norm}"
+        return f"{manufacturer_id or 0}~{name_norm[:cls.NAME_BLOCK_CHARS]}"
+
+    @staticmethod
+    def bigrams(text: str) -> frozenset:
+        if len(text) < 2:
+            return frozenset((text,)) if text else frozenset()
+        return frozenset(text[i:i + 2] for i in range(len(text) - 1))
+
+    @staticmethod
+    def _dice(a: frozenset, b: frozenset) -> float:
+        if not a or not b:
+            return 0.0
+        return 2 * len(a & b) / (len(a) + len(b))
+
+    # ========= 比較 =========
+    @classmethod
+    def score(cls, a: _Entry, b: _Entry) -> Tuple[float, List[str]]:
+        """2件の類似度 (0～1) と、その内訳を返します"""
+        name = cls._dice(a.name_grams, b.name_grams)
+        if a.kana_grams and b.kana_grams:
+            name = max(name, cls._dice(a.kana_grams, b.kana_grams))
+        total = cls.NAME_WEIGHT * name
+        reasons = [f"名称 {name:.2f}"]
+        for field, weight, label in cls.WEIGHTS:
+            x, y = getattr(a, field), getattr(b, field)
+            if x in (None, "") or y in (None, ""):
+                total += weight / 2
+            elif x == y:
+                total += weight
+                reasons.append(label)
+        return total, reasons
+
+    @classmethod
+    def _min_name_similarity(cls) -> float:
+        """THRESHOLD に届くのに必要な名称の類似度（名称以外がすべて一致した場合）"""
+        return (cls.THRESHOLD - sum(weight for _, weight, _ in cls.WEIGHTS)) / cls.NAME_WEIGHT
+
+    @classmethod
+    def _groups(cls, entries: List[_Entry], depth: int = 0) -> Iterable[List[_Entry]]:
+        """ブロック内の比較対象のまとまり（大きすぎるブロックは SPLIT_FIELDS で分ける）"""
+        if len(entries) <= cls.MAX_BLOCK_SIZE or depth >= len(cls.SPLIT_FIELDS):
+            yield entries
+            return
+        field = cls.SPLIT_FIELDS[depth]
+        split: Dict[Any, List[_Entry]] = {}
+        for entry in entries:
+            split.setdefault(getattr(entry, field), []).append(entry)
+        for group in split.values():
+            yield from cls._groups(group, depth + 1)
+
+    @classmethod
+    def _compare(cls, entries: List[_Entry], targets: Optional[set], stats: Dict[str, int]
+                 ) -> Dict[Tuple[int, int], Tuple[float, List[str]]]:
+        """
+        同じブロックの機器どうしを比較し、THRESHOLD 以上の組 {(id, id): (類似度, 内訳)} を返します。
+        targets を指定した場合は、いずれかが targets に含まれる組だけを比較します（差分の実行）。
+        """
+        blocks: Dict[str, List[_Entry]] = {}
+        for entry in entries:
+            blocks.setdefault(entry.block, []).append(entry)
+        min_name = cls._min_name_similarity()
+        pairs = {}
+        for block in blocks.values():
+            if len(block) < 2:
+                continue
+            stats["blocks"] += 1
+            for group in cls._groups(block):
+                for i, a in enumerate(group):
+                    a_target = targets is None or a.id in targets
+                    for b in group[i + 1:]:
+                        if not a_target and b.id not in targets:
+                            continue
+                        # 2-gram の数の差だけで名称の類似度の上限が決まる（Dice <= 2*min/(|A|+|B|)）
+                        na, nb = len(a.name_grams), len(b.name_grams)
+                        if (not (a.kana_grams and b.kana_grams) and na + nb
+                                and 2 * min(na, nb) / (na + nb) < min_name):
+                            continue
+                        stats["comparisons"] += 1
+                        value, reasons = cls.score(a, b)
+                        if value >= cls.THRESHOLD:
+                            pairs[(a.id, b.id) if a.id < b.id else (b.id, a.id)] = (value, reasons)
+        return pairs
+
+    @staticmethod
+    def _code_forms(code: Any) -> List[str]:
+        """修理の器材番号として記録されうる文字列（数字だけの番号は、そのままと 5桁にそろえたもの）"""
+        text = str(code)
+        return [text, f"{int(text):05d}"] if text.isdigit() else [text]
+
+    @staticmethod
+    def _code_key(code: Any) -> str:
+        """器材番号の照合用の文字列（1001・"1001"・"01001" を同じにする）"""
+        text = str(code)
+        return str(int(text)) if text.isdigit() else text
+
+    @classmethod
+    def _proposals(cls, conn: sqlite3.Connection, entries: Dict[int, _Entry],
+                   pairs: Dict[Tuple[int, int], Tuple[float, List[str]]]) -> List[Dict[str, Any]]:
+        """類似する組を機器のまとまりにし、統合の候補（残す機器と重複候補）を作る"""
+        parent: Dict[int, int] = {}
+
+        def find(x: int) -> int:
+            while parent.setdefault(x, x) != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for a, b in pairs:
+            parent[find(a)] = find(b)
+        clusters: Dict[int, List[int]] = {}
+        for x in parent:
+            clusters.setdefault(find(x), []).append(x)
+
+        # repair.equipment_code は TEXT のため、equipment_code が INTEGER のDB（1001）でも
+        # 文字列（"1001" と 5桁の "01001" の両方）で照合し、_code_key で同じ機器にまとめる
+        codes = sorted({form for x in parent for form in cls._code_forms(entries[x].equipment_code)})
+        repairs: Dict[str, int] = {}
+        if codes:
+            for code, count in conn.execute(
+                "SELECT equipment_code, COUNT(*) FROM repair WHERE equipment_code IN (SELECT value FROM json_each(?))"
+                " GROUP BY equipment_code", (json.dumps(codes),)
+            ):
+                key = cls._code_key(code)
+                repairs[key] = repairs.get(key, 0) + count
+
+        def repair_count(entry: _Entry) -> int:
+            return repairs.get(cls._code_key(entry.equipment_code), 0)
+
+        proposals = []
+        for members in clusters.values():
+            members.sort(key=lambda x: (-repair_count(entries[x]), x))
+            keep = members[0]
+            duplicates = []
+            for x in members[1:]:
+                value, reasons = pairs.get((min(keep, x), max(keep, x))) or max(
+                    (pair for ids, pair in pairs.items() if x in ids), key=lambda pair: pair[0])
+                entry = entries[x]
+                duplicates.append({"id": x, "equipment_code": entry.equipment_code, "name": entry.name,
+                                   "repairs": repair_count(entry),
+                                   "score": round(value, 3), "reasons": reasons})
+            duplicates.sort(key=lambda d: -d["score"])
+            entry = entries[keep]
+            proposals.append({
+                "keep": {"id": keep, "equipment_code": entry.equipment_code, "name": entry.name,
+                         "repairs": repair_count(entry)},
+                "duplicates": duplicates,
+                "score": duplicates[0]["score"],
+            })
+        proposals.sort(key=lambda p: (-p["score"], p["keep"]["equipment_code"]))
+        return proposals
+
+    # ========= 実行 =========
+    @classmethod
+    def _ensure_installed(cls, cursor: sqlite3.Cursor) -> None:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {cls.KEY_TABLE} (
+                equipment_id INTEGER PRIMARY KEY,
+                block TEXT NOT NULL
+            )
+        """)
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{cls.KEY_TABLE}_block ON {cls.KEY_TABLE} (block)")
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {cls.STATE_TABLE} (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                last_seq INTEGER NOT NULL,
+                scanned_at INTEGER NOT NULL
+            )
+        """)
+
+    @classmethod
+    def _last_seq(cls, conn: sqlite3.Connection) -> Optional[int]:
+        """前回の実行時点の change_log の seq（差分で実行できない場合は None）"""
+        if not ChangeLog.is_installed(conn):
+            return None
+        try:
+            row = conn.execute(f"SELECT last_seq FROM {cls.STATE_TABLE} WHERE id = 1").fetchone()
+        except sqlite3.OperationalError:
+            return None  # 未実行（テーブル未作成）
+        if row is None:
+            return None
+        min_seq, _ = ChangeLog.bounds(conn)
+        # 前回以降の記録が prune で一部削除されている
+        if min_seq is not None and min_seq > row[0] + 1:
+            return None
+        return row[0]
+
+    @classmethod
+    def scan(cls, full: bool = False) -> Dict[str, Any]:
+        """
+        重複の候補を探し、結果を返します。
+            mode: "full"（全件を比較） / "incremental"（前回以降に追加・変更された機器だけを比較）
+            rows: 比較の対象にした機器の件数
+            blocks / comparisons: 比較したブロック数・組の数
+            proposals: 統合の候補 [{"keep": {...}, "duplicates": [{..., "score", "reasons"}], "score"}, ...]
+            seconds: 所要時間
+        """
+        start = time.perf_counter()
+        stats = {"blocks": 0, "comparisons": 0}
+        with closing(DBManager.connect()) as conn:
+            # 変更の検出・機器の読み込みを同じスナップショットで行う
+            conn.execute("BEGIN")
+            try:
+                last_seq = None if full else cls._last_seq(conn)
+                latest = (ChangeLog.bounds(conn)[1] or 0) if ChangeLog.is_installed(conn) else 0
+                if last_seq is None:
+                    mode = "full"
+                    changed: List[int] = []
+                    entries = {row[0]: _Entry(row) for row in conn.execute(f"SELECT {', '.join(cls.COLUMNS)} FROM equipment")}
+                    pairs = cls._compare(list(entries.values()), None, stats)
+                    rows = len(entries)
+                else:
+                    mode = "incremental"
+                    changed = ChangeLog.changed_row_ids(conn, "equipment", last_seq)
+                    new = {row[0]: _Entry(row) for row in conn.execute(
+                        f"SELECT {', '.join(cls.COLUMNS)} FROM equipment WHERE id IN (SELECT value FROM json_each(?))",
+                        (json.dumps(changed),))}
+                    # 同じブロックの既存の機器（保存済みのブロックで探す）
+                    entries = {row[0]: _Entry(row) for row in conn.execute(
+                        f"SELECT {', '.join('e.' + c for c in cls.COLUMNS)}"
+                        f" FROM {cls.KEY_TABLE} k JOIN equipment e ON e.id = k.equipment_id"
+                        " WHERE k.block IN (SELECT value FROM json_each(?))"
+                        " AND k.equipment_id NOT IN (SELECT value FROM json_each(?))",
+                        (json.dumps(sorted({entry.block for entry in new.values()})), json.dumps(changed)))}
+                    entries.update(new)
+                    pairs = cls._compare(list(entries.values()), set(new), stats)
+                    rows = len(new)
+                proposals = cls._proposals(conn, entries, pairs)
+            finally:
+                conn.rollback()
+
+        with DBManager.get_write_cursor() as cursor:
+            cls._ensure_installed(cursor)
+            if mode == "full":
+                cursor.execute(f"DELETE FROM {cls.KEY_TABLE}")
+                keys = ((entry.id, entry.block) for entry in entries.values())
+            else:
+                cursor.executemany(f"DELETE FROM {cls.KEY_TABLE} WHERE equipment_id = ?", ((x,) for x in changed))
+                keys = ((x, entries[x].block) for x in new)
+            cursor.executemany(f"INSERT OR REPLACE INTO {cls.KEY_TABLE} (equipment_id, block) VALUES (?, ?)", keys)
+            # 同時に実行された場合は、進んでいる方の seq を残す
+            cursor.execute(
+                f"INSERT INTO {cls.STATE_TABLE} (id, last_seq, scanned_at) VALUES (1, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET last_seq = MAX(last_seq, excluded.last_seq),"
+                " scanned_at = excluded.scanned_at",
+                (latest, int(time.time())),
+            )
+
+        return {"mode": mode, "rows": rows, "blocks": stats["blocks"], "comparisons": stats["comparisons"],
+                "proposals": proposals, "seconds": time.perf_counter() - start}
@@ -0,0 +1,241 @@
+import sqlite3
+from contextlib import closing
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .db_manager import DBManager
+
+
+class EquipmentCodeAllocationError(Exception):
+    """分類の器材番号をすべて使い切った場合などの例外"""
+
+
+class EquipmentCodeAllocator:
+    """
+    器材番号（分類コード2桁 + 連番3桁。例: 分類3の35番目 -> "03035"）を、分類ごとに空いている最小の番号から採番するクラス。
+
+    - 使用中の連番は、分類ごとに 64 ビットの整数 WORDS 個（1000 ビット）のビットマップとして
+      equipment_code_bitmap に保持します（1行 = 1ワード）。
+    - ビットマップは equipment のトリガーで更新するため、旧画面・取り込み・他端末など
+      どこから登録・削除・番号変更しても equipment と同じトランザクションで常に一致します。
+    - 空き番号はワード単位で探します（全ビットが立っているワードは読み飛ばし、最初の空きワードの中で
+      最下位の 0 ビットを (~w & (w + 1)) で求める）。既存の MAX(equipment_code) による採番と違い、
+      削除で空いた番号も再利用し、分類ごとに番号の範囲が分かれます。
+    - allocate() は書き込みトランザクション内で呼び、同じトランザクションで equipment に登録します。
+      BEGIN IMMEDIATE で書き込みが直列化されるため、複数端末が同時に採番しても同じ番号にはなりません。
+    """
+
+    TABLE = "equipment_code_bitmap"
+
+    PREFIX_DIGITS = 2
+    SERIAL_DIGITS = 3
+    MAX_PREFIX = 10 ** PREFIX_DIGITS - 1
+    # 連番は 001 から（000 は使わない）
+    MAX_SERIAL = 10 ** SERIAL_DIGITS - 1
+    WORD_BITS = 64
+    WORDS = MAX_SERIAL // WORD_BITS + 1
+    _FULL_WORD = (1 << WORD_BITS) - 1
+
+    # 器材番号のうち、この形式（数字5桁）のものだけをビットマップで管理する。
+    # equipment_code は INTEGER で宣言されたDB（"01001" が 1001 として保存される）と TEXT のDBがあるため、
+    # 整数は 1～99999、文字列は数字5桁のものを対象にし、分類コード・連番は数値から求める
+    _CODE_GLOB = "[0-9]" * (PREFIX_DIGITS + SERIAL_DIGITS)
+    _VALID_SQL = (f"((typeof({{code}}) = 'integer' AND {{code}} BETWEEN 1 AND {10 ** (PREFIX_DIGITS + SERIAL_DIGITS) - 1})"
+                  f" OR (typeof({{code}}) = 'text' AND {{code}} GLOB '{_CODE_GLOB}'))")
+
+    # トリガーで使う、器材番号 -> (分類コード, ワード位置, ビット) の式（{row} は NEW / OLD）
+    _PREFIX_SQL = f"(CAST({{row}}.equipment_code AS INTEGER) / {10 ** SERIAL_DIGITS})"
+    _SERIAL_SQL = f"(CAST({{row}}.equipment_code AS INTEGER) % {10 ** SERIAL_DIGITS})"
+
+    @classmethod
+    def _valid_sql(cls, code: str) -> str:
+        return cls._VALID_SQL.format(code=code)
+
+    @classmethod
+    def _set_bit_sql(cls, row: str) -> str:
+        prefix, serial = cls._PREFIX_SQL.format(row=row), cls._SERIAL_SQL.format(row=row)
+        return f"""
+            INSERT INTO {cls.TABLE} (prefix, word, bits)
+            VALUES ({prefix}, {serial} / {cls.WORD_BITS}, 1 << ({serial} % {cls.WORD_BITS}))
+            ON CONFLICT (prefix, word) DO UPDATE SET bits = bits | excluded.bits;
+        """
+
+    @classmethod
+    def _clear_bit_sql(cls, row: str) -> str:
+        prefix, serial = cls._PREFIX_SQL.format(row=row), cls._SERIAL_SQL.format(row=row)
+        return f"""
+            UPDATE {cls.TABLE} SET bits = bits & ~(1 << ({serial} % {cls.WORD_BITS}))
+            WHERE prefix = {prefix} AND word = {serial} / {cls.WORD_BITS};
+        """
+
+    # ========= 導入 =========
+    _TRIGGERS = ("trg_equipment_code_bitmap_insert", "trg_equipment_code_bitmap_delete",
+                 "trg_equipment_code_bitmap_update_old", "trg_equipment_code_bitmap_update_new")
+
+    @classmethod
+    def is_installed(cls, conn: sqlite3.Connection) -> bool:
+        """ビットマップの表と、現在の条件式のトリガーがあるか（旧い条件式のトリガーは作り直しが必要）"""
+        row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (cls.TABLE,)).fetchone()
+        if row is None:
+            return False
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                           (cls._TRIGGERS[0],)).fetchone()
+        return row is not None and cls._valid_sql("NEW.equipment_code") in row[0]
+
+    @classmethod
+    def install(cls, cursor: sqlite3.Cursor) -> None:
+        """
+        ビットマップの表とトリガーを作成し、現在の equipment から作り直す（書き込みトランザクション内で呼ぶ）。
+        旧い条件式のトリガーは置き換えます。
+        """
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {cls.TABLE} (
+                prefix INTEGER NOT NULL,
+                word INTEGER NOT NULL,
+                bits INTEGER NOT NULL,
+                PRIMARY KEY (prefix, word)
+            ) WITHOUT ROWID
+        """)
+        for name in cls._TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_equipment_code_bitmap_insert
+            AFTER INSERT ON equipment WHEN {cls._valid_sql('NEW.equipment_code')}
+            BEGIN {cls._set_bit_sql("NEW")} END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_equipment_code_bitmap_delete
+            AFTER DELETE ON equipment WHEN {cls._valid_sql('OLD.equipment_code')}
+            BEGIN {cls._clear_bit_sql("OLD")} END
+        """)
+        # 番号の変更は、旧番号を空けてから新番号を使用中にする
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_equipment_code_bitmap_update_old
+            AFTER UPDATE OF equipment_code ON equipment WHEN {cls._valid_sql('OLD.equipment_code')}
+            BEGIN {cls._clear_bit_sql("OLD")} END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_equipment_code_bitmap_update_new
+            AFTER UPDATE OF equipment_code ON equipment WHEN {cls._valid_sql('NEW.equipment_code')}
+            BEGIN {cls._set_bit_sql("NEW")} END
+        """)
+        cls.rebuild(cursor)
+
+    @classmethod
+    def rebuild(cls, cursor: sqlite3.Cursor) -> int:
+        """
+        equipment の器材番号からビットマップを作り直し、対象の器材数を返します。
+        器材番号は UNIQUE のため同じワード内のビットは重複せず、ビットの OR は SUM で求められます
+        （最上位ビットは負の値になるが、2の補数の和として正しいビット列になる）。
+        """
+        prefix, serial = cls._PREFIX_SQL.format(row="equipment"), cls._SERIAL_SQL.format(row="equipment")
+        cursor.execute(f"DELETE FROM {cls.TABLE}")
+        cursor.execute(f"""
+            INSERT INTO {cls.TABLE} (prefix, word, bits)
+            SELECT {prefix}, {serial} / {cls.WORD_BITS}, SUM(1 << ({serial} % {cls.WORD_BITS}))
+            FROM equipment WHERE {cls._valid_sql('equipment_code')}
+            GROUP BY 1, 2
+        """)
+        cursor.execute(f"SELECT COUNT(*) FROM equipment WHERE {cls._valid_sql('equipment_code')}")
+        return cursor.fetchone()[0]
+
+    @classmethod
+    def _ensure_installed(cls, cursor: sqlite3.Cursor) -> None:
+        # 旧画面は共有DB以外のパスに接続する場合もあるため、接続先のDBで毎回確認する（索引で1行引くだけ）
+        if not cls.is_installed(cursor.connection):
+            cls.install(cursor)
+
+    # ========= 採番 =========
+    @classmethod
+    def format_code(cls, prefix: int, serial: int) -> str:
+        return f"{prefix:0{cls.PREFIX_DIGITS}d}{serial:0{cls.SERIAL_DIGITS}d}"
+
+    @classmethod
+    def _check_prefix(cls, prefix: int) -> int:
+        prefix = int(prefix)
+        if not 1 <= prefix <= cls.MAX_PREFIX:
+            raise EquipmentCodeAllocationError(f"分類コードは 1～{cls.MAX_PREFIX} の範囲で指定してください: {prefix}")
+        return prefix
+
+    @classmethod
+    def _words(cls, cursor: sqlite3.Cursor, prefix: int) -> List[int]:
+        """分類のビットマップを WORDS 個の符号なし整数で返す（行の無いワードは 0）"""
+        words = [0] * cls.WORDS
+        cursor.execute(f"SELECT word, bits FROM {cls.TABLE} WHERE prefix = ?", (prefix,))
+        for word, bits in cursor.fetchall():
+            if 0 <= word < cls.WORDS:
+                words[word] = bits & cls._FULL_WORD
+        # 連番 0 と MAX_SERIAL を超える範囲は使用中として扱う
+        words[0] |= 1
+        tail = (cls.MAX_SERIAL + 1) % cls.WORD_BITS
+        if tail:
+            words[-1] |= cls._FULL_WORD ^ ((1 << tail) - 1)
+        return words
+
+    @classmethod
+    def _lowest_free(cls, words: List[int]) -> Optional[int]:
+        """最初の空きのあるワードで、最下位の 0 ビットの位置を返す（空きが無ければ None）"""
+        for index, word in enumerate(words):
+            if word != cls._FULL_WORD:
+                # (~w & (w + 1)) は w の最下位の 0 ビットだけが立った値
+                return index * cls.WORD_BITS + ((~word & (word + 1)).bit_length() - 1)
+        return None
+
+    @classmethod
+    def _read(cls, func: Callable[[sqlite3.Cursor], Any]) -> Any:
+        """
+        共有DBのビットマップを読み取る（ローカル複製には無いため共有DBに接続する）。
+        ビットマップが未作成の場合だけ、書き込みトランザクションで作成してから読む。
+        """
+        with closing(DBManager.connect()) as conn:
+            if cls.is_installed(conn):
+                return func(conn.cursor())
+        with DBManager.get_write_cursor() as cursor:
+            cls._ensure_installed(cursor)
+            return func(cursor)
+
+    @classmethod
+    def peek(cls, prefix: int) -> str:
+        """
+        分類で次に採番される器材番号を返します（予約はしない。登録画面での表示用）。
+        実際の番号は登録時に allocate() で決まるため、同時に登録した端末があれば異なる場合があります。
+        """
+        prefix = cls._check_prefix(prefix)
+        return cls._read(lambda cursor: cls._next_code(cursor, prefix))
+
+    @classmethod
+    def allocate(cls, cursor: sqlite3.Cursor, prefix: int) -> str:
+        """
+        分類の空いている最小の器材番号を返します。
+        書き込みトランザクション（DBManager.get_write_cursor / begin_immediate）の中で呼び、
+        同じトランザクションで equipment に登録してください（登録時のトリガーで使用中になる）。
+        """
+        prefix = cls._check_prefix(prefix)
+        cls._ensure_installed(cursor)
+        if not cursor.connection.in_transaction:
+            raise EquipmentCodeAllocationError("採番は書き込みトランザクションの中で行ってください")
+        return cls._next_code(cursor, prefix)
+
+    @classmethod
+    def _next_code(cls, cursor: sqlite3.Cursor, prefix: int) -> str:
+        serial = cls._lowest_free(cls._words(cursor, prefix))
+        if serial is None:
+            raise EquipmentCodeAllocationError(
+                f"分類 {prefix:0{cls.PREFIX_DIGITS}d} の器材番号（{cls.MAX_SERIAL} 件）はすべて使用されています"
+            )
+        return cls.format_code(prefix, serial)
+
+    @classmethod
+    def usage(cls) -> Dict[int, Tuple[int, int]]:
+        """分類コードごとの (使用中の件数, 空いている件数) を返します"""
+        # _words で使用中として扱う連番 0 と範囲外のビットの数
+        reserved = cls.WORDS * cls.WORD_BITS - cls.MAX_SERIAL
+
+        def count(cursor: sqlite3.Cursor) -> Dict[int, Tuple[int, int]]:
+            cursor.execute(f"SELECT DISTINCT prefix FROM {cls.TABLE} ORDER BY prefix")
+            result = {}
+            for prefix in [row[0] for row in cursor.fetchall()]:
+                used = sum(bin(word).count("1") for word in cls._words(cursor, prefix)) - reserved
+                result[prefix] = (used, cls.MAX_SERIAL - used)
+            return result
+
+        return cls._read(count)
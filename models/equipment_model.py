@@ -1,5 +1,12 @@
-from typing import List, Tuple, Any, Optional
+import json
+from functools import lru_cache
+from typing import List, Tuple, Any, Optional, Dict, Iterator
+from .audit_log import AuditLog
 from .db_manager import DBManager
+from .equipment_code_allocator import EquipmentCodeAllocator
+from .equipment_record import EquipmentRecord
+from .events import ModelEvents
+from .equipment_result import EquipmentResultSet
 
 class EquipmentModel:
     """機器（Equipment）テーブルに関するデータ操作を管理するモデル"""
@@ -21,44 +28,201 @@ class EquipmentModel:
         指定された条件で機器情報を検索し、レコードのリストを返します。
         (※従来の equipment_search.py の fetch_data に相当する処理)
         """
-        query = "SELECT * FROM equipment WHERE 1=1"
+        query, params = EquipmentModel.build_search_query(
+            equipment_code, name, name_kana, category_id, statuse_id,
+            department_id, room_id, manufacturer_id, celler_id, remarks
+        )
+        with DBManager.get_cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    # 検索条件の定義 (引数名, WHERE句の条件, 部分一致かどうか)
+    # この並びがビット位置と SQL 内の条件の順になるため、条件の組み合わせごとに SQL 文が1通りに決まる
+    SEARCH_FILTERS = (
+        ("equipment_code", "equipment_code LIKE ?", True),
+        ("name", "name LIKE ?", True),
+        ("name_kana", "name_kana LIKE ?", True),
+        ("category_id", "categorie_id = ?", False),
+        ("statuse_id", "statuse_id = ?", False),
+        ("department_id", "department_id = ?", False),
+        ("room_id", "room_id = ?", False),
+        ("manufacturer_id", "manufacturer_id = ?", False),
+        ("celler_id", "celler_id = ?", False),
+        ("remarks", "remarks LIKE ?", True),
+    )
+
+    @staticmethod
+    def build_search_query(
+        equipment_code: Optional[str] = None,
+        name: Optional[str] = None,
+        name_kana: Optional[str] = None,
+        category_id: Optional[int] = None,
+        statuse_id: Optional[int] = None,
+        department_id: Optional[int] = None,
+        room_id: Optional[int] = None,
+        manufacturer_id: Optional[int] = None,
+        celler_id: Optional[int] = None,
+        remarks: Optional[str] = None
+    ) -> Tuple[str, Tuple[Any, ...]]:
+        """
+        検索条件から (SQL文, パラメータ) を組み立てます。
+        指定された条件をビットマスクにし、SQL文は search_sql でマスクごとに1度だけ生成します。
+        同じ組み合わせの検索では常に同一の SQL 文になるため、接続の文キャッシュ（解析・実行計画）が再利用されます。
+        """
+        values = (equipment_code, name, name_kana, category_id, statuse_id,
+                  department_id, room_id, manufacturer_id, celler_id, remarks)
+        mask = 0
         params = []
+        for bit, ((_, _, partial), value) in enumerate(zip(EquipmentModel.SEARCH_FILTERS, values)):
+            if value:
+                mask |= 1 << bit
+                params.append(f"%{value}%" if partial else value)
+        return EquipmentModel.search_sql(mask), tuple(params)
+
+    @staticmethod
+    @lru_cache(maxsize=1 << 10)
+    def search_sql(mask: int) -> str:
+        """条件のビットマスクに対応する検索SQL（最大 2^10 通り、生成結果はメモ化）"""
+        clauses = [clause for bit, (_, clause, _) in enumerate(EquipmentModel.SEARCH_FILTERS) if mask >> bit & 1]
+        return " AND ".join(["SELECT * FROM equipment WHERE 1=1"] + clauses)
 
-        if equipment_code:
-            query += " AND equipment_code LIKE ?"
-            params.append(f"%{equipment_code}%")
-        if name:
-            query += " AND name LIKE ?"
-            params.append(f"%{name}%")
-        if name_kana:
-            query += " AND name_kana LIKE ?"
-            params.append(f"%{name_kana}%")
-        if category_id:
-            query += " AND categorie_id = ?"
-            params.append(category_id)
-        if statuse_id:
-            query += " AND statuse_id = ?"
-            params.append(statuse_id)
-        if department_id:
-            query += " AND department_id = ?"
-            params.append(department_id)
-        if room_id:
-            query += " AND room_id = ?"
-            params.append(room_id)
-        if manufacturer_id:
-            query += " AND manufacturer_id = ?"
-            params.append(manufacturer_id)
-        if celler_id:
-            query += " AND celler_id = ?"
-            params.append(celler_id)
-        if remarks:
-            query += " AND remarks LIKE ?"
-            params.append(f"%{remarks}%")
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        """検索SQLのメモ化と、接続の文キャッシュのヒット状況を返します"""
+        info = EquipmentModel.search_sql.cache_info()
+        return {
+            "sql_text": {"hits": info.hits, "misses": info.misses, "shapes": info.currsize},
+            "statements": DBManager.statement_cache_stats(),
+        }
+
+    @staticmethod
+    def search_records(lookups: Dict[str, Dict[int, str]], **conditions: Any) -> EquipmentResultSet:
+        """
+        search_equipments と同じ条件で検索し、マスタ名称を解決済みの EquipmentRecord をまとめた
+        EquipmentResultSet を返します。
+        lookups には MasterModel.get_kv_lookup で取得した {マスタテーブル名: {id: name}} を渡します。
+        カーソルから1行ずつレコードへ変換するため、生タプルの全件リストは作りません。
+        """
+        query, params = EquipmentModel.build_search_query(**conditions)
+        with DBManager.get_cursor() as cursor:
+            cursor.execute(query, params)
+            return EquipmentResultSet.from_rows(cursor, lookups)
 
+    @staticmethod
+    def iter_records(lookups: Dict[str, Dict[int, str]], **conditions: Any) -> Iterator[EquipmentRecord]:
+        """
+        search_records と同じ条件で検索し、EquipmentRecord を1件ずつ返すジェネレーター。
+        コマンドラインでの出力など、結果を保持せずに順に書き出す処理で使用します。
+        """
+        query, params = EquipmentModel.build_search_query(**conditions)
         with DBManager.get_cursor() as cursor:
-            cursor.execute(query, tuple(params))
+            cursor.execute(query + " ORDER BY equipment_code", params)
+            for row in cursor:
+                yield EquipmentRecord.from_row(row, lookups)
+
+    @staticmethod
+    def iter_records_in_code_range(lookups: Dict[str, Dict[int, str]], first_code: str,
+                                   last_code: str) -> Iterator[EquipmentRecord]:
+        """
+        器材番号が first_code ～ last_code（両端を含む）の機器を、器材番号順に1件ずつ返すジェネレーター。
+        範囲と並びは器材番号の数値順（equipment_code が TEXT のDBでは文字列順）です。
+        """
+        with DBManager.get_cursor() as cursor:
+            cursor.execute("SELECT * FROM equipment WHERE equipment_code BETWEEN ? AND ? ORDER BY equipment_code",
+                           (first_code, last_code))
+            for row in cursor:
+                yield EquipmentRecord.from_row(row, lookups)
+
+    @staticmethod
+    def count_by(column: str, **conditions: Any) -> List[Tuple[Any, int]]:
+        """search_equipments と同じ条件で絞り込み、指定カラム（マスタID等）ごとの件数を返します"""
+        if column not in EquipmentRecord.ROW_FIELDS:
+            raise ValueError(f"集計できないカラムです: {column}")
+        query, params = EquipmentModel.build_search_query(**conditions)
+        with DBManager.get_cursor() as cursor:
+            cursor.execute(
+                f"SELECT {column}, COUNT(*) FROM ({query}) GROUP BY {column} ORDER BY COUNT(*) DESC", params
+            )
             return cursor.fetchall()
 
+    @staticmethod
+    def search_records_by_ids(
+        lookups: Dict[str, Dict[int, str]],
+        equipment_ids: List[int],
+        **conditions: Any
+    ) -> List[EquipmentRecord]:
+        """
+        指定した機器IDのうち、検索条件に一致するものだけを EquipmentRecord として返します。
+        他端末での変更を、検索結果の該当行だけに反映するために使用します。
+        """
+        if not equipment_ids:
+            return []
+        query, params = EquipmentModel.build_search_query(**conditions)
+        query += f" AND id IN ({', '.join('?' * len(equipment_ids))})"
+        with DBManager.get_cursor() as cursor:
+            cursor.execute(query, params + tuple(equipment_ids))
+            return [EquipmentRecord.from_row(row, lookups) for row in cursor]
+
+    @staticmethod
+    def search_ids(cursor: Any, **conditions: Any) -> List[int]:
+        """
+        search_equipments と同じ条件に一致する機器IDだけを、検索結果と同じ並びで返します。
+        保存した検索の結果と版を同じトランザクションで取得できるよう、カーソルは呼び出し側で用意します。
+        """
+        query, params = EquipmentModel.build_search_query(**conditions)
+        cursor.execute(f"SELECT id FROM ({query})", params)
+        return [row[0] for row in cursor]
+
+    @staticmethod
+    def records_by_ids(lookups: Dict[str, Dict[int, str]], equipment_ids: List[int]) -> EquipmentResultSet:
+        """
+        機器IDの並び（保存した検索の前回の結果など）から、その並びのまま EquipmentResultSet を作ります。
+        IDは JSON 配列の1つのパラメータで渡すため、件数が多くてもプレースホルダ数の上限を超えません。
+        """
+        query = """
+            SELECT e.* FROM json_each(?) AS j
+            JOIN equipment e ON e.id = j.value
+            ORDER BY j.key
+        """
+        with DBManager.get_cursor() as cursor:
+            cursor.execute(query, (json.dumps(list(equipment_ids)),))
+            return EquipmentResultSet.from_rows(cursor, lookups)
+
+    # add_equipment で登録する列
+    INSERT_COLUMNS = ("equipment_code", "name", "name_kana", "categorie_id", "statuse_id", "department_id", "room_id",
+                      "manufacturer_id", "celler_id", "remarks", "purchase_date", "model")
+
+    @staticmethod
+    def add_equipment(data: Dict[str, Any]) -> Optional[str]:
+        """
+        機器を1件登録し、器材番号を返します（失敗時は None）。
+        器材番号が指定されていない場合は、機器分類 (categorie_id) の空いている最小の番号を
+        EquipmentCodeAllocator で採番し、採番と登録を同じトランザクションで行います。
+        """
+        columns = EquipmentModel.INSERT_COLUMNS
+        try:
+            with DBManager.get_write_cursor() as cursor:
+                values = dict(data)
+                if not values.get("equipment_code"):
+                    values["equipment_code"] = EquipmentCodeAllocator.allocate(cursor, values.get("categorie_id") or 0)
+                cursor.execute(
+                    f"INSERT INTO equipment ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    [values.get(col) for col in columns],
+                )
+                equipment_id = cursor.lastrowid
+                after = AuditLog.snapshot(cursor, "equipment", "rowid = ?", (equipment_id,))
+        except Exception as e:
+            print(f"[-] 機器登録エラー: {e}")
+            return None
+
+        AuditLog.record("equipment", {}, after)
+        ModelEvents.publish("equipment", {
+            "action": "insert",
+            "row_ids": [equipment_id],
+            "equipment_code": values["equipment_code"],
+        })
+        return values["equipment_code"]
+
     @staticmethod
     def get_by_code(equipment_code: str) -> Optional[Tuple[Any, ...]]:
         """器材コードをキーに、単一の機器情報を取得します（修理画面用）"""
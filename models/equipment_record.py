@@ -0,0 +1,135 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from .events import ModelEvents
+
+
+class EquipmentRecord:
+    """
+    機器1件分のデータを、マスタ名称を解決済みの状態で保持する軽量なレコードクラス。
+    検索結果の表示・修理画面の上部表示で共通に使い、同じ機器を何度もJOINで読み直さないようにします。
+
+    __slots__ により1件あたりのメモリを抑えています。
+    マスタ名称はルックアップ辞書の文字列をそのまま参照するため、件数が増えても名称文字列は複製されません。
+    """
+
+    __slots__ = (
+        "id", "equipment_code", "name", "name_kana",
+        "categorie_id", "statuse_id", "department_id", "room_id", "manufacturer_id", "celler_id",
+        "remarks", "purchase_date", "model",
+        "categorie_name", "status_name", "department_name", "room_name", "manufacturer_name", "celler_name",
+        "loaded_at",
+    )
+
+    # SELECT * FROM equipment のカラム順
+    ROW_FIELDS = (
+        "id", "equipment_code", "name", "name_kana",
+        "categorie_id", "statuse_id", "department_id", "room_id", "manufacturer_id", "celler_id",
+        "remarks", "purchase_date", "model",
+    )
+
+    # (IDのフィールド, 名称のフィールド, マスタテーブル名)
+    MASTER_FIELDS = (
+        ("categorie_id", "categorie_name", "categorie_master"),
+        ("statuse_id", "status_name", "statuse_master"),
+        ("department_id", "department_name", "department_master"),
+        ("room_id", "room_name", "room_master"),
+        ("manufacturer_id", "manufacturer_name", "manufacturer_master"),
+        ("celler_id", "celler_name", "celler_master"),
+    )
+
+    # 読み込みからこの秒数を過ぎたレコードは、他端末での更新を考慮して古いものとみなす
+    MAX_AGE_SECONDS = 300
+
+    # 無効化の時刻管理 (機器コード -> 時刻)。全件無効化は _invalidated_all に記録
+    _invalidated_at: Dict[str, float] = {}
+    _invalidated_all = 0.0
+    _lock = threading.Lock()
+
+    @classmethod
+    def from_row(cls, row: Sequence[Any], lookups: Dict[str, Dict[int, str]]) -> "EquipmentRecord":
+        """SELECT * FROM equipment の1行と、MasterModel.get_kv_lookup の辞書群からレコードを生成します"""
+        record = cls.__new__(cls)
+        for field, value in zip(cls.ROW_FIELDS, row):
+            setattr(record, field, value)
+        for id_field, name_field, master_table in cls.MASTER_FIELDS:
+            setattr(record, name_field, lookups.get(master_table, {}).get(getattr(record, id_field)))
+        record.loaded_at = time.time()
+        return record
+
+    def display_values(self) -> Tuple[Any, ...]:
+        """メイン画面の Treeview に表示する列の並び（マスタ未登録は「不明」）"""
+        return (
+            self.categorie_name or "不明",
+            self.equipment_code,
+            self.name,
+            self.status_name or "不明",
+            self.department_name or "不明",
+            self.room_name or "不明",
+            self.manufacturer_name or "不明",
+            self.celler_name or "不明",
+            self.remarks,
+            self.purchase_date,
+            self.model,
+        )
+
+    def to_detail(self) -> Dict[str, Any]:
+        """RepairModel.get_equipment_detail_by_code と同じ形式の辞書を返します"""
+        return {
+            "equipment_code": self.equipment_code,
+            "name": self.name,
+            "model": self.model,
+            "categorie_name": self.categorie_name,
+            "status_name": self.status_name,
+            "department_name": self.department_name,
+            "room_name": self.room_name,
+            "manufacturer_name": self.manufacturer_name,
+            "celler_name": self.celler_name,
+            "remarks": self.remarks,
+            "purchase_date": self.purchase_date,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """全カラムとマスタ名称を含む辞書を返します（JSON・CSV出力用）"""
+        data = {field: getattr(self, field) for field in self.ROW_FIELDS}
+        for _, name_field, _ in self.MASTER_FIELDS:
+            data[name_field] = getattr(self, name_field)
+        return data
+
+    def is_stale(self) -> bool:
+        """読み込み後に機器・マスタが更新された、または保持期間を過ぎた場合に True を返します"""
+        with EquipmentRecord._lock:
+            invalidated = max(
+                EquipmentRecord._invalidated_all,
+                EquipmentRecord._invalidated_at.get(str(self.equipment_code), 0.0),
+            )
+        return invalidated >= self.loaded_at or time.time() - self.loaded_at > self.MAX_AGE_SECONDS
+
+    @classmethod
+    def invalidate(cls, equipment_code: Optional[str] = None) -> None:
+        """指定機器（省略時は全件）のレコードを古いものとして扱います"""
+        now = time.time()
+        with cls._lock:
+            if equipment_code is None:
+                cls._invalidated_all = now
+                cls._invalidated_at.clear()
+            else:
+                cls._invalidated_at[str(equipment_code)] = now
+
+    @classmethod
+    def on_equipment_changed(cls, payload: Dict[str, Any]) -> None:
+        codes = ModelEvents.equipment_codes(payload)
+        if codes is None:
+            cls.invalidate(None)
+        for code in codes or []:
+            cls.invalidate(code)
+
+    @classmethod
+    def on_master_changed(cls, payload: Dict[str, Any]) -> None:
+        # マスタ名称の変更は全レコードの解決済み名称に影響する
+        cls.invalidate(None)
+
+
+ModelEvents.subscribe("equipment", EquipmentRecord.on_equipment_changed)
+ModelEvents.subscribe("master", EquipmentRecord.on_master_changed)
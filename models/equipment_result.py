@@ -0,0 +1,110 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .equipment_record import EquipmentRecord
+
+
+class EquipmentResultSet:
+    """
+    機器検索結果を1か所にまとめて保持するコンテナ。
+
+    DBから取得した行は EquipmentRecord（__slots__）に1度だけ変換し、
+    画面描画・並べ替え・Excel出力はいずれもこのレコードを直接参照します。
+    以前は「DBの生タプル」「Treeview 用の表示タプル」「出力用に Treeview から読み戻した値」の
+    3つのコピーが同時に存在していました。
+
+    Treeview の iid にはレコードの添字（records のインデックス）を文字列で使うため、
+    iid からレコードへの引き当てに辞書を持つ必要がありません。
+    他端末の変更を反映して行を削除した場合も、添字がずれないよう records には None を残します。
+    """
+
+    # 画面・出力の列見出し（EquipmentRecord.display_values の並び）
+    HEADERS = ["機器分類", "機器コード", "機器名", "状態", "部門", "部屋",
+               "製造元", "販売元", "備考", "購入日", "モデル"]
+
+    # 重複しやすい文字列カラム（同じ値は1つの文字列オブジェクトを共有させる）
+    INTERNED_FIELDS = ("name", "name_kana", "remarks", "purchase_date", "model")
+
+    def __init__(self, records: Optional[List[EquipmentRecord]] = None):
+        self.records: List[Optional[EquipmentRecord]] = records or []
+        self._removed = 0
+        # 機器ID -> 添字（差分反映のときに初めて作成する）
+        self._index_by_id: Optional[Dict[int, int]] = None
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[Any]], lookups: Dict[str, Dict[int, str]]) -> "EquipmentResultSet":
+        """SELECT * FROM equipment の行リストからレコードを生成します"""
+        pool: Dict[str, str] = {}
+        records = []
+        for row in rows:
+            record = EquipmentRecord.from_row(row, lookups)
+            for field in cls.INTERNED_FIELDS:
+                value = getattr(record, field)
+                if isinstance(value, str):
+                    setattr(record, field, pool.setdefault(value, value))
+            records.append(record)
+        return cls(records)
+
+    def __len__(self) -> int:
+        return len(self.records) - self._removed
+
+    def __iter__(self) -> Iterator[EquipmentRecord]:
+        return (record for record in self.records if record is not None)
+
+    def items(self) -> Iterator[Tuple[str, EquipmentRecord]]:
+        """(iid, レコード) を records の順に返します（削除済みの行は除く）"""
+        for index, record in enumerate(self.records):
+            if record is not None:
+                yield self.iid_of(index), record
+
+    def find_by_id(self, equipment_id: int) -> Optional[str]:
+        """機器IDから Treeview の iid を返します（検索結果に無ければ None）"""
+        if self._index_by_id is None:
+            self._index_by_id = {
+                record.id: index for index, record in enumerate(self.records) if record is not None
+            }
+        index = self._index_by_id.get(equipment_id)
+        return None if index is None else self.iid_of(index)
+
+    def append(self, record: EquipmentRecord) -> str:
+        """レコードを末尾に追加し、割り当てた iid を返します"""
+        self.records.append(record)
+        if self._index_by_id is not None:
+            self._index_by_id[record.id] = len(self.records) - 1
+        return self.iid_of(len(self.records) - 1)
+
+    def replace(self, iid: str, record: EquipmentRecord) -> None:
+        """iid の位置のレコードを新しい内容に差し替えます"""
+        self.records[int(iid)] = record
+
+    def remove(self, iid: str) -> None:
+        """iid の位置のレコードを削除済みにします（他の行の iid は変わらない）"""
+        index = int(iid)
+        record = self.records[index]
+        if record is None:
+            return
+        self.records[index] = None
+        self._removed += 1
+        if self._index_by_id is not None:
+            self._index_by_id.pop(record.id, None)
+
+    def iid_of(self, index: int) -> str:
+        """records の添字から Treeview の iid を返します"""
+        return str(index)
+
+    def get(self, iid: str) -> Optional[EquipmentRecord]:
+        """Treeview の iid からレコードを返します（該当なしは None）"""
+        try:
+            return self.records[int(iid)]
+        except (ValueError, IndexError):
+            return None
+
+    def iter_display_rows(self, iids: Optional[Sequence[str]] = None) -> Iterator[Tuple[Any, ...]]:
+        """
+        表示・出力用の行を1件ずつ生成します。
+        全件分の表示タプルを一度にリストへ溜めないため、出力処理でもコピーが増えません。
+        iids を指定すると、その並び順（画面で並べ替えた順など）で出力します。
+        """
+        records = self.records if iids is None else (self.records[int(iid)] for iid in iids)
+        for record in records:
+            if record is not None:
+                yield record.display_values()
@@ -0,0 +1,61 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+class ModelEvents:
+    """
+    モデル層でのデータ更新を、キャッシュや画面などの購読者へ通知する簡易イベントバス。
+    トピックは "repair", "equipment", "master" などテーブル単位の文字列で指定します。
+
+    使用例:
+        ModelEvents.subscribe("repair", lambda payload: print(payload))
+        ModelEvents.publish("repair", {"action": "insert", "row_ids": [12], "equipment_code": "01001"})
+
+    通知内容 (payload) の主なキー:
+        action: "insert" / "update" / "delete" / "change"（他端末の変更をまとめて通知する場合）
+        row_ids: 変更された行の主キー (rowid) のリスト
+        equipment_code / equipment_codes: 影響する機器コード（特定できない場合は省略）
+        source: 他端末の変更を ChangeWatcher が検知した場合は "remote"
+    """
+
+    _subscribers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def subscribe(cls, topic: str, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """指定トピックの通知を受け取るコールバックを登録します"""
+        with cls._lock:
+            callbacks = cls._subscribers.setdefault(topic, [])
+            if callback not in callbacks:
+                callbacks.append(callback)
+
+    @classmethod
+    def unsubscribe(cls, topic: str, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """登録済みのコールバックを解除します（未登録なら何もしない）"""
+        with cls._lock:
+            callbacks = cls._subscribers.get(topic, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    @staticmethod
+    def equipment_codes(payload: Dict[str, Any]) -> Optional[List[str]]:
+        """通知が影響する機器コードのリストを返します（特定できない場合は None = 全件が対象）"""
+        if payload.get("equipment_codes") is not None:
+            return [str(code) for code in payload["equipment_codes"]]
+        if payload.get("equipment_code") is not None:
+            return [str(payload["equipment_code"])]
+        return None
+
+    @classmethod
+    def publish(cls, topic: str, payload: Dict[str, Any]) -> None:
+        """
+        購読者へ通知を配信します。
+        購読者側の例外で保存処理そのものが失敗扱いにならないよう、例外はログ出力のみとします。
+        """
+        with cls._lock:
+            callbacks = list(cls._subscribers.get(topic, []))
+        for callback in callbacks:
+            try:
+                callback(payload)
+            except Exception as e:
+                print(f"[-] 更新通知の処理エラー ({topic}): {e}")
@@ -0,0 +1,145 @@
+import sqlite3
+from contextlib import closing
+from typing import Any, Dict, List, Tuple
+
+from .db_manager import DBManager
+
+
+class LocationIndex:
+    """
+    部門 → 部屋 → 機器分類 の階層ごとの機器数（状態別）を、集計済みの表で保持するクラス。
+
+    - equipment_location_count に (部屋, 部門, 状態, 機器分類) ごとの件数を持ちます（数百行程度）。
+      equipment のトリガーで登録・削除・部屋/部門/状態/分類の変更のたびに ±1 するため、
+      どこから変更しても同じトランザクションで常に一致し、集計のやり直しはいりません。
+    - 部屋の属する部門は room_master.department_id から決めます（読み込み時に結合するため、部屋の部門を
+      付け替えても集計表の更新はいりません）。部屋が未設定・部屋に部門が未設定の機器は、機器自身の部門に入れます。
+    - tree() は集計表を1回読むだけで階層全体の件数を返すため、画面で階層を開くたびに検索する必要はありません。
+
+    ID が未設定 (NULL) の機器は ID 0 として数えます。
+    """
+
+    TABLE = "equipment_location_count"
+
+    # 集計の単位（equipment の列）
+    KEY_COLUMNS = ("room_id", "department_id", "statuse_id", "categorie_id")
+
+    @classmethod
+    def _key_values(cls, row: str) -> str:
+        return ", ".join(f"COALESCE({row}.{col}, 0)" for col in cls.KEY_COLUMNS)
+
+    @classmethod
+    def _key_match(cls, row: str) -> str:
+        return " AND ".join(f"{col} = COALESCE({row}.{col}, 0)" for col in cls.KEY_COLUMNS)
+
+    @classmethod
+    def _add_sql(cls, row: str) -> str:
+        return f"""
+            INSERT INTO {cls.TABLE} ({', '.join(cls.KEY_COLUMNS)}, count) VALUES ({cls._key_values(row)}, 1)
+            ON CONFLICT ({', '.join(cls.KEY_COLUMNS)}) DO UPDATE SET count = count + 1;
+        """
+
+    @classmethod
+    def _remove_sql(cls, row: str) -> str:
+        return f"""
+            UPDATE {cls.TABLE} SET count = count - 1 WHERE {cls._key_match(row)};
+            DELETE FROM {cls.TABLE} WHERE {cls._key_match(row)} AND count <= 0;
+        """
+
+    # ========= 導入 =========
+    @classmethod
+    def is_installed(cls, conn: sqlite3.Connection) -> bool:
+        row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (cls.TABLE,)).fetchone()
+        return row is not None
+
+    @classmethod
+    def install(cls, cursor: sqlite3.Cursor) -> None:
+        """集計表とトリガーを作成し、現在の equipment から集計し直す（書き込みトランザクション内で呼ぶ）"""
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {cls.TABLE} (
+                room_id INTEGER NOT NULL,
+                department_id INTEGER NOT NULL,
+                statuse_id INTEGER NOT NULL,
+                categorie_id INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (room_id, department_id, statuse_id, categorie_id)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_equipment_location_insert AFTER INSERT ON equipment
+            BEGIN {cls._add_sql("NEW")} END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_equipment_location_delete AFTER DELETE ON equipment
+            BEGIN {cls._remove_sql("OLD")} END
+        """)
+        # 集計の単位の列が変わった場合だけ、旧い単位から新しい単位へ移す
+        changed = " OR ".join(f"OLD.{col} IS NOT NEW.{col}" for col in cls.KEY_COLUMNS)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_equipment_location_update
+            AFTER UPDATE OF {', '.join(cls.KEY_COLUMNS)} ON equipment WHEN {changed}
+            BEGIN {cls._remove_sql("OLD")} {cls._add_sql("NEW")} END
+        """)
+        cls.rebuild(cursor)
+
+    @classmethod
+    def rebuild(cls, cursor: sqlite3.Cursor) -> None:
+        """equipment から集計し直す"""
+        keys = ", ".join(f"COALESCE({col}, 0)" for col in cls.KEY_COLUMNS)
+        cursor.execute(f"DELETE FROM {cls.TABLE}")
+        cursor.execute(f"""
+            INSERT INTO {cls.TABLE} ({', '.join(cls.KEY_COLUMNS)}, count)
+            SELECT {keys}, COUNT(*) FROM equipment GROUP BY {keys}
+        """)
+
+    # ========= 読み込み =========
+    @staticmethod
+    def _room_has_department(conn: sqlite3.Connection) -> bool:
+        """room_master に department_id 列があるか（db_edit.py で追加される列のため、無いDBもある）"""
+        return any(row[1] == "department_id" for row in conn.execute("PRAGMA table_info(room_master)"))
+
+    @classmethod
+    def _fetch(cls, conn: sqlite3.Connection) -> List[Tuple[int, int, int, int, int]]:
+        department = "COALESCE(r.department_id, c.department_id)" if cls._room_has_department(conn) else "c.department_id"
+        return conn.execute(f"""
+            SELECT {department}, c.room_id, c.categorie_id, c.statuse_id, c.count
+            FROM {cls.TABLE} c LEFT JOIN room_master r ON r.id = c.room_id
+        """).fetchall()
+
+    @classmethod
+    def fetch_counts(cls) -> List[Tuple[int, int, int, int, int]]:
+        """
+        (部門ID, 部屋ID, 機器分類ID, 状態ID, 件数) のリストを返します。
+        集計表はローカル複製に無いため共有DBから読み、未作成の場合だけ作成してから読みます。
+        """
+        with closing(DBManager.connect()) as conn:
+            if cls.is_installed(conn):
+                return cls._fetch(conn)
+        with DBManager.get_write_cursor() as cursor:
+            if not cls.is_installed(cursor.connection):
+                cls.install(cursor)
+            return cls._fetch(cursor.connection)
+
+    @classmethod
+    def tree(cls) -> Dict[str, Dict[str, Any]]:
+        """
+        階層の各ノードを {iid: {"parent": 親の iid, "level": "department" / "room" / "category",
+        "id": マスタID, "total": 件数, "by_status": {状態ID: 件数}}} で返します。
+        iid は "d1"（部門）, "d1/r3"（部屋）, "d1/r3/c2"（部屋の中の機器分類）の形式です。
+        """
+        nodes: Dict[str, Dict[str, Any]] = {}
+
+        def add(iid: str, parent: str, level: str, node_id: int, status_id: int, count: int) -> None:
+            node = nodes.get(iid)
+            if node is None:
+                node = nodes[iid] = {"parent": parent, "level": level, "id": node_id, "total": 0, "by_status": {}}
+            node["total"] += count
+            node["by_status"][status_id] = node["by_status"].get(status_id, 0) + count
+
+        for department_id, room_id, categorie_id, status_id, count in cls.fetch_counts():
+            department = f"d{department_id}"
+            room = f"{department}/r{room_id}"
+            add(department, "", "department", department_id, status_id, count)
+            add(room, department, "room", room_id, status_id, count)
+            add(f"{room}/c{categorie_id}", room, "category", categorie_id, status_id, count)
+        return nodes
@@ -1,5 +1,7 @@
-from typing import List, Tuple, Dict, Optional
+import threading
+from typing import Any, List, Tuple, Dict, Optional
 from .db_manager import DBManager
+from .events import ModelEvents
 
 class MasterModel:
     """
@@ -7,6 +9,12 @@ class MasterModel:
     旧 MasterDataFetcher の機能を拡張し、MVCパターンに対応させています。
     """
 
+    # 外部から名前を指定して参照できるマスタテーブル（テーブル名をSQLへ埋め込むため、この一覧で検証する）
+    MASTER_TABLES = (
+        "categorie_master", "statuse_master", "department_master", "room_master",
+        "manufacturer_master", "celler_master", "repair_type_master", "repair_status_master",
+    )
+
     # 万が一データベースからデータが取得できなかった場合のデフォルト値（バックアップ）
     DEFAULT_MASTER_DATA: Dict[str, List[Tuple[int, str]]] = {
         "categorie_master": [(1, "検査機器"), (2, "一般備品"), (3, "消耗品"), (4, "その他")],
@@ -17,6 +25,118 @@ class MasterModel:
         "repair_statuse_master": [(1, "修理依頼中"), (2, "修理不能"), (3, "修理完了"), (4, "更新申請中"), (5, "廃棄")]
     }
 
+    # マスタ編集画面の1ページの件数
+    PAGE_SIZE = 200
+
+    # テーブル名 -> カラム名のリスト（PRAGMA table_info の結果。スキーマはアプリ稼働中に変わらない前提）
+    _columns: Dict[str, List[str]] = {}
+    _columns_lock = threading.Lock()
+
+    @classmethod
+    def check_table(cls, table_name: str) -> None:
+        """テーブル名をSQLへ埋め込む前に、マスタテーブルの一覧にあるか検証します"""
+        if table_name not in cls.MASTER_TABLES:
+            raise ValueError(f"マスタテーブルではありません: {table_name}")
+
+    @classmethod
+    def get_columns(cls, table_name: str) -> List[str]:
+        """マスタテーブルのカラム名の一覧（初回のみDBから取得し、以降はキャッシュを返す）"""
+        cls.check_table(table_name)
+        with cls._columns_lock:
+            columns = cls._columns.get(table_name)
+        if columns is None:
+            with DBManager.get_cursor() as cursor:
+                cursor.execute(f"PRAGMA table_info({table_name})")
+                columns = [row[1] for row in cursor.fetchall()]
+            with cls._columns_lock:
+                cls._columns[table_name] = columns
+        return columns
+
+    @staticmethod
+    def _filter_clause(keyword: Optional[str]) -> Tuple[str, List[Any]]:
+        """キーワード（名称の部分一致、数字なら ID の一致も）の WHERE 条件"""
+        if not keyword:
+            return "1", []
+        if keyword.isdigit():
+            return "(name LIKE ? OR id = ?)", [f"%{keyword}%", int(keyword)]
+        return "name LIKE ?", [f"%{keyword}%"]
+
+    @classmethod
+    def fetch_page(
+        cls, table_name: str, keyword: Optional[str] = None, after_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[Tuple[Any, ...]]:
+        """
+        マスタを ID 順に1ページ分取得します（キーセットページング）。
+        after_id より大きい ID から limit 件を返すため、OFFSET と違い後ろのページでも読み飛ばしが発生しません。
+        各行はカラム順（get_columns と同じ並び）のタプルです。
+        """
+        columns = cls.get_columns(table_name)
+        where, params = cls._filter_clause(keyword)
+        if after_id is not None:
+            where += " AND id > ?"
+            params.append(after_id)
+        params.append(limit or cls.PAGE_SIZE)
+        with DBManager.get_cursor() as cursor:
+            cursor.execute(
+                f"SELECT {', '.join(columns)} FROM {table_name} WHERE {where} ORDER BY id LIMIT ?", params
+            )
+            return cursor.fetchall()
+
+    @classmethod
+    def count(cls, table_name: str, keyword: Optional[str] = None) -> int:
+        """キーワードに一致するマスタの件数"""
+        cls.check_table(table_name)
+        where, params = cls._filter_clause(keyword)
+        with DBManager.get_cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {table_name} WHERE {where}", params)
+            return cursor.fetchone()[0]
+
+    @classmethod
+    def save_rows(
+        cls, table_name: str, updates: Dict[int, Dict[str, Any]], inserts: List[Dict[str, Any]]
+    ) -> List[int]:
+        """
+        マスタの変更（{id: {カラム: 値}}）と追加（[{カラム: 値}]）を1つのトランザクションで保存し、
+        追加した行の ID を返します。失敗した場合は何も保存されず、例外をそのまま送出します。
+
+        追加行の ID は、書き込みロックを取ったトランザクション内で最大値の次から採番します
+        （他端末と同じ ID を採番して衝突することがない）。
+        保存後、変更したテーブル名と ID を添えて "master" を通知し、購読者はそのテーブルのキャッシュだけを破棄します。
+        """
+        columns = cls.get_columns(table_name)
+        for values in list(updates.values()) + inserts:
+            unknown = set(values) - set(columns)
+            if unknown:
+                raise ValueError(f"{table_name} に存在しないカラムです: {', '.join(sorted(unknown))}")
+
+        new_ids: List[int] = []
+        with DBManager.get_write_cursor() as cursor:
+            for row_id, values in updates.items():
+                if not values:
+                    continue
+                set_clause = ", ".join(f"{col} = ?" for col in values)
+                cursor.execute(f"UPDATE {table_name} SET {set_clause} WHERE id = ?", [*values.values(), row_id])
+            if inserts:
+                cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table_name}")
+                next_id = cursor.fetchone()[0] + 1
+                # 旧来のマスタは "ID" のように大文字で作成されているため、カラム名は実際の表記に合わせる
+                id_column = next(col for col in columns if col.lower() == "id")
+                for values in inserts:
+                    values = {**values, id_column: values.get(id_column) or next_id}
+                    next_id = max(next_id, int(values[id_column])) + 1
+                    cursor.execute(
+                        f"INSERT INTO {table_name} ({', '.join(values)}) VALUES ({', '.join('?' * len(values))})",
+                        list(values.values()),
+                    )
+                    new_ids.append(int(values[id_column]))
+
+        ModelEvents.publish("master", {
+            "action": "change",
+            "table": table_name,
+            "row_ids": list(updates) + new_ids,
+        })
+        return new_ids
+
     @classmethod
     def fetch_all(cls, table_name: str) -> List[Tuple[int, str]]:
         """
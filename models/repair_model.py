@@ -1,5 +1,7 @@
 from typing import List, Tuple, Any, Optional, Dict
+from .audit_log import AuditLog
 from .db_manager import DBManager
+from .events import ModelEvents
 
 class RepairModel:
     """
@@ -8,10 +10,36 @@ class RepairModel:
     実際のDB構造（テーブル名・カラム名）に完全に対応しています。
     """
 
+    # HISTORY_SELECT の1行の並び（JSON・CSV出力の項目名に使用）
+    HISTORY_FIELDS = ("id", "status", "request_date", "completion_date", "repair_type",
+                      "vendor", "technician", "details", "remarks")
+    # get_repair_record_by_id の1行の並び
+    RECORD_FIELDS = ("id", "equipment_code", "repairstatuses", "request_date",
+                     "completion_date", "repairtype", "vendor", "technician", "details", "remarks")
+
+    # 修理履歴一覧の1行分（マスタ名称を結合済み）を取得するSELECT句
+    HISTORY_SELECT = """
+            SELECT 
+                r.id,
+                rs.name AS status, 
+                r.request_date,
+                r.completion_date,
+                rt.name AS repair_type,
+                c.name AS vendor,
+                r.technician,
+                r.details,
+                r.remarks
+            FROM repair r
+            LEFT JOIN repair_status_master rs ON r.repairstatuses = rs.id
+            LEFT JOIN repair_type_master rt ON r.repairtype = rt.id
+            LEFT JOIN celler_master c ON r.vendor = c.id
+    """
+
     @staticmethod
-    def get_equipment_detail_by_code(equipment_code: str) -> Optional[Dict[str, Any]]:
+    def get_equipment_detail_by_code(equipment_code: str, raise_errors: bool = False) -> Optional[Dict[str, Any]]:
         """
         機器コードをキーに、修理画面の上部表示に必要な機器の情報をマスタ名と結合して1件取得します。
+        raise_errors=True の場合、DBエラーは None にせず例外のまま返します（キャッシュする呼び出し元用）。
         """
         query = """
             SELECT 
@@ -56,30 +84,19 @@ class RepairModel:
                 }
             return None
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"[-] 修理画面用機器情報取得エラー: {e}")
             return None
 
     @staticmethod
-    def get_history_by_equipment(equipment_code: str) -> List[Tuple[Any, ...]]:
+    def get_history_by_equipment(equipment_code: str, raise_errors: bool = False) -> List[Tuple[Any, ...]]:
         """
         指定された機器コードに紐づく修理履歴の一覧を、マスタ文字列を結合した状態で取得します。
         ※ repair_status_master, repair_type_master へのJOINを正確に修正しました。
+        raise_errors=True の場合、DBエラーは [] にせず例外のまま返します（キャッシュする呼び出し元用）。
         """
-        query = """
-            SELECT 
-                r.id,
-                rs.name AS status, 
-                r.request_date,
-                r.completion_date,
-                rt.name AS repair_type,
-                c.name AS vendor,
-                r.technician,
-                r.details,
-                r.remarks
-            FROM repair r
-            LEFT JOIN repair_status_master rs ON r.repairstatuses = rs.id
-            LEFT JOIN repair_type_master rt ON r.repairtype = rt.id
-            LEFT JOIN celler_master c ON r.vendor = c.id
+        query = RepairModel.HISTORY_SELECT + """
             WHERE r.equipment_code = ?
             ORDER BY r.request_date DESC, r.id DESC;
         """
@@ -88,9 +105,31 @@ class RepairModel:
                 cursor.execute(query, (equipment_code,))
                 return cursor.fetchall()
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"[-] 修理履歴一覧取得エラー: {e}")
             return []
 
+    @staticmethod
+    def get_history_rows_by_ids(equipment_code: str, repair_ids: List[int]) -> List[Tuple[Any, ...]]:
+        """
+        指定した修理IDのうち、指定機器に属するものだけを修理履歴一覧と同じ形式で取得します。
+        画面の履歴一覧を、変更された行だけ差し替えるために使用します。
+        """
+        if not repair_ids:
+            return []
+        placeholders = ", ".join("?" * len(repair_ids))
+        query = RepairModel.HISTORY_SELECT + f"""
+            WHERE r.equipment_code = ? AND r.id IN ({placeholders})
+        """
+        try:
+            with DBManager.get_cursor() as cursor:
+                cursor.execute(query, (equipment_code, *repair_ids))
+                return cursor.fetchall()
+        except Exception as e:
+            print(f"[-] 修理履歴の差分取得エラー: {e}")
+            return []
+
     @staticmethod
     def get_repair_record_by_id(repair_id: int) -> Optional[Tuple[Any, ...]]:
         """
@@ -133,13 +172,73 @@ class RepairModel:
             data.get("remarks")
         )
         try:
-            with DBManager.get_cursor() as cursor:
+            with DBManager.get_write_cursor() as cursor:
                 cursor.execute(query, params)
-            return True
+                repair_id = cursor.lastrowid
+                after = AuditLog.snapshot(cursor, "repair", "id = ?", (repair_id,))
         except Exception as e:
             print(f"[-] 修理情報追加エラー: {e}")
             return False
 
+        AuditLog.record("repair", {}, after)
+
+        # 集計キャッシュ等へ、追加された修理の機器コードと依頼日を通知
+        ModelEvents.publish("repair", {
+            "action": "insert",
+            "row_ids": [repair_id],
+            "equipment_code": data.get("equipment_code"),
+            "request_dates": [data.get("request_date")],
+        })
+        return True
+
+    @staticmethod
+    def add_repair_records(equipment_codes: List[str], data: dict) -> List[int]:
+        """
+        年次保守などのキャンペーン用に、複数の機器へ共通の内容（状態・日付・対応・業者・技術者など）の
+        修理履歴を1つのトランザクションでまとめて追加し、追加した修理IDを返します（失敗時は空リスト）。
+        executemany の1回で全件を挿入し、変更通知も全件分を1回にまとめて送ります。
+        """
+        codes = list(dict.fromkeys(str(code) for code in equipment_codes if code))
+        if not codes:
+            return []
+        query = """
+            INSERT INTO repair (
+                equipment_code, repairstatuses, request_date,
+                completion_date, repairtype, vendor, technician, details, remarks
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        shared = (
+            data.get("repairstatuses"),
+            data.get("request_date"),
+            data.get("completion_date"),
+            data.get("repairtype"),
+            data.get("vendor"),
+            data.get("technician"),
+            data.get("details"),
+            data.get("remarks")
+        )
+        try:
+            with DBManager.get_write_cursor() as cursor:
+                # 書き込みロックを取得済みのため、これより大きいIDはすべて今回追加した行になる
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM repair")
+                last_id = cursor.fetchone()[0]
+                cursor.executemany(query, [(code, *shared) for code in codes])
+                after = AuditLog.snapshot(cursor, "repair", "id > ?", (last_id,))
+        except Exception as e:
+            print(f"[-] 修理情報一括追加エラー ({len(codes)} 件): {e}")
+            return []
+
+        AuditLog.record("repair", {}, after)
+
+        repair_ids = sorted(after)
+        ModelEvents.publish("repair", {
+            "action": "insert",
+            "row_ids": repair_ids,
+            "equipment_codes": codes,
+            "request_dates": [data.get("request_date")],
+        })
+        return repair_ids
+
     @staticmethod
     def update_repair_record(repair_id: int, data: dict) -> bool:
         """既存の修理履歴を更新（修正）します"""
@@ -167,9 +266,21 @@ class RepairModel:
             repair_id
         )
         try:
-            with DBManager.get_cursor() as cursor:
+            with DBManager.get_write_cursor() as cursor:
+                # 監査ログ・通知用に、更新前後の行を同じトランザクション内で取得しておく
+                before = AuditLog.snapshot(cursor, "repair", "id = ?", (repair_id,))
                 cursor.execute(query, params)
-            return True
+                after = AuditLog.snapshot(cursor, "repair", "id = ?", (repair_id,))
         except Exception as e:
             print(f"[-] 修理情報更新エラー (ID: {repair_id}): {e}")
-            return False
\ No newline at end of file
+            return False
+
+        AuditLog.record("repair", before, after)
+        old = next(iter(before.values()), {})
+        ModelEvents.publish("repair", {
+            "action": "update",
+            "row_ids": [repair_id],
+            "equipment_code": old.get("equipment_code"),
+            "request_dates": [old.get("request_date"), data.get("request_date")],
+        })
+        return True
\ No newline at end of file
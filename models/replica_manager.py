@@ -0,0 +1,261 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .change_log import ChangeLog
+from .db_manager import DBManager
+
+
+class ReplicaManager:
+    """
+    ネットワーク共有上のDBの読み取りを高速化するための、ローカル複製（リードレプリカ）の管理クラス。
+
+    - 初回は sqlite3 のオンラインバックアップAPIで共有DBを丸ごとローカルへ複製します。
+    - 以降は共有DBの change_log（トリガーで記録）を seq 順に取り込み、変更行だけを反映します。
+    - 読み取り (DBManager.get_cursor) はローカル複製へ、書き込みは共有DBへ送られ、
+      書き込み直後にも同期して自端末の変更がすぐ画面に反映されるようにします。
+    - バックグラウンドスレッドで定期的に追従し、status() で遅延（未反映件数・最終同期からの秒数）を返します。
+
+    config.json の設定例:
+        "replica": {"enabled": true, "path": "C:\\\\EquipmentLocal\\\\replica.db", "sync_interval_sec": 5}
+    """
+
+    _settings: Dict[str, Any] = DBManager._config.get("replica", {})
+    ENABLED: bool = bool(_settings.get("enabled", False))
+    REPLICA_PATH: str = _settings.get(
+        "path", os.path.join(os.path.expanduser("~"), ".equipment_management", "replica.db"))
+    SYNC_INTERVAL_SEC: float = _settings.get("sync_interval_sec", 5)
+    BATCH_SIZE = 5000
+    META_TABLE = "replica_meta"
+
+    _lock = threading.RLock()
+    _thread: Optional[threading.Thread] = None
+    _stop = threading.Event()
+    _last_seq = 0
+    _primary_max_seq = 0
+    _last_sync_at: Optional[float] = None
+    _last_error: Optional[str] = None
+    _columns: Dict[str, List[str]] = {}
+
+    @classmethod
+    def start(cls) -> None:
+        """
+        バックグラウンドで複製を準備し、定期同期を開始します。
+        複製の準備が終わるまでは、読み取りも共有DBに対して行われます。
+        """
+        if cls._thread is not None:
+            return
+        cls._stop.clear()
+        cls._thread = threading.Thread(target=cls._run, name="replica-sync", daemon=True)
+        cls._thread.start()
+
+    @classmethod
+    def stop(cls) -> None:
+        """定期同期を停止し、読み取り先を共有DBに戻します"""
+        cls._stop.set()
+        DBManager.READ_DB_NAME = None
+        cls._thread = None
+
+    @classmethod
+    def _run(cls) -> None:
+        try:
+            cls.initialize()
+        except Exception as e:
+            cls._last_error = str(e)
+            print(f"[-] ローカル複製の準備エラー: {e}")
+            return
+        while not cls._stop.wait(cls.SYNC_INTERVAL_SEC):
+            try:
+                cls.catch_up()
+            except Exception as e:
+                cls._last_error = str(e)
+                print(f"[-] ローカル複製の同期エラー: {e}")
+
+    @classmethod
+    def initialize(cls) -> None:
+        """複製ファイルが無ければ作成し、追いついた時点で読み取り先を切り替えます"""
+        with cls._lock:
+            primary = DBManager.connect()
+            try:
+                if not ChangeLog.is_installed(primary):
+                    ChangeLog.install(primary)
+            finally:
+                primary.close()
+
+            last_seq = cls._read_last_seq()
+            if last_seq is None:
+                cls._full_copy()
+            else:
+                cls._last_seq = last_seq
+            cls.catch_up()
+            DBManager.READ_DB_NAME = cls.REPLICA_PATH
+            DBManager.add_after_write_hook(cls.sync_once)
+
+    @classmethod
+    def rebuild(cls) -> None:
+        """共有DBが丸ごと置き換えられた場合（バックアップからの復元など）に、複製を作り直します"""
+        with cls._lock:
+            cls._full_copy()
+
+    @classmethod
+    def _connect_replica(cls) -> sqlite3.Connection:
+        conn = sqlite3.connect(cls.REPLICA_PATH, timeout=DBManager.BUSY_TIMEOUT_MS / 1000)
+        return conn
+
+    @classmethod
+    def _read_last_seq(cls) -> Optional[int]:
+        """複製に記録されている取り込み済み seq（複製が無い・壊れている場合は None）"""
+        if not os.path.exists(cls.REPLICA_PATH):
+            return None
+        conn = cls._connect_replica()
+        try:
+            row = conn.execute(f"SELECT value FROM {cls.META_TABLE} WHERE key = 'last_seq'").fetchone()
+            return int(row[0]) if row else None
+        except sqlite3.Error:
+            return None
+        finally:
+            conn.close()
+
+    @classmethod
+    def _full_copy(cls) -> None:
+        """オンラインバックアップAPIで共有DBをローカルへ丸ごと複製します"""
+        os.makedirs(os.path.dirname(cls.REPLICA_PATH) or ".", exist_ok=True)
+        tmp_path = cls.REPLICA_PATH + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        primary = DBManager.connect()
+        target = sqlite3.connect(tmp_path)
+        try:
+            # 複製開始前の最大 seq を控える（以降の変更は差分同期で取り込む。重複適用は無害）
+            _, max_seq = ChangeLog.bounds(primary)
+            primary.backup(target, pages=1024)
+            ChangeLog.uninstall_triggers(target)
+            target.execute(f"DELETE FROM {ChangeLog.TABLE}")
+            target.execute(f"CREATE TABLE IF NOT EXISTS {cls.META_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+            target.execute(f"INSERT OR REPLACE INTO {cls.META_TABLE} VALUES ('last_seq', ?)", (max_seq or 0,))
+            target.commit()
+            # 複製はローカルディスク上にあるため WAL を使い、同期中も画面からの読み取りを妨げない
+            target.execute("PRAGMA journal_mode = WAL")
+        finally:
+            target.close()
+            primary.close()
+
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(cls.REPLICA_PATH + suffix):
+                os.remove(cls.REPLICA_PATH + suffix)
+        os.replace(tmp_path, cls.REPLICA_PATH)
+        cls._last_seq = max_seq or 0
+        cls._columns.clear()
+
+    @classmethod
+    def _table_columns(cls, conn: sqlite3.Connection, table: str) -> List[str]:
+        """テーブルのカラム名（キャッシュ）"""
+        if table not in cls._columns:
+            cls._columns[table] = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        return cls._columns[table]
+
+    @classmethod
+    def sync_once(cls) -> int:
+        """
+        共有DBの change_log から未反映の変更を取り込み、反映した変更件数を返します。
+        変更のあった行は共有DBから最新の内容を読み直して INSERT OR REPLACE し、
+        共有DBに存在しなくなった行は削除します。
+        """
+        with cls._lock:
+            primary = DBManager.connect()
+            try:
+                # 変更一覧と行の内容を同じスナップショットから読むため、短い読み取りトランザクションにまとめる
+                primary.execute("BEGIN")
+                min_seq, max_seq = ChangeLog.bounds(primary)
+                changes = ChangeLog.fetch_since(primary, cls._last_seq, cls.BATCH_SIZE)
+                # 次の場合は差分では追いつけないため、複製を作り直す
+                # - 未取り込みの変更記録が削除済み（prune）
+                # - 共有DBが置き換えられた（復元の記録がある、または seq が取り込み済みより戻っている）
+                if ((min_seq is not None and cls._last_seq < min_seq - 1)
+                        or (max_seq or 0) < cls._last_seq
+                        or any(op == ChangeLog.RESET_OP for _, _, _, op in changes)):
+                    primary.rollback()
+                    primary.close()
+                    primary = None
+                    cls._full_copy()
+                    return 0
+
+                cls._primary_max_seq = max_seq or 0
+                if not changes:
+                    primary.rollback()
+                    cls._last_sync_at = time.time()
+                    cls._last_error = None
+                    return 0
+
+                rowids_by_table: Dict[str, set] = {}
+                for _, table, row_id, _ in changes:
+                    rowids_by_table.setdefault(table, set()).add(row_id)
+
+                fetched: Dict[str, List[Tuple[Any, ...]]] = {}
+                for table, rowids in rowids_by_table.items():
+                    columns = cls._table_columns(primary, table)
+                    ids = sorted(rowids)
+                    fetched[table] = []
+                    for start in range(0, len(ids), 500):
+                        chunk = ids[start:start + 500]
+                        placeholders = ", ".join("?" * len(chunk))
+                        fetched[table].extend(primary.execute(
+                            f"SELECT rowid, {', '.join(columns)} FROM {table} WHERE rowid IN ({placeholders})",
+                            chunk,
+                        ).fetchall())
+                primary.rollback()
+            finally:
+                if primary is not None:
+                    primary.close()
+
+            replica = cls._connect_replica()
+            try:
+                replica.execute("BEGIN IMMEDIATE")
+                for table, rowids in rowids_by_table.items():
+                    columns = cls._table_columns(replica, table)
+                    rows = fetched[table]
+                    placeholders = ", ".join("?" * (len(columns) + 1))
+                    replica.executemany(
+                        f"INSERT OR REPLACE INTO {table} (rowid, {', '.join(columns)}) VALUES ({placeholders})",
+                        rows,
+                    )
+                    deleted = rowids - {row[0] for row in rows}
+                    replica.executemany(f"DELETE FROM {table} WHERE rowid = ?", [(r,) for r in deleted])
+                cls._last_seq = changes[-1][0]
+                replica.execute(
+                    f"INSERT OR REPLACE INTO {cls.META_TABLE} VALUES ('last_seq', ?)", (cls._last_seq,))
+                replica.commit()
+            except Exception:
+                replica.rollback()
+                raise
+            finally:
+                replica.close()
+
+            cls._last_sync_at = time.time()
+            cls._last_error = None
+            return len(changes)
+
+    @classmethod
+    def catch_up(cls) -> None:
+        """未反映の変更が無くなるまで、BATCH_SIZE 件ずつ同期を繰り返します"""
+        while cls.sync_once() >= cls.BATCH_SIZE and not cls._stop.is_set():
+            pass
+
+    @classmethod
+    def status(cls) -> Dict[str, Any]:
+        """
+        複製の状態を返します。
+            active: 読み取りが複製に切り替わっているか
+            lag_changes: 共有DBにあって未反映の変更件数（最後に確認した時点）
+            lag_seconds: 最後に同期が完了してからの秒数
+            error: 直近の同期エラー（正常なら None）
+        """
+        return {
+            "active": DBManager.READ_DB_NAME == cls.REPLICA_PATH,
+            "lag_changes": max(cls._primary_max_seq - cls._last_seq, 0),
+            "lag_seconds": None if cls._last_sync_at is None else time.time() - cls._last_sync_at,
+            "error": cls._last_error,
+        }
@@ -0,0 +1,164 @@
+import json
+import sqlite3
+import time
+from contextlib import closing
+from typing import Any, Dict, List, Optional
+
+from .audit_log import AuditLog
+from .change_log import ChangeLog
+from .db_manager import DBManager
+from .equipment_model import EquipmentModel
+
+
+class SavedSearch:
+    """
+    名前を付けて共有DBに保存する検索条件（「修理中・検査部」「廃棄予定」など、毎朝実行する検索）。
+
+    - 保存した検索ごとに、前回の検索結果（機器IDの並び）と、その時点の版（SOURCE_TABLES の change_log の最新 seq）を保持します。
+    - load() は保存済みの結果と、現在の版と比べて結果がまだ有効か (fresh) を返します。
+      SOURCE_TABLES が変更されていなければ検索をやり直さずに、機器IDから直接一覧を表示できます。
+    - refresh() は検索をやり直して結果と版を保存し直します（結果が古い場合に画面がバックグラウンドで呼び出す）。
+      版の取得と検索を共有DBの同じ読み取りトランザクションで行うため、保存した結果と版は常に対応します。
+
+    ローカル複製は保存した検索のテーブルや change_log を同期しないため、読み書きとも共有DBに対して行います。
+    """
+
+    TABLE = "saved_search"
+
+    # 検索結果（機器ID）が依存するテーブル。条件はIDで保持するため、マスタの名称変更は結果に影響しない
+    SOURCE_TABLES = ("equipment",)
+
+    _installed: set = set()
+
+    @classmethod
+    def _ensure_installed(cls, cursor: sqlite3.Cursor) -> None:
+        if DBManager.DB_NAME in cls._installed:
+            return
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {cls.TABLE} (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                conditions TEXT NOT NULL,
+                result_ids TEXT,
+                version TEXT,
+                row_count INTEGER,
+                run_at INTEGER,
+                created_by TEXT NOT NULL,
+                created_at INTEGER NOT NULL
+            )
+        """)
+        if ChangeLog.is_installed(cursor.connection):
+            ChangeLog.install_table_index(cursor.connection)
+        cls._installed.add(DBManager.DB_NAME)
+
+    @staticmethod
+    def _normalize(conditions: Dict[str, Any]) -> Dict[str, Any]:
+        """未指定（空文字・None）の条件を除き、保存・比較用の形にする"""
+        return {key: value for key, value in conditions.items() if value not in (None, "")}
+
+    @classmethod
+    def _version(cls, conn: sqlite3.Connection) -> Optional[str]:
+        """SOURCE_TABLES の現在の版（change_log が無いDBでは None = 常に検索し直す）"""
+        if not ChangeLog.is_installed(conn):
+            return None
+        return json.dumps(ChangeLog.latest_seqs(conn, cls.SOURCE_TABLES), sort_keys=True)
+
+    # ========= 保存・一覧 =========
+    @classmethod
+    def save(cls, name: str, conditions: Dict[str, Any]) -> int:
+        """
+        検索条件を名前を付けて保存し（同じ名前があれば条件を置き換え）、ID を返します。
+        保存時に1度検索を実行して結果を保存するため、次回からはすぐに開けます。
+        """
+        name = name.strip()
+        if not name:
+            raise ValueError("保存する検索の名前を入力してください")
+        with DBManager.get_write_cursor() as cursor:
+            cls._ensure_installed(cursor)
+            cursor.execute(
+                f"INSERT INTO {cls.TABLE} (name, conditions, created_by, created_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET conditions = excluded.conditions,"
+                " result_ids = NULL, version = NULL, row_count = NULL, run_at = NULL",
+                (name, json.dumps(cls._normalize(conditions), ensure_ascii=False, sort_keys=True),
+                 AuditLog.actor(), int(time.time())),
+            )
+            cursor.execute(f"SELECT id FROM {cls.TABLE} WHERE name = ?", (name,))
+            search_id = cursor.fetchone()[0]
+        cls.refresh(search_id)
+        return search_id
+
+    @classmethod
+    def delete(cls, search_id: int) -> bool:
+        with DBManager.get_write_cursor() as cursor:
+            cls._ensure_installed(cursor)
+            cursor.execute(f"DELETE FROM {cls.TABLE} WHERE id = ?", (search_id,))
+            return cursor.rowcount > 0
+
+    @classmethod
+    def list_all(cls) -> List[Dict[str, Any]]:
+        """保存した検索を名前順に返します（結果の機器IDは含めない）"""
+        try:
+            with closing(DBManager.connect()) as conn:
+                rows = conn.execute(
+                    f"SELECT id, name, conditions, row_count, run_at, created_by FROM {cls.TABLE} ORDER BY name"
+                ).fetchall()
+        except sqlite3.OperationalError as e:
+            # まだ1度も保存されていない（テーブル未作成）
+            if "no such table" in str(e):
+                return []
+            raise
+        return [
+            {"id": row[0], "name": row[1], "conditions": json.loads(row[2]), "row_count": row[3],
+             "run_at": row[4], "created_by": row[5]}
+            for row in rows
+        ]
+
+    # ========= 実行 =========
+    @classmethod
+    def load(cls, search_id: int) -> Dict[str, Any]:
+        """
+        保存した検索の条件と前回の結果を返します。
+            conditions: 検索条件（EquipmentModel.search_records に渡せる形）
+            result_ids: 前回の結果の機器ID（未実行なら None）
+            fresh: 前回の実行後に SOURCE_TABLES が変更されておらず、result_ids をそのまま使える
+        """
+        with closing(DBManager.connect()) as conn:
+            row = conn.execute(
+                f"SELECT name, conditions, result_ids, version, run_at FROM {cls.TABLE} WHERE id = ?", (search_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"保存した検索 {search_id} は見つかりません")
+            version = cls._version(conn)
+        result_ids = json.loads(row[2]) if row[2] is not None else None
+        return {
+            "id": search_id,
+            "name": row[0],
+            "conditions": json.loads(row[1]),
+            "result_ids": result_ids,
+            "run_at": row[4],
+            "fresh": result_ids is not None and version is not None and version == row[3],
+        }
+
+    @classmethod
+    def refresh(cls, search_id: int) -> List[int]:
+        """保存した条件で検索し直して、結果の機器IDと版を保存し、結果の機器IDを返します"""
+        with closing(DBManager.connect()) as conn:
+            row = conn.execute(f"SELECT conditions FROM {cls.TABLE} WHERE id = ?", (search_id,)).fetchone()
+            if row is None:
+                raise KeyError(f"保存した検索 {search_id} は見つかりません")
+            # 版と検索結果を同じスナップショットから取得する
+            conn.execute("BEGIN")
+            try:
+                version = cls._version(conn)
+                result_ids = EquipmentModel.search_ids(conn.cursor(), **json.loads(row[0]))
+            finally:
+                conn.rollback()
+
+        with DBManager.get_write_cursor() as cursor:
+            # 実行中に条件が保存し直された場合は、古い条件の結果で上書きしない
+            cursor.execute(
+                f"UPDATE {cls.TABLE} SET result_ids = ?, version = ?, row_count = ?, run_at = ?"
+                " WHERE id = ? AND conditions = ?",
+                (json.dumps(result_ids), version, len(result_ids), int(time.time()), search_id, row[0]),
+            )
+        return result_ids
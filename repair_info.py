@@ -1,4 +1,5 @@
 import sqlite3
+from models.db_manager import DBManager
 import tkinter as tk
 from tkinter import ttk, messagebox
 from contextlib import contextmanager
@@ -78,7 +79,7 @@ class RepairInfoWindow(tk.Toplevel):
 
     @contextmanager
     def _get_db_cursor(self) -> Iterator[sqlite3.Cursor]:
-        conn = sqlite3.connect(self.DB_NAME)
+        conn = DBManager.connect(self.DB_NAME)
         try:
             yield conn.cursor()
         finally:
@@ -0,0 +1,158 @@
+import argparse
+import csv
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.analytics_model import AnalyticsModel
+from models.events import ModelEvents
+
+
+class AnalyticsService:
+    """
+    AnalyticsModel の集計結果を (集計軸, 粒度) ごと・期間ごとにキャッシュするサービス。
+
+    修理が追加・更新されると、その依頼日を含む期間「以降」だけを無効化します。
+    MTBF は同じ機器の次回故障までの間隔に影響するため後続期間も再計算が必要ですが、
+    それより前の期間（過去の予算実績など）はキャッシュをそのまま再利用できます。
+    """
+
+    # (dimension, granularity) -> {"periods": {期間キー: 行リスト}, "stale_from": 再計算が必要な最初の期間,
+    #                              "version": 無効化のたびに増える番号}
+    # stale_from が None なら全期間が有効、"" なら全期間が未計算
+    _cache: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_rollups(
+        cls,
+        dimension: str,
+        granularity: str = "month",
+        period_from: Optional[str] = None,
+        period_to: Optional[str] = None
+    ) -> Dict[str, List[Tuple[Any, ...]]]:
+        """
+        期間キー -> 集計行リスト の辞書を返します（期間の昇順）。
+        無効化された期間以降だけをDBから再計算し、それ以外はキャッシュから返します。
+        """
+        key = (dimension, granularity)
+        with cls._lock:
+            entry = cls._cache.setdefault(key, {"periods": {}, "stale_from": "", "version": 0})
+            stale_from = entry["stale_from"]
+            version = entry["version"]
+
+        if stale_from is not None:
+            rows = AnalyticsModel.fetch_rollup(dimension, granularity, since_period=stale_from)
+            fresh: Dict[str, List[Tuple[Any, ...]]] = {}
+            for row in rows:
+                fresh.setdefault(row[0], []).append(row)
+
+            with cls._lock:
+                periods = entry["periods"]
+                for period in [p for p in periods if p >= stale_from]:
+                    del periods[period]
+                periods.update(fresh)
+                # 再計算中に別の無効化が入っていた場合はその分を残す
+                if entry["version"] == version:
+                    entry["stale_from"] = None
+
+        with cls._lock:
+            return {
+                period: list(rows)
+                for period, rows in sorted(entry["periods"].items())
+                if (period_from is None or period >= period_from)
+                and (period_to is None or period <= period_to)
+            }
+
+    @classmethod
+    def get_rollup(cls, dimension: str, granularity: str, period: str) -> List[Tuple[Any, ...]]:
+        """単一期間の集計行リストを返します"""
+        return cls.get_rollups(dimension, granularity, period, period).get(period, [])
+
+    @classmethod
+    def invalidate_from(cls, date_text: Optional[str]) -> None:
+        """指定日付を含む期間以降のキャッシュを、全ての集計軸・粒度で無効化します"""
+        with cls._lock:
+            for (_, granularity), entry in cls._cache.items():
+                period = AnalyticsModel.period_key(date_text, granularity)
+                if period is None:
+                    # 日付が不明な場合は安全側に倒して全期間を再計算
+                    entry["stale_from"] = ""
+                elif entry["stale_from"] is None or period < entry["stale_from"]:
+                    entry["stale_from"] = period
+                entry["version"] += 1
+
+    @classmethod
+    def clear(cls) -> None:
+        """全キャッシュを破棄します"""
+        with cls._lock:
+            cls._cache.clear()
+
+    @classmethod
+    def on_repair_changed(cls, payload: Dict[str, Any]) -> None:
+        """修理の追加・更新通知を受けて、影響する期間だけを無効化します"""
+        dates = [d for d in payload.get("request_dates", []) if d]
+        cls.invalidate_from(min(dates) if dates else None)
+
+    @classmethod
+    def on_equipment_changed(cls, payload: Dict[str, Any]) -> None:
+        """機器の所属（製造元・部門など）が変わると集計軸が変わるため全期間を無効化します"""
+        cls.invalidate_from(None)
+
+
+ModelEvents.subscribe("repair", AnalyticsService.on_repair_changed)
+ModelEvents.subscribe("equipment", AnalyticsService.on_equipment_changed)
+
+
+def format_rollup_rows(rollups: Dict[str, List[Tuple[Any, ...]]]) -> List[List[Any]]:
+    """画面表示・CSV出力用に、数値を丸めた行リストへ変換します"""
+    formatted = []
+    for rows in rollups.values():
+        for period, _, group_name, failures, equipments, mtbf, downtime, cost in rows:
+            formatted.append([
+                period,
+                group_name,
+                failures,
+                equipments,
+                "" if mtbf is None else round(mtbf, 1),
+                round(downtime or 0, 1),
+                int(cost or 0),
+            ])
+    return formatted
+
+
+REPORT_HEADERS = ["期間", "集計対象", "故障件数", "機器数", "MTBF(日)", "停止日数", "修理費用"]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    コマンドラインから集計結果を出力します。
+
+    使用例:
+        python -m service.analytics_service --dimension manufacturer --granularity year
+        python -m service.analytics_service -d department --from 2024-01 --to 2024-12 --csv
+    """
+    parser = argparse.ArgumentParser(description="修理実績の信頼性指標（MTBF・停止日数・修理費用）を集計します")
+    parser.add_argument("-d", "--dimension", choices=list(AnalyticsModel.DIMENSIONS), default="manufacturer")
+    parser.add_argument("-g", "--granularity", choices=list(AnalyticsModel.PERIOD_FORMATS), default="month")
+    parser.add_argument("--from", dest="period_from", help="開始期間 (例: 2024-01 / 2024)")
+    parser.add_argument("--to", dest="period_to", help="終了期間 (例: 2024-12 / 2024)")
+    parser.add_argument("--csv", action="store_true", help="CSV形式で出力する")
+    args = parser.parse_args(argv)
+
+    rollups = AnalyticsService.get_rollups(args.dimension, args.granularity, args.period_from, args.period_to)
+    rows = format_rollup_rows(rollups)
+
+    if args.csv:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(REPORT_HEADERS)
+        writer.writerows(rows)
+    else:
+        print("\t".join(REPORT_HEADERS))
+        for row in rows:
+            print("\t".join(str(v) for v in row))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""
+機器・修理履歴・マスタを JSON で返す、画面なしの HTTP API サーバー。
+
+病棟システムや夜間バッチから台帳を参照するためのもので、読み取り専用です。
+asyncio のストリームで HTTP/1.1（keep-alive 対応）を処理し、DBの読み取りは
+AsyncDB（専用スレッドプール + DBManager の接続プール）で実行します（tkinter は読み込みません）。
+クライアントが途中で切断した場合は、実行中の読み取りも中断されます。
+
+エンドポイント:
+    GET /api/equipments?name=...&department_id=5&statuse_id=3  機器検索（search_equipments と同じ条件・分割送信）
+    GET /api/equipments/{機器コード}                           機器詳細
+    GET /api/equipments/{機器コード}/repairs                   修理履歴一覧
+    GET /api/repairs/{修理ID}                                 修理レコード1件
+    GET /api/masters                                          参照できるマスタテーブル名の一覧
+    GET /api/masters/{テーブル名}                              マスタの (id, name) 一覧（ETag 付き）
+
+使用例:
+    python -m service.api_server
+    python -m service.api_server --host 0.0.0.0 --port 8765 --db C:\\DataBase\\equipment_management.db
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from models.async_models import AsyncDB
+from models.change_watcher import ChangeWatcher
+from models.db_manager import DBManager
+from models.equipment_model import EquipmentModel
+from models.equipment_record import EquipmentRecord
+from models.events import ModelEvents
+from models.master_model import MasterModel
+from models.repair_model import RepairModel
+
+
+class ApiError(Exception):
+    """HTTP のステータスコード付きで返すエラー"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiServer:
+    """
+    JSON API サーバー本体。
+
+    - マスタの応答は本文から ETag を求めてキャッシュし、If-None-Match が一致すれば 304 を返します。
+      キャッシュは ModelEvents の "master" 通知（他端末の変更は ChangeWatcher が検知）で破棄します。
+    - 機器検索は id 順に BATCH_SIZE 件ずつ読み、チャンク転送で少しずつ送ります。
+      全件をメモリに溜めず、クライアントの受信が遅い場合は読み取りも待たせます。
+    """
+
+    _settings: Dict[str, Any] = DBManager._config.get("api", {})
+    HOST: str = _settings.get("host", "127.0.0.1")
+    PORT: int = _settings.get("port", 8765)
+    # DB読み取りを行うスレッド数（= プールされる接続の最大数）
+    POOL_SIZE: int = _settings.get("pool_size", 4)
+    BATCH_SIZE = 1000
+    # keep-alive 接続で次の要求を待つ秒数
+    IDLE_TIMEOUT_SEC = 30
+    MAX_HEADER_LINES = 100
+
+    # 検索条件のクエリパラメータ -> 型（search_equipments の引数名と同じ）
+    SEARCH_PARAMS: Dict[str, Callable[[str], Any]] = {
+        "equipment_code": str, "name": str, "name_kana": str, "remarks": str,
+        "category_id": int, "statuse_id": int, "department_id": int, "room_id": int,
+        "manufacturer_id": int, "celler_id": int,
+    }
+
+    STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+                   405: "Method Not Allowed", 500: "Internal Server Error"}
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None, pool_size: Optional[int] = None):
+        self.host = host or self.HOST
+        self.port = port or self.PORT
+        self.pool_size = pool_size or self.POOL_SIZE
+        # ChangeWatcher は常駐接続を持つため、常に同じ1スレッドから呼び出す
+        self._watch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-watch")
+        # テーブル名 -> (ETag, 本文)
+        self._master_cache: Dict[str, Tuple[str, bytes]] = {}
+        self._lookups: Optional[Dict[str, Dict[int, str]]] = None
+        ModelEvents.subscribe("master", self._on_master_changed)
+
+    def _on_master_changed(self, payload: Dict[str, Any]) -> None:
+        """変更されたマスタのキャッシュだけを破棄する（テーブルが特定できない通知では全部）"""
+        table = payload.get("table")
+        if table is None:
+            self._master_cache = {}
+            self._lookups = None
+            return
+        self._master_cache.pop(table, None)
+        if self._lookups is not None and table in self._lookups:
+            self._lookups = None
+
+    async def _db(self, func: Callable[..., Any], *args: Any) -> Any:
+        """DBを読む処理をスレッドプールで実行する"""
+        return await AsyncDB.run(func, *args)
+
+    # ---- 接続の処理 ----
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.IDLE_TIMEOUT_SEC)
+                except asyncio.TimeoutError:
+                    break
+                if request is None:
+                    break
+                method, target, headers = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    await self._dispatch(method, target, headers, writer, keep_alive)
+                except ApiError as e:
+                    await self._send_json(writer, e.status, {"error": str(e)}, keep_alive)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    break
+                except Exception as e:
+                    print(f"[-] API処理エラー ({method} {target}): {e}")
+                    await self._send_json(writer, 500, {"error": "internal server error"}, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str]]]:
+        """要求行とヘッダーを読み、(メソッド, パス, ヘッダー) を返す（切断時は None）"""
+        line = await reader.readline()
+        if not line:
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3:
+            return None
+        headers: Dict[str, str] = {}
+        for _ in range(self.MAX_HEADER_LINES):
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = header.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        # GET のみ受け付けるが、本文付きの要求が来ても次の要求を読めるよう読み捨てる
+        length = int(headers.get("content-length", "0") or 0)
+        if length:
+            await reader.readexactly(length)
+        return parts[0].upper(), parts[1], headers
+
+    async def _dispatch(self, method: str, target: str, headers: Dict[str, str],
+                        writer: asyncio.StreamWriter, keep_alive: bool) -> None:
+        if method != "GET":
+            raise ApiError(405, "GET のみ利用できます")
+        url = urlsplit(target)
+        path = [unquote(p) for p in url.path.strip("/").split("/")]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if path[:1] != ["api"]:
+            raise ApiError(404, "not found")
+        route = path[1:]
+        if route == ["equipments"]:
+            await self._stream_equipments(writer, query, keep_alive)
+        elif len(route) == 2 and route[0] == "equipments":
+            detail = await self._db(RepairModel.get_equipment_detail_by_code, route[1])
+            if detail is None:
+                raise ApiError(404, f"機器コード {route[1]} は登録されていません")
+            await self._send_json(writer, 200, detail, keep_alive)
+        elif len(route) == 3 and route[0] == "equipments" and route[2] == "repairs":
+            rows = await self._db(RepairModel.get_history_by_equipment, route[1])
+            await self._send_json(writer, 200, [dict(zip(RepairModel.HISTORY_FIELDS, row)) for row in rows], keep_alive)
+        elif len(route) == 2 and route[0] == "repairs":
+            row = await self._db(RepairModel.get_repair_record_by_id, self._to_int("repair_id", route[1]))
+            if row is None:
+                raise ApiError(404, f"修理ID {route[1]} は登録されていません")
+            await self._send_json(writer, 200, dict(zip(RepairModel.RECORD_FIELDS, row)), keep_alive)
+        elif route == ["masters"]:
+            await self._send_json(writer, 200, list(MasterModel.MASTER_TABLES), keep_alive)
+        elif len(route) == 2 and route[0] == "masters":
+            await self._send_master(writer, route[1], headers, keep_alive)
+        else:
+            raise ApiError(404, "not found")
+
+    # ---- 各エンドポイント ----
+
+    async def _send_master(self, writer: asyncio.StreamWriter, table: str,
+                           headers: Dict[str, str], keep_alive: bool) -> None:
+        if table not in MasterModel.MASTER_TABLES:
+            raise ApiError(404, f"マスタ {table} は参照できません")
+        cached = self._master_cache.get(table)
+        if cached is None:
+            rows = await self._db(MasterModel.fetch_all, table)
+            body = self._encode([{"id": row[0], "name": row[1]} for row in rows])
+            cached = (f'"{hashlib.sha1(body).hexdigest()[:16]}"', body)
+            self._master_cache[table] = cached
+        etag, body = cached
+        extra = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in [tag.strip() for tag in headers.get("if-none-match", "").split(",")]:
+            await self._send(writer, 304, b"", keep_alive, extra)
+        else:
+            await self._send(writer, 200, body, keep_alive, extra)
+
+    async def _stream_equipments(self, writer: asyncio.StreamWriter, query: Dict[str, str], keep_alive: bool) -> None:
+        """機器検索の結果を JSON 配列としてチャンク転送で送る"""
+        limit = self._to_int("limit", query.pop("limit")) if "limit" in query else None
+        conditions = {}
+        for key, value in query.items():
+            if key not in self.SEARCH_PARAMS:
+                raise ApiError(400, f"未対応の検索条件です: {key}")
+            conditions[key] = value if self.SEARCH_PARAMS[key] is str else self._to_int(key, value)
+
+        if self._lookups is None:
+            self._lookups = await self._db(self._load_lookups)
+        lookups = self._lookups
+        sql, params = EquipmentModel.build_search_query(**conditions)
+        sql += " AND id > ? ORDER BY id LIMIT ?"
+
+        def fetch_batch(last_id: int, size: int) -> List[EquipmentRecord]:
+            with DBManager.get_cursor() as cursor:
+                cursor.execute(sql, params + (last_id, size))
+                return [EquipmentRecord.from_row(row, lookups) for row in cursor]
+
+        self._send_head(writer, 200, keep_alive, {"Transfer-Encoding": "chunked"})
+        await self._write_chunk(writer, b"[")
+        last_id, sent = 0, 0
+        while limit is None or sent < limit:
+            size = self.BATCH_SIZE if limit is None else min(self.BATCH_SIZE, limit - sent)
+            try:
+                records = await self._db(fetch_batch, last_id, size)
+            except Exception as e:
+                # ヘッダー送信後はエラー応答に切り替えられないため、接続を切って不完全な応答であることを伝える
+                print(f"[-] 機器検索の送信中にエラー: {e}")
+                raise ConnectionError(str(e))
+            if not records:
+                break
+            body = b",".join(self._encode(record.to_dict()) for record in records)
+            await self._write_chunk(writer, (b"," if sent else b"") + body)
+            sent += len(records)
+            last_id = records[-1].id
+            if len(records) < size:
+                break
+        await self._write_chunk(writer, b"]")
+        await self._write_chunk(writer, b"")
+
+    @staticmethod
+    def _load_lookups() -> Dict[str, Dict[int, str]]:
+        return {master: MasterModel.get_kv_lookup(master) for _, _, master in EquipmentRecord.MASTER_FIELDS}
+
+    # ---- 応答の送信 ----
+
+    @staticmethod
+    def _to_int(name: str, value: str) -> int:
+        try:
+            return int(value)
+        except ValueError:
+            raise ApiError(400, f"{name} は整数で指定してください: {value}")
+
+    @staticmethod
+    def _encode(data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def _send_head(self, writer: asyncio.StreamWriter, status: int, keep_alive: bool,
+                         extra: Optional[Dict[str, str]] = None) -> None:
+        lines = [f"HTTP/1.1 {status} {self.STATUS_TEXT.get(status, '')}",
+                 "Content-Type: application/json; charset=utf-8",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{key}: {value}" for key, value in (extra or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, body: bytes, keep_alive: bool,
+                    extra: Optional[Dict[str, str]] = None) -> None:
+        self._send_head(writer, status, keep_alive, {**(extra or {}), "Content-Length": str(len(body))})
+        writer.write(body)
+        await writer.drain()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, data: Any, keep_alive: bool) -> None:
+        await self._send(writer, status, self._encode(data), keep_alive)
+
+    @staticmethod
+    async def _write_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+        writer.write(f"{len(data):X}\r\n".encode("latin-1") + data + b"\r\n")
+        await writer.drain()
+
+    # ---- 起動 ----
+
+    async def _watch_changes(self) -> None:
+        """他端末でのマスタ変更を検知してキャッシュを破棄する"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(ChangeWatcher.POLL_INTERVAL_MS / 1000)
+            try:
+                await loop.run_in_executor(self._watch_executor, ChangeWatcher.poll)
+            except Exception as e:
+                print(f"[-] 変更検知エラー: {e}")
+
+    async def serve(self) -> None:
+        AsyncDB.configure(self.pool_size)
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        watcher = asyncio.create_task(self._watch_changes())
+        print(f"[+] API サーバーを起動しました: http://{self.host}:{self.port}/api/")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+            DBManager.close_pool()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="機器台帳を参照する JSON API サーバーを起動します")
+    parser.add_argument("--host", default=ApiServer.HOST)
+    parser.add_argument("--port", type=int, default=ApiServer.PORT)
+    parser.add_argument("--pool-size", type=int, default=ApiServer.POOL_SIZE, help="DB読み取りの同時実行数")
+    parser.add_argument("--db", help="DBファイルのパス（省略時は config.json の db_name）")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        DBManager.DB_NAME = args.db
+    try:
+        asyncio.run(ApiServer(args.host, args.port, args.pool_size).serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,522 @@
+"""
+画面を起動せずに機器台帳を検索・出力するコマンドラインツール。
+
+tkinter / tkcalendar を読み込まないため起動が速く、夜間バッチなどからも使えます。
+結果は1件ずつ書き出すため、件数が多くても出力がすぐに始まります。
+
+使用例:
+    python -m service.cli search --department 病理検査 --status 修理中
+    python -m service.cli search --name 顕微鏡 --format csv > microscopes.csv
+    python -m service.cli history 01001 --format jsonl
+    python -m service.cli export --department 5 -o export_folder/pathology.xlsx
+    python -m service.cli stats --by status --department 病理検査
+    python -m service.cli audit --code 01001 --since 2025-04-01
+    python -m service.cli audit-compact --retention-days 3650
+    python -m service.cli backup --keep 14
+    python -m service.cli maintenance --tables
+    python -m service.cli duplicates --full --format csv > duplicates.csv
+    python -m service.cli labels --department 病理検査 --symbology qr -o export_folder/labels.pdf
+    python -m service.cli labels --from 03001 --to 03999 -o export_folder/labels_03.pdf
+    python -m service.cli maintenance --enable-incremental-vacuum
+    python -m service.cli restore D:/EquipmentBackup/equipment_management_20250401_020000.db.gz --yes
+"""
+import argparse
+import contextlib
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+import unicodedata
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
+
+from models.audit_log import AuditLog
+from models.backup_manager import BackupError, BackupManager
+from models.db_maintenance import DBMaintenance
+from models.db_manager import DBManager
+from models.duplicate_detector import DuplicateDetector
+from models.equipment_model import EquipmentModel
+from models.equipment_record import EquipmentRecord
+from models.equipment_result import EquipmentResultSet
+from models.master_model import MasterModel
+from models.repair_model import RepairModel
+from service.label_service import LabelError, LabelService
+
+# 検索オプション名 -> (search_equipments の引数名, マスタテーブル名)
+MASTER_OPTIONS: Dict[str, Tuple[str, str]] = {
+    "category": ("category_id", "categorie_master"),
+    "status": ("statuse_id", "statuse_master"),
+    "department": ("department_id", "department_master"),
+    "room": ("room_id", "room_master"),
+    "manufacturer": ("manufacturer_id", "manufacturer_master"),
+    "celler": ("celler_id", "celler_master"),
+}
+
+# stats --by の指定 -> equipment のカラム名
+STATS_COLUMNS = {
+    "category": "categorie_id", "status": "statuse_id", "department": "department_id",
+    "room": "room_id", "manufacturer": "manufacturer_id", "celler": "celler_id",
+}
+
+AUDIT_HEADERS = ["日時", "操作者", "テーブル", "行ID", "機器コード", "列", "操作", "変更前", "変更後"]
+AUDIT_FIELDS = ("changed_at", "actor", "table", "row_id", "equipment_code", "column", "op", "old_value", "new_value")
+
+BACKUP_HEADERS = ["作成日時", "ファイル", "DBサイズ(MB)", "ファイルサイズ(MB)", "添付数"]
+
+DUPLICATE_HEADERS = ["残す器材番号", "残す機器名", "修理件数", "重複候補の器材番号", "重複候補の機器名", "修理件数",
+                     "類似度", "内訳"]
+
+HISTORY_HEADERS = ["修理ID", "修理状態", "依頼日", "完了日", "修理種別", "業者名", "対応技術者", "修理詳細内容", "備考"]
+
+# table 形式で列幅を決めるために先読みする行数（以降の行はこの幅で出力する）
+TABLE_SAMPLE_ROWS = 200
+
+
+class CliError(Exception):
+    """利用者の指定誤りなど、メッセージだけを表示して終了するエラー"""
+
+
+def load_lookups() -> Dict[str, Dict[int, str]]:
+    return {master: MasterModel.get_kv_lookup(master) for _, _, master in EquipmentRecord.MASTER_FIELDS}
+
+
+def resolve_master_id(value: str, lookup: Dict[int, str], option: str) -> int:
+    """マスタの名称（またはID）を ID に変換する"""
+    if value.isdigit():
+        return int(value)
+    for master_id, name in lookup.items():
+        if name == value:
+            return master_id
+    choices = "、".join(lookup.values())
+    raise CliError(f"--{option} に指定された「{value}」は登録されていません（候補: {choices}）")
+
+
+def build_conditions(args: argparse.Namespace, lookups: Dict[str, Dict[int, str]]) -> Dict[str, Any]:
+    """コマンドライン引数を search_equipments の検索条件に変換する"""
+    conditions: Dict[str, Any] = {
+        "equipment_code": args.code, "name": args.name, "name_kana": args.kana, "remarks": args.remarks,
+    }
+    for option, (param, master) in MASTER_OPTIONS.items():
+        value = getattr(args, option)
+        if value:
+            conditions[param] = resolve_master_id(value, lookups[master], option)
+    return conditions
+
+
+# ---- 出力形式 ----
+
+def _display_width(text: str) -> int:
+    """全角文字を2桁として数えた表示幅"""
+    return sum(2 if unicodedata.east_asian_width(ch) in "WF" else 1 for ch in text)
+
+
+def _pad(text: str, width: int) -> str:
+    return text + " " * max(width - _display_width(text), 0)
+
+
+def write_table(out: TextIO, headers: Sequence[str], rows: Iterable[Sequence[Any]]) -> None:
+    """
+    列をそろえた表形式で出力する。
+    先頭の TABLE_SAMPLE_ROWS 行だけで列幅を決め、残りは読みながらそのまま書き出す。
+    """
+    iterator = iter(rows)
+    sample: List[List[str]] = []
+    for row in iterator:
+        sample.append(["" if v is None else str(v) for v in row])
+        if len(sample) >= TABLE_SAMPLE_ROWS:
+            break
+    widths = [_display_width(h) for h in headers]
+    for row in sample:
+        widths = [max(w, _display_width(v)) for w, v in zip(widths, row)]
+
+    def emit(values: Sequence[str]) -> None:
+        out.write("  ".join(_pad(v, w) for v, w in zip(values, widths)).rstrip() + "\n")
+
+    emit(headers)
+    emit(["-" * w for w in widths])
+    for row in sample:
+        emit(row)
+    for row in iterator:
+        emit(["" if v is None else str(v) for v in row])
+
+
+def write_rows(out: TextIO, fmt: str, headers: Sequence[str], items: Iterable[Any],
+               to_values: Callable[[Any], Sequence[Any]], to_dict: Callable[[Any], Dict[str, Any]]) -> None:
+    """table / csv は画面と同じ見出し・表示値、jsonl はカラム名をキーにした辞書で1行ずつ出力する"""
+    if fmt == "jsonl":
+        for item in items:
+            out.write(json.dumps(to_dict(item), ensure_ascii=False) + "\n")
+    elif fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(headers)
+        for item in items:
+            writer.writerow(to_values(item))
+    else:
+        write_table(out, headers, (to_values(item) for item in items))
+
+
+def history_dict(row: Sequence[Any]) -> Dict[str, Any]:
+    return dict(zip(RepairModel.HISTORY_FIELDS, row))
+
+
+# ---- サブコマンド ----
+
+def cmd_search(args: argparse.Namespace, out: TextIO) -> int:
+    lookups = load_lookups()
+    records = EquipmentModel.iter_records(lookups, **build_conditions(args, lookups))
+    if args.limit:
+        records = itertools.islice(records, args.limit)
+    write_rows(out, args.format, EquipmentResultSet.HEADERS, records,
+               EquipmentRecord.display_values, EquipmentRecord.to_dict)
+    return 0
+
+
+def cmd_history(args: argparse.Namespace, out: TextIO) -> int:
+    if RepairModel.get_equipment_detail_by_code(args.equipment_code) is None:
+        raise CliError(f"機器コード {args.equipment_code} は登録されていません")
+    rows = RepairModel.get_history_by_equipment(args.equipment_code)
+    write_rows(out, args.format, HISTORY_HEADERS, rows, tuple, history_dict)
+    return 0
+
+
+def cmd_export(args: argparse.Namespace, out: TextIO) -> int:
+    """検索結果をファイルへ出力する（拡張子で形式を判定: .xlsx / .csv / .jsonl）"""
+    lookups = load_lookups()
+    records = EquipmentModel.iter_records(lookups, **build_conditions(args, lookups))
+    ext = os.path.splitext(args.output)[1].lower()
+    if ext == ".xlsx":
+        # openpyxl は出力時にだけ読み込む
+        from export_to_excel import export_to_excel
+        # export_to_excel は完了メッセージを標準出力に書くため、他の形式と同じく標準エラー出力へ回す
+        with contextlib.redirect_stdout(sys.stderr):
+            export_to_excel((record.display_values() for record in records), EquipmentResultSet.HEADERS,
+                            output_folder=os.path.dirname(args.output) or ".",
+                            filename=os.path.basename(args.output))
+        return 0
+    if ext not in (".csv", ".jsonl"):
+        raise CliError(f"出力ファイルの拡張子は .xlsx / .csv / .jsonl のいずれかにしてください: {args.output}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    # CSV は Excel で文字化けしないよう BOM 付き UTF-8 で書き出す
+    encoding = "utf-8-sig" if ext == ".csv" else "utf-8"
+    with open(args.output, "w", encoding=encoding, newline="") as f:
+        write_rows(f, ext[1:], EquipmentResultSet.HEADERS, records,
+                   EquipmentRecord.display_values, EquipmentRecord.to_dict)
+    print(f"[+] {args.output} を出力しました。", file=sys.stderr)
+    return 0
+
+
+def cmd_stats(args: argparse.Namespace, out: TextIO) -> int:
+    """検索条件に一致する機器の件数を、指定したマスタごとに集計する"""
+    lookups = load_lookups()
+    column = STATS_COLUMNS[args.by]
+    master = MASTER_OPTIONS[args.by][1]
+    counts = EquipmentModel.count_by(column, **build_conditions(args, lookups))
+    write_rows(out, args.format, ["集計対象", "件数"], counts,
+               lambda row: (lookups[master].get(row[0], "不明"), row[1]),
+               lambda row: {"id": row[0], "name": lookups[master].get(row[0]), "count": row[1]})
+    return 0
+
+
+def _parse_date(value: Optional[str], option: str) -> Optional[float]:
+    """YYYY-MM-DD（または YYYY-MM-DD HH:MM）を UNIX 秒に変換する"""
+    if not value:
+        return None
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(datetime.strptime(value, fmt).timetuple())
+        except ValueError:
+            continue
+    raise CliError(f"--{option} は YYYY-MM-DD 形式で指定してください: {value}")
+
+
+def cmd_audit(args: argparse.Namespace, out: TextIO) -> int:
+    """監査ログ（機器・修理の列ごとの変更履歴）を新しい順に出力する"""
+    rows = AuditLog.history(args.code, _parse_date(args.since, "since"), _parse_date(args.until, "until"), args.limit)
+    write_rows(out, args.format, AUDIT_HEADERS, rows, tuple, lambda row: dict(zip(AUDIT_FIELDS, row)))
+    return 0
+
+
+def cmd_audit_compact(args: argparse.Namespace, out: TextIO) -> int:
+    result = AuditLog.compact(args.retention_days, args.merge_window_sec)
+    out.write(f"保持期間切れの削除: {result['expired']} 件 / 連続変更の統合: {result['merged']} 件\n")
+    return 0
+
+
+def _progress_printer(label: str) -> Callable[[int, int], None]:
+    """バックアップ・復元の進捗を標準エラー出力に1行で上書き表示する"""
+    def show(done: int, total: int) -> None:
+        print(f"\r{label}: {done * 100 // max(total, 1):3d}% ({done}/{total} ページ)",
+              end="" if done < total else "\n", file=sys.stderr, flush=True)
+    return show
+
+
+def _backup_row(manifest: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        datetime.fromtimestamp(manifest["created_at"]).strftime("%Y-%m-%d %H:%M:%S"),
+        manifest["path"],
+        round(manifest["db_bytes"] / 1024 / 1024, 1),
+        round(manifest["file_bytes"] / 1024 / 1024, 1),
+        manifest["attachments"]["count"],
+    )
+
+
+def cmd_backup(args: argparse.Namespace, out: TextIO) -> int:
+    """共有DBのバックアップを作成して検証し、古い世代を削除する"""
+    try:
+        manifest = BackupManager.backup(args.dir, compress=False if args.no_compress else None,
+                                        progress=None if args.quiet else _progress_printer("コピー"))
+    except BackupError as e:
+        raise CliError(str(e))
+    removed = BackupManager.rotate(args.keep, args.dir)
+    t = manifest["timings"]
+    out.write(f"{manifest['path']}\n")
+    out.write(f"  DB {manifest['db_bytes'] / 1024 / 1024:.1f} MB -> {manifest['file_bytes'] / 1024 / 1024:.1f} MB"
+              f" / コピー {t['copy_sec']:.1f} 秒・検証 {t['verify_sec']:.1f} 秒・圧縮 {t['compress_sec']:.1f} 秒"
+              f" / 添付 {manifest['attachments']['count']} 件\n")
+    removed = [path for path in removed if not path.endswith(".json")]
+    if removed:
+        out.write(f"  古い世代を {len(removed)} 件削除しました\n")
+    return 0
+
+
+def cmd_backup_list(args: argparse.Namespace, out: TextIO) -> int:
+    write_rows(out, args.format, BACKUP_HEADERS, BackupManager.list_backups(args.dir), _backup_row,
+               lambda m: {k: v for k, v in m.items() if k != "attachments"})
+    return 0
+
+
+def cmd_backup_verify(args: argparse.Namespace, out: TextIO) -> int:
+    try:
+        manifest = BackupManager.verify(args.path)
+    except BackupError as e:
+        raise CliError(str(e))
+    out.write(f"OK: {args.path} (SHA-256 {manifest['sha256'][:16]}…・整合性チェック正常)\n")
+    return 0
+
+
+def cmd_restore(args: argparse.Namespace, out: TextIO) -> int:
+    """バックアップの内容で共有DBを置き換える（復元前の内容は自動でバックアップしておく）"""
+    if not args.yes:
+        raise CliError(f"共有DB ({DBManager.DB_NAME}) を置き換えます。実行する場合は --yes を指定してください")
+    try:
+        saved = BackupManager.restore(args.path, progress=_progress_printer("復元"))
+    except BackupError as e:
+        raise CliError(str(e))
+    out.write(f"{args.path} から復元しました。復元前の内容: {saved['path']}\n")
+    return 0
+
+
+def _write_stats(out: TextIO, label: str, stats: Dict[str, Any]) -> None:
+    out.write(f"{label}: {stats['db_bytes'] / 1024 / 1024:.1f} MB ({stats['page_count']} ページ)"
+              f" / 空きページ {stats['freelist_count']} ({stats['freelist_ratio'] * 100:.1f}%)"
+              f" / auto_vacuum={stats['auto_vacuum']} / 統計情報 {'あり' if stats['analyzed'] else 'なし'}\n")
+
+
+def cmd_maintenance(args: argparse.Namespace, out: TextIO) -> int:
+    """統計情報の更新・古い変更記録の削除・空きページの回収・整合性チェックを行い、前後の検索の所要時間を比較する"""
+    if args.enable_incremental_vacuum:
+        if not args.no_backup:
+            out.write(f"移行前のバックアップ: {BackupManager.backup(label='pre_vacuum')['path']}\n")
+        start = time.perf_counter()
+        if DBMaintenance.enable_incremental_vacuum():
+            out.write(f"auto_vacuum を INCREMENTAL に移行しました ({time.perf_counter() - start:.1f} 秒)\n")
+        else:
+            out.write("auto_vacuum は移行済みです\n")
+
+    report = DBMaintenance.run(
+        analyze=not args.no_analyze, vacuum=not args.no_vacuum, check=not args.no_check,
+        benchmark=not args.no_benchmark, full_analyze=args.full_analyze, prune=not args.no_prune,
+        progress=lambda message: print(message, file=sys.stderr, flush=True),
+    )
+    _write_stats(out, "実行前", report["before"])
+    _write_stats(out, "実行後", report["after"])
+    for name, step in report["steps"].items():
+        out.write(f"  {name}: {step['seconds']:.2f} 秒 -> {step['result'] if step['result'] != [] else 'ok'}\n")
+
+    if "timings_before" in report:
+        rows = [
+            (label, f"{before * 1000:.2f}", f"{report['timings_after'][label] * 1000:.2f}",
+             f"{report['timings_after'][label] / before:.2f}" if before else "-")
+            for label, before in report["timings_before"].items()
+        ]
+        write_table(out, ["検索", "実行前(ms)", "実行後(ms)", "比"], rows)
+
+    if args.tables:
+        tables = DBMaintenance.stats(tables=True)["tables"]
+        if tables is None:
+            out.write("表ごとの統計は、このDB（dbstat 非対応）では取得できません\n")
+        else:
+            write_table(out, ["表・索引", "ページ数", "未使用率(%)"],
+                        [(t["name"], t["pages"], f"{t['unused_ratio'] * 100:.1f}") for t in tables])
+
+    if report["problems"]:
+        print("[-] 整合性チェックで問題が見つかりました:\n" + "\n".join(report["problems"]), file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_duplicates(args: argparse.Namespace, out: TextIO) -> int:
+    """重複登録の候補を、残す機器と重複候補の組で1行ずつ出力する（既定は前回以降に追加・変更された機器だけ）"""
+    if args.threshold is not None:
+        DuplicateDetector.THRESHOLD = args.threshold
+    result = DuplicateDetector.scan(full=args.full)
+    pairs = [(proposal["keep"], duplicate) for proposal in result["proposals"] for duplicate in proposal["duplicates"]]
+    write_rows(out, args.format, DUPLICATE_HEADERS, pairs,
+               lambda pair: (pair[0]["equipment_code"], pair[0]["name"], pair[0]["repairs"],
+                             pair[1]["equipment_code"], pair[1]["name"], pair[1]["repairs"],
+                             f"{pair[1]['score']:.3f}", " / ".join(pair[1]["reasons"])),
+               lambda pair: {"keep": pair[0], "duplicate": pair[1]})
+    print(f"[+] {'全件' if result['mode'] == 'full' else '差分'}: {result['rows']} 件を照合"
+          f" ({result['blocks']} ブロック, {result['comparisons']} 組を比較) -> 候補 {len(result['proposals'])} 件"
+          f" ({result['seconds']:.2f} 秒)", file=sys.stderr)
+    return 0
+
+
+def cmd_labels(args: argparse.Namespace, out: TextIO) -> int:
+    """検索結果または器材番号の範囲の機器のラベルを PDF に出力する"""
+    lookups = load_lookups()
+    if args.first or args.last:
+        if not (args.first and args.last):
+            raise CliError("--from と --to は両方指定してください")
+        records = EquipmentModel.iter_records_in_code_range(lookups, args.first, args.last)
+    else:
+        records = EquipmentModel.iter_records(lookups, **build_conditions(args, lookups))
+
+    def show(done: int, total: Optional[int]) -> None:
+        print(f"\rラベル: {done} 枚", end="", file=sys.stderr, flush=True)
+
+    try:
+        stats = LabelService.generate(LabelService.from_records(records), args.output, symbology=args.symbology,
+                                      workers=args.workers, progress=None if args.quiet else show)
+    except LabelError as e:
+        raise CliError(str(e))
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"[+] {args.output} を出力しました: {stats['labels']} 枚 / {stats['pages']} ページ"
+          f" (画像の作成 {stats['rendered']} / キャッシュ {stats['cached']}, {stats['seconds']:.1f} 秒)", file=sys.stderr)
+    return 0
+
+
+def add_search_options(parser: argparse.ArgumentParser) -> None:
+    """search / export / stats 共通の検索条件（マスタは名称・IDのどちらでも指定可）"""
+    parser.add_argument("--code", help="器材番号（部分一致）")
+    parser.add_argument("--name", help="機器名（部分一致）")
+    parser.add_argument("--kana", help="機器名カナ（部分一致）")
+    parser.add_argument("--remarks", help="備考（部分一致）")
+    for option in MASTER_OPTIONS:
+        parser.add_argument(f"--{option}", metavar="名称またはID")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m service.cli", description="機器台帳をコマンドラインから検索・出力します")
+    parser.add_argument("--db", help="DBファイルのパス（省略時は config.json の db_name）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    formats = ("table", "csv", "jsonl")
+
+    p = sub.add_parser("search", help="機器を検索して一覧を出力")
+    add_search_options(p)
+    p.add_argument("--limit", type=int, help="出力する最大件数")
+    p.add_argument("-f", "--format", choices=formats, default="table")
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("history", help="機器の修理履歴を出力")
+    p.add_argument("equipment_code")
+    p.add_argument("-f", "--format", choices=formats, default="table")
+    p.set_defaults(func=cmd_history)
+
+    p = sub.add_parser("export", help="検索結果をファイルへ出力 (.xlsx / .csv / .jsonl)")
+    add_search_options(p)
+    p.add_argument("-o", "--output", required=True)
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("stats", help="検索結果の件数をマスタごとに集計")
+    add_search_options(p)
+    p.add_argument("--by", choices=list(STATS_COLUMNS), default="status")
+    p.add_argument("-f", "--format", choices=formats, default="table")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("audit", help="監査ログ（誰がいつ何を変更したか）を出力")
+    p.add_argument("--code", help="機器コード（完全一致）")
+    p.add_argument("--since", help="この日時以降 (YYYY-MM-DD [HH:MM])")
+    p.add_argument("--until", help="この日時より前 (YYYY-MM-DD [HH:MM])")
+    p.add_argument("--limit", type=int)
+    p.add_argument("-f", "--format", choices=formats, default="table")
+    p.set_defaults(func=cmd_audit)
+
+    p = sub.add_parser("audit-compact", help="監査ログの保持期間切れの削除と連続変更の統合")
+    p.add_argument("--retention-days", type=int, help=f"保持日数（既定 {AuditLog.RETENTION_DAYS}）")
+    p.add_argument("--merge-window-sec", type=int, help=f"統合する間隔の秒数（既定 {AuditLog.MERGE_WINDOW_SEC}）")
+    p.set_defaults(func=cmd_audit_compact)
+
+    p = sub.add_parser("backup", help="共有DBのバックアップを作成（検証・圧縮・古い世代の削除）")
+    p.add_argument("--dir", help=f"保存先（既定 {BackupManager.BACKUP_DIR}）")
+    p.add_argument("--keep", type=int, help=f"残す世代数（既定 {BackupManager.KEEP}）")
+    p.add_argument("--no-compress", action="store_true", help="gzip 圧縮しない")
+    p.add_argument("-q", "--quiet", action="store_true", help="進捗を表示しない")
+    p.set_defaults(func=cmd_backup)
+
+    p = sub.add_parser("backup-list", help="バックアップの一覧を新しい順に出力")
+    p.add_argument("--dir")
+    p.add_argument("-f", "--format", choices=formats, default="table")
+    p.set_defaults(func=cmd_backup_list)
+
+    p = sub.add_parser("backup-verify", help="バックアップファイルを展開して検証")
+    p.add_argument("path")
+    p.set_defaults(func=cmd_backup_verify)
+
+    p = sub.add_parser("maintenance", help="統計情報の更新・変更記録の削除・空きページの回収・整合性チェック")
+    p.add_argument("--no-analyze", action="store_true", help="ANALYZE / PRAGMA optimize を行わない")
+    p.add_argument("--full-analyze", action="store_true", help="統計情報があっても ANALYZE をやり直す")
+    p.add_argument("--no-vacuum", action="store_true", help="incremental_vacuum を行わない")
+    p.add_argument("--no-check", action="store_true", help="quick_check を行わない")
+    p.add_argument("--no-benchmark", action="store_true", help="前後の検索の所要時間を計測しない")
+    p.add_argument("--no-prune", action="store_true", help="保持期間を過ぎた change_log の記録を削除しない")
+    p.add_argument("--tables", action="store_true", help="表・索引ごとのページ数を出力（全ページを読むため遅い）")
+    p.add_argument("--enable-incremental-vacuum", action="store_true",
+                   help="auto_vacuum を INCREMENTAL に移行（VACUUM で全体を書き直す。利用者のいない時間に実行）")
+    p.add_argument("--no-backup", action="store_true", help="移行前のバックアップを取らない")
+    p.set_defaults(func=cmd_maintenance)
+
+    p = sub.add_parser("duplicates", help="重複登録の候補（統合の提案）を出力")
+    p.add_argument("--full", action="store_true", help="前回以降の差分ではなく全件を照合")
+    p.add_argument("--threshold", type=float, help=f"候補とする類似度の下限（既定 {DuplicateDetector.THRESHOLD}）")
+    p.add_argument("-f", "--format", choices=formats, default="table")
+    p.set_defaults(func=cmd_duplicates)
+
+    p = sub.add_parser("labels", help="機器のラベル（Code128 / QRコード）を PDF に出力")
+    add_search_options(p)
+    p.add_argument("--from", dest="first", metavar="器材番号", help="器材番号の範囲の先頭（--to と併用）")
+    p.add_argument("--to", dest="last", metavar="器材番号", help="器材番号の範囲の末尾")
+    p.add_argument("--symbology", choices=LabelService.SYMBOLOGIES, help=f"既定 {LabelService.SYMBOLOGY}")
+    p.add_argument("--workers", type=int, help="画像を作成するプロセス数（既定はCPUのコア数）")
+    p.add_argument("-o", "--output", required=True)
+    p.add_argument("-q", "--quiet", action="store_true", help="進捗を表示しない")
+    p.set_defaults(func=cmd_labels)
+
+    p = sub.add_parser("restore", help="バックアップの内容で共有DBを置き換え")
+    p.add_argument("path")
+    p.add_argument("--yes", action="store_true", help="確認なしで実行")
+    p.set_defaults(func=cmd_restore)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.db:
+        DBManager.DB_NAME = args.db
+    try:
+        return args.func(args, sys.stdout)
+    except CliError as e:
+        print(f"[-] {e}", file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        # head などで出力先が先に閉じられた場合は正常終了とする
+        sys.stdout = open(os.devnull, "w")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
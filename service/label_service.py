@@ -0,0 +1,235 @@
+import hashlib
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Any, Callable, Deque, Dict, Iterable, Optional, Tuple
+
+from models.db_manager import DBManager
+from models.equipment_code_allocator import EquipmentCodeAllocator
+
+# ラベル1枚分のデータ: (器材番号, 機器名, 部屋名)
+Label = Tuple[str, str, str]
+
+
+class LabelError(Exception):
+    """ラベルの作成に必要なライブラリが無い場合などの例外"""
+
+
+def _require(module: str, package: str) -> Any:
+    """ライブラリを出力時にだけ読み込む（画面・CLI の起動を遅くしないため）"""
+    try:
+        return __import__(module, fromlist=["_"])
+    except ImportError as e:
+        raise LabelError(f"ラベルの作成には {package} が必要です (pip install {package}): {e}") from e
+
+
+def render_symbol(symbology: str, code: str, path: str) -> Tuple[str, bool]:
+    """
+    器材番号のバーコード / QRコードの画像 (PNG) を path に書き出し、(path, 作成したか) を返します。
+    別プロセスで実行するため、モジュールの関数にしています。既に同じ画像があれば作成しません。
+    """
+    if os.path.exists(path):
+        return path, False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if symbology == "qr":
+        qrcode = _require("qrcode", "qrcode[pil]")
+        qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=8, border=1)
+        qr.add_data(code)
+        qr.make(fit=True)
+        qr.make_image().save(tmp_path, format="PNG")
+    else:
+        barcode = _require("barcode", "python-barcode[images]")
+        writer = _require("barcode.writer", "python-barcode[images]").ImageWriter(format="PNG")
+        with open(tmp_path, "wb") as f:
+            # 器材番号の文字はラベルに別に書くため、画像には入れない
+            barcode.Code128(code, writer=writer).write(
+                f, options={"write_text": False, "module_height": 8.0, "quiet_zone": 2.0, "dpi": 300})
+    # 同じ画像を同時に作成した場合も、どちらかの完成したファイルで置き換わるだけ
+    os.replace(tmp_path, path)
+    return path, True
+
+
+class LabelService:
+    """
+    機器のラベル（Code128 または QRコード + 器材番号・機器名・部屋名）を、ラベル用紙の PDF に面付けして出力するサービス。
+
+    - ラベルは検索結果・器材番号の範囲などのジェネレーターから1件ずつ受け取り、ページ単位で書き出します。
+      画像はファイルのまま1枚ずつ PDF に書き込むため、5,000枚でも描画用の画像をまとめてメモリに持ちません。
+    - バーコード / QRコードの画像はプロセスプールで並列に作成します（先読みは IN_FLIGHT_PAGES ページ分まで）。
+      件数が INLINE_LIMIT 以下の場合は、プロセスの起動を省いてこのプロセスで作成します
+      （件数が分からない場合は、先頭の INLINE_LIMIT + 1 件を読んでから決めます）。
+    - 画像は内容（種類・器材番号・描画の設定）のハッシュをファイル名にして CACHE_DIR に保存し、次回以降は作成しません。
+      機器名・部屋名は PDF の文字として書くため、名称が変わっても画像は作り直しません。
+
+    reportlab / qrcode / python-barcode は出力時にだけ読み込みます。
+
+    config.json の設定例:
+        "labels": {"cache_dir": "label_cache", "workers": 0, "symbology": "code128",
+                   "columns": 3, "rows": 8, "margin_mm": 10}
+    """
+
+    _settings: Dict[str, Any] = DBManager._config.get("labels", {})
+    CACHE_DIR: str = _settings.get("cache_dir", "label_cache")
+    # 0 はCPUのコア数
+    WORKERS: int = _settings.get("workers", 0)
+    SYMBOLOGY: str = _settings.get("symbology", "code128")
+    COLUMNS: int = _settings.get("columns", 3)
+    ROWS: int = _settings.get("rows", 8)
+    MARGIN_MM: float = _settings.get("margin_mm", 10)
+    FONT: str = _settings.get("font", "HeiseiKakuGo-W5")
+
+    SYMBOLOGIES = ("code128", "qr")
+    INLINE_LIMIT = 50
+    IN_FLIGHT_PAGES = 4
+
+    # 画像の描画方法を変えたら上げる（キャッシュの画像を使わずに作り直す）
+    RENDER_VERSION = 1
+
+    # ========= ラベルのデータ =========
+    @staticmethod
+    def from_records(records: Iterable[Any]) -> Iterable[Label]:
+        """EquipmentRecord（検索結果）をラベルのデータに変換する"""
+        for record in records:
+            code = record.equipment_code
+            if isinstance(code, int):
+                # equipment_code が INTEGER のDBでは "01001" が 1001 として保存されているため、5桁に戻す
+                code = EquipmentCodeAllocator.format_code(*divmod(code, 10 ** EquipmentCodeAllocator.SERIAL_DIGITS))
+            yield str(code), record.name or "", record.room_name or ""
+
+    # ========= 画像のキャッシュ =========
+    @classmethod
+    def cache_path(cls, symbology: str, code: str) -> str:
+        key = hashlib.sha256(f"{cls.RENDER_VERSION}\0{symbology}\0{code}".encode("utf-8")).hexdigest()
+        return os.path.join(cls.CACHE_DIR, key[:2], f"{key}.png")
+
+    # ========= PDF =========
+    @classmethod
+    def _canvas(cls, output: str):
+        canvas_module = _require("reportlab.pdfgen.canvas", "reportlab")
+        pdfmetrics = _require("reportlab.pdfbase.pdfmetrics", "reportlab")
+        cidfonts = _require("reportlab.pdfbase.cidfonts", "reportlab")
+        pagesizes = _require("reportlab.lib.pagesizes", "reportlab")
+        # 画像を ASCII85 で文字列化せず、zlib 圧縮のバイナリのまま埋め込む
+        # （C 拡張の無い環境では ASCII85 の変換が Python で行われ、描画時間の大半を占めるため）
+        _require("reportlab.rl_config", "reportlab").useA85 = 0
+        if cls.FONT not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(cidfonts.UnicodeCIDFont(cls.FONT))
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        return canvas_module.Canvas(output, pagesize=pagesizes.A4, pageCompression=1), pdfmetrics, pagesizes.A4
+
+    @classmethod
+    def generate(
+        cls,
+        labels: Iterable[Label],
+        output: str,
+        symbology: Optional[str] = None,
+        total: Optional[int] = None,
+        workers: Optional[int] = None,
+        progress: Optional[Callable[[int, Optional[int]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        ラベルを PDF に出力し、{"labels": 枚数, "pages": ページ数, "rendered": 作成した画像数,
+        "cached": キャッシュを使った画像数, "seconds": 所要時間} を返します。
+            total: ラベルの枚数が分かっていれば指定（少ない場合はプロセスプールを使わない・進捗の表示用）
+            progress: (出力済みの枚数, 全体の枚数 or None) を受け取る関数
+        """
+        symbology = symbology or cls.SYMBOLOGY
+        if symbology not in cls.SYMBOLOGIES:
+            raise LabelError(f"ラベルの種類は {' / '.join(cls.SYMBOLOGIES)} のいずれかを指定してください: {symbology}")
+        start = time.perf_counter()
+        canvas, pdfmetrics, pagesize = cls._canvas(output)
+        stats = {"labels": 0, "pages": 0, "rendered": 0, "cached": 0}
+        per_page = cls.COLUMNS * cls.ROWS
+        workers = workers if workers is not None else (cls.WORKERS or os.cpu_count() or 1)
+
+        def draw(label: Label, result: Tuple[str, bool]) -> None:
+            index = stats["labels"] % per_page
+            if index == 0 and stats["labels"]:
+                canvas.showPage()
+            path, rendered = result
+            stats["rendered" if rendered else "cached"] += 1
+            cls._draw_label(canvas, pdfmetrics, pagesize, index, label, path, symbology)
+            stats["labels"] += 1
+            if progress is not None and stats["labels"] % per_page == 0:
+                progress(stats["labels"], total)
+
+        if total is None and workers > 1:
+            # 件数が分からなければ先頭だけ読み、INLINE_LIMIT 以下ならプロセスプールを起動しない
+            labels = iter(labels)
+            head = list(islice(labels, cls.INLINE_LIMIT + 1))
+            if len(head) <= cls.INLINE_LIMIT:
+                total = len(head)
+            labels = chain(head, labels)
+
+        if workers <= 1 or (total is not None and total <= cls.INLINE_LIMIT):
+            for label in labels:
+                draw(label, render_symbol(symbology, label[0], cls.cache_path(symbology, label[0])))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # 出力順を保つため、先に投入したものから順に書き出す（先読みは一定数まで）
+                pending: Deque[Tuple[Label, Any]] = deque()
+                limit = per_page * cls.IN_FLIGHT_PAGES
+                for label in labels:
+                    path = cls.cache_path(symbology, label[0])
+                    # キャッシュにあればプロセスに渡さない
+                    pending.append((label, (path, False) if os.path.exists(path)
+                                    else executor.submit(render_symbol, symbology, label[0], path)))
+                    while len(pending) >= limit:
+                        label_done, result = pending.popleft()
+                        draw(label_done, result.result() if isinstance(result, Future) else result)
+                while pending:
+                    label_done, result = pending.popleft()
+                    draw(label_done, result.result() if isinstance(result, Future) else result)
+
+        stats["pages"] = (stats["labels"] + per_page - 1) // per_page
+        canvas.save()
+        if progress is not None:
+            progress(stats["labels"], stats["labels"])
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+
+    @classmethod
+    def _draw_label(cls, canvas, pdfmetrics, pagesize: Tuple[float, float], index: int, label: Label,
+                    image_path: str, symbology: str) -> None:
+        """ページの index 番目の枠に、画像と器材番号・機器名・部屋名を描く"""
+        mm = 72 / 25.4
+        page_width, page_height = pagesize
+        margin = cls.MARGIN_MM * mm
+        width = (page_width - 2 * margin) / cls.COLUMNS
+        height = (page_height - 2 * margin) / cls.ROWS
+        x = margin + (index % cls.COLUMNS) * width
+        y = page_height - margin - (index // cls.COLUMNS + 1) * height
+        pad = 2 * mm
+        code, name, room = label
+
+        def fit(text: str, size: float, max_width: float) -> str:
+            """枠の幅に収まらない文字列は末尾を「…」にする"""
+            if pdfmetrics.stringWidth(text, cls.FONT, size) <= max_width:
+                return text
+            while text and pdfmetrics.stringWidth(text + "…", cls.FONT, size) > max_width:
+                text = text[:-1]
+            return text + "…"
+
+        if symbology == "qr":
+            # 左に QRコード、右に文字
+            side = height - 2 * pad
+            canvas.drawImage(image_path, x + pad, y + pad, side, side)
+            text_x = x + 2 * pad + side
+            text_width = width - side - 3 * pad
+            canvas.setFont(cls.FONT, 10)
+            canvas.drawString(text_x, y + height - pad - 10, fit(code, 10, text_width))
+            canvas.setFont(cls.FONT, 7)
+            canvas.drawString(text_x, y + height / 2 - 3, fit(name, 7, text_width))
+            canvas.drawString(text_x, y + pad + 2, fit(room, 7, text_width))
+        else:
+            # 上に機器名・部屋名、中央にバーコード、下に器材番号
+            text_width = width - 2 * pad
+            canvas.setFont(cls.FONT, 7)
+            canvas.drawString(x + pad, y + height - pad - 7, fit(name, 7, text_width))
+            canvas.drawRightString(x + width - pad, y + height - pad - 15, fit(room, 7, text_width))
+            canvas.drawImage(image_path, x + pad, y + pad + 10, text_width, height - 2 * pad - 28)
+            canvas.setFont(cls.FONT, 9)
+            canvas.drawCentredString(x + width / 2, y + pad, code)
@@ -0,0 +1,159 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.events import ModelEvents
+from models.repair_model import RepairModel
+
+
+class RepairService:
+    """
+    修理履歴画面（RepairInfoWindow）向けに、機器詳細と修理履歴を先読みしておくLRUキャッシュ。
+
+    メイン画面で行が選択・ホバーされた時点で prefetch() を呼ぶと、
+    バックグラウンドスレッドで RepairModel から読み込んでおき、
+    画面を開いたときにはDBを待たずに表示できるようにします。
+    修理の追加・更新は ModelEvents 経由で通知され、該当機器のキャッシュだけを破棄します。
+    """
+
+    MAX_ENTRIES = 32
+
+    # 読み込める項目と、その読み込み関数
+    # DBエラー（database is locked など）を「該当なし・履歴なし」としてキャッシュしないよう、例外のまま受け取る
+    PARTS = {
+        "detail": lambda code: RepairModel.get_equipment_detail_by_code(code, raise_errors=True),
+        "history": lambda code: RepairModel.get_history_by_equipment(code, raise_errors=True),
+    }
+    # 読み込みに失敗した場合に画面へ返す値（キャッシュしない）
+    FALLBACK = {"detail": None, "history": []}
+
+    # equipment_code -> {"detail": 機器詳細, "history": 修理履歴リスト}（読み込み済みの項目のみ）
+    _cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    # 読み込み中の先読み処理
+    _pending: Dict[str, Future] = {}
+    # 無効化のたびに増える番号（読み込み中に無効化された結果をキャッシュしないため）
+    _generations: Dict[str, int] = {}
+    _epoch = 0
+    _lock = threading.Lock()
+    _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="repair-prefetch")
+
+    @classmethod
+    def _load(cls, equipment_code: str, parts: Tuple[str, ...]) -> Dict[str, Any]:
+        """DBから指定された項目（機器詳細・修理履歴）を読み込みます（DBエラーは例外のまま）"""
+        return {part: cls.PARTS[part](equipment_code) for part in parts}
+
+    @classmethod
+    def _generation_of(cls, equipment_code: str) -> Tuple[int, int]:
+        """全体・機器単位の無効化番号の組を返します（ロック取得中に呼ぶこと）"""
+        return cls._epoch, cls._generations.get(equipment_code, 0)
+
+    @classmethod
+    def _store(cls, equipment_code: str, generation: Tuple[int, int], loaded: Dict[str, Any]) -> None:
+        """読み込み開始後に無効化されていなければ、結果をキャッシュへ格納します"""
+        with cls._lock:
+            if cls._generation_of(equipment_code) != generation:
+                return
+            cls._cache.setdefault(equipment_code, {}).update(loaded)
+            cls._cache.move_to_end(equipment_code)
+            while len(cls._cache) > cls.MAX_ENTRIES:
+                cls._cache.popitem(last=False)
+
+    @classmethod
+    def _background_load(cls, equipment_code: str, parts: Tuple[str, ...], generation: Tuple[int, int]):
+        try:
+            cls._store(equipment_code, generation, cls._load(equipment_code, parts))
+        finally:
+            with cls._lock:
+                cls._pending.pop(equipment_code, None)
+
+    @classmethod
+    def prefetch(cls, equipment_code: str, parts: Tuple[str, ...] = ("detail", "history")) -> None:
+        """
+        キャッシュに無い項目を、バックグラウンドで読み込み開始します。
+        メイン画面が検索結果の EquipmentRecord を保持している場合は、parts=("history",) として
+        機器詳細（7テーブルのJOIN）の読み込みを省略できます。
+        """
+        if not equipment_code:
+            return
+        with cls._lock:
+            cached = cls._cache.get(equipment_code, {})
+            missing = tuple(part for part in parts if part not in cached)
+            if not missing or equipment_code in cls._pending:
+                return
+            generation = cls._generation_of(equipment_code)
+            cls._pending[equipment_code] = cls._executor.submit(
+                cls._background_load, equipment_code, missing, generation)
+
+    @classmethod
+    def _get_part(cls, equipment_code: str, part: str) -> Any:
+        """
+        指定項目を返します。
+        キャッシュ済みならそのまま、先読み中ならその完了を待ち、どちらでもなければ同期的に読み込みます。
+        """
+        with cls._lock:
+            cached = cls._cache.get(equipment_code)
+            if cached is not None and part in cached:
+                cls._cache.move_to_end(equipment_code)
+                return cached[part]
+            future = cls._pending.get(equipment_code)
+
+        if future is not None:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"[-] 修理画面の先読みエラー ({equipment_code}): {e}")
+            # 先読み中に無効化されていた場合はキャッシュに格納されないため、読み直す
+            with cls._lock:
+                cached = cls._cache.get(equipment_code)
+                if cached is not None and part in cached:
+                    return cached[part]
+
+        with cls._lock:
+            generation = cls._generation_of(equipment_code)
+        try:
+            loaded = cls._load(equipment_code, (part,))
+        except Exception as e:
+            print(f"[-] 修理画面の読み込みエラー ({equipment_code}): {e}")
+            return cls.FALLBACK[part]
+        cls._store(equipment_code, generation, loaded)
+        return loaded[part]
+
+    @classmethod
+    def get_equipment_detail(cls, equipment_code: str) -> Optional[Dict[str, Any]]:
+        """修理画面上部に表示する機器詳細を返します"""
+        return cls._get_part(equipment_code, "detail")
+
+    @classmethod
+    def get_history(cls, equipment_code: str) -> List[Tuple[Any, ...]]:
+        """修理履歴の一覧を返します"""
+        return cls._get_part(equipment_code, "history")
+
+    @classmethod
+    def invalidate(cls, equipment_code: Optional[str] = None) -> None:
+        """指定機器（省略時は全件）のキャッシュを破棄します"""
+        with cls._lock:
+            if equipment_code:
+                cls._cache.pop(equipment_code, None)
+                cls._generations[equipment_code] = cls._generations.get(equipment_code, 0) + 1
+            else:
+                cls._cache.clear()
+                cls._epoch += 1
+
+    @classmethod
+    def on_repair_changed(cls, payload: Dict[str, Any]) -> None:
+        """修理の追加・更新通知を受けて、該当機器（不明なら全件）のキャッシュを破棄します"""
+        codes = ModelEvents.equipment_codes(payload)
+        if codes is None:
+            cls.invalidate(None)
+        for code in codes or []:
+            cls.invalidate(code)
+
+    @classmethod
+    def on_equipment_changed(cls, payload: Dict[str, Any]) -> None:
+        """機器情報の更新通知を受けて、該当機器（不明なら全件）のキャッシュを破棄します"""
+        cls.on_repair_changed(payload)
+
+
+ModelEvents.subscribe("repair", RepairService.on_repair_changed)
+ModelEvents.subscribe("equipment", RepairService.on_equipment_changed)
@@ -0,0 +1,85 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from models.analytics_model import AnalyticsModel
+from service.analytics_service import AnalyticsService, format_rollup_rows, REPORT_HEADERS
+
+
+class AnalyticsWindow(tk.Toplevel):
+    """
+    修理実績の信頼性指標（MTBF・停止日数・修理費用）を、
+    製造元／販売元／部門／機器分類ごとに期間別で表示するレポート画面。
+    """
+
+    GRANULARITY_LABELS = {"month": "月別", "year": "年別"}
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.title("故障・修理コスト分析")
+        self.geometry("1000x600")
+
+        self._create_widgets()
+        self.refresh_report()
+
+    def _create_widgets(self):
+        """画面ウィジェットの配置"""
+        # 1. 集計条件エリア (上部)
+        frame_cond = ttk.LabelFrame(self, text="集計条件", padding=10)
+        frame_cond.pack(fill="x", padx=10, pady=5)
+
+        ttk.Label(frame_cond, text="集計軸").pack(side="left", padx=5)
+        self.dimension_keys = list(AnalyticsModel.DIMENSIONS)
+        self.combo_dimension = ttk.Combobox(frame_cond, state="readonly", width=12,
+                                            values=[AnalyticsModel.DIMENSIONS[k][0] for k in self.dimension_keys])
+        self.combo_dimension.current(0)
+        self.combo_dimension.pack(side="left", padx=5)
+
+        ttk.Label(frame_cond, text="期間").pack(side="left", padx=5)
+        self.granularity_keys = list(self.GRANULARITY_LABELS)
+        self.combo_granularity = ttk.Combobox(frame_cond, state="readonly", width=8,
+                                              values=list(self.GRANULARITY_LABELS.values()))
+        self.combo_granularity.current(0)
+        self.combo_granularity.pack(side="left", padx=5)
+
+        ttk.Label(frame_cond, text="開始").pack(side="left", padx=5)
+        self.entry_from = ttk.Entry(frame_cond, width=10)
+        self.entry_from.pack(side="left", padx=5)
+        ttk.Label(frame_cond, text="終了").pack(side="left", padx=5)
+        self.entry_to = ttk.Entry(frame_cond, width=10)
+        self.entry_to.pack(side="left", padx=5)
+
+        btn_refresh = ttk.Button(frame_cond, text="集計", command=self.refresh_report)
+        btn_refresh.pack(side="left", padx=10)
+
+        # 2. 集計結果エリア (下部)
+        frame_table = ttk.LabelFrame(self, text="集計結果", padding=10)
+        frame_table.pack(fill="both", expand=True, padx=10, pady=5)
+
+        columns = tuple(f"c{i}" for i in range(len(REPORT_HEADERS)))
+        self.tree = ttk.Treeview(frame_table, columns=columns, show="headings")
+        for col, text in zip(columns, REPORT_HEADERS):
+            self.tree.heading(col, text=text)
+            self.tree.column(col, width=110, anchor="w" if col == "c1" else "e")
+
+        vsb = ttk.Scrollbar(frame_table, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        vsb.pack(side="right", fill="y")
+
+    def refresh_report(self):
+        """条件に従って集計結果を取得し、表を描画し直す"""
+        dimension = self.dimension_keys[self.combo_dimension.current()]
+        granularity = self.granularity_keys[self.combo_granularity.current()]
+        period_from = self.entry_from.get().strip() or None
+        period_to = self.entry_to.get().strip() or None
+
+        try:
+            rollups = AnalyticsService.get_rollups(dimension, granularity, period_from, period_to)
+        except Exception as e:
+            messagebox.showerror("エラー", f"集計中にエラーが発生しました:\n{e}", parent=self)
+            return
+
+        self.tree.delete(*self.tree.get_children())
+        for row in format_rollup_rows(rollups):
+            self.tree.insert("", tk.END, values=row)
@@ -0,0 +1,134 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import datetime
+
+from models.audit_log import AuditLog
+from models.bulk_edit import EquipmentBulkEdit, BulkEditError
+
+
+class BulkEditDialog(tk.Toplevel):
+    """
+    メイン画面で選択した複数の機器に、同じ変更をまとめて適用するダイアログ。
+    「変更する」にチェックを入れた項目だけを、EquipmentBulkEdit.apply で1つのトランザクションで更新します。
+    """
+
+    # (ラベル, equipment のカラム, マスタテーブル名 or None)
+    FIELDS = [
+        ("機器分類", "categorie_id", "categorie_master"),
+        ("状態", "statuse_id", "statuse_master"),
+        ("部門", "department_id", "department_master"),
+        ("部屋", "room_id", "room_master"),
+        ("製造元", "manufacturer_id", "manufacturer_master"),
+        ("販売元", "celler_id", "celler_master"),
+        ("備考", "remarks", None),
+    ]
+
+    def __init__(self, parent, equipment_codes, lookups):
+        super().__init__(parent)
+        self.equipment_codes = list(equipment_codes)
+        self.lookups = lookups
+        self.title(f"一括編集 ({len(self.equipment_codes)} 件)")
+        self.resizable(False, False)
+        self.transient(parent)
+
+        self.enabled = {}
+        self.inputs = {}
+        self._create_widgets()
+        self.grab_set()
+
+    def _create_widgets(self):
+        """画面ウィジェットの配置"""
+        frame = ttk.Frame(self, padding=10)
+        frame.pack(fill="both", expand=True)
+        ttk.Label(frame, text=f"選択した {len(self.equipment_codes)} 件の機器に、チェックした項目の値を設定します。") \
+            .grid(row=0, column=0, columnspan=3, sticky="w", pady=(0, 10))
+
+        for i, (label, column, master) in enumerate(self.FIELDS, start=1):
+            var = tk.BooleanVar(value=False)
+            ttk.Checkbutton(frame, text="変更する", variable=var).grid(row=i, column=0, padx=5, pady=3)
+            ttk.Label(frame, text=label).grid(row=i, column=1, sticky="e", padx=5)
+            if master:
+                widget = ttk.Combobox(frame, state="readonly", width=28,
+                                      values=list(self.lookups.get(master, {}).values()))
+                # 値を選んだら自動でチェックを入れる
+                widget.bind("<<ComboboxSelected>>", lambda e, v=var: v.set(True))
+            else:
+                widget = ttk.Entry(frame, width=30)
+                widget.bind("<Key>", lambda e, v=var: v.set(True))
+            widget.grid(row=i, column=2, sticky="w", padx=5)
+            self.enabled[column] = var
+            self.inputs[column] = widget
+
+        frame_btn = ttk.Frame(frame)
+        frame_btn.grid(row=len(self.FIELDS) + 1, column=0, columnspan=3, pady=(10, 0))
+        ttk.Button(frame_btn, text="適用", command=self.apply).pack(side="left", padx=5)
+        ttk.Button(frame_btn, text="キャンセル", command=self.destroy).pack(side="left", padx=5)
+
+    def _collect_changes(self):
+        """チェックされた項目を {カラム: 値} にする（マスタは名称から ID に変換）"""
+        changes = {}
+        for label, column, master in self.FIELDS:
+            if not self.enabled[column].get():
+                continue
+            text = self.inputs[column].get().strip()
+            if master:
+                ids = [key for key, name in self.lookups.get(master, {}).items() if name == text]
+                if not ids:
+                    raise BulkEditError(f"{label} を選択してください")
+                changes[column] = ids[0]
+            else:
+                changes[column] = text
+        return changes
+
+    def apply(self):
+        try:
+            changes = self._collect_changes()
+        except BulkEditError as e:
+            messagebox.showwarning("注意", str(e), parent=self)
+            return
+        if not changes:
+            messagebox.showwarning("注意", "変更する項目にチェックを入れてください。", parent=self)
+            return
+        labels = "・".join(label for label, column, _ in self.FIELDS if column in changes)
+        if not messagebox.askyesno("確認", f"{len(self.equipment_codes)} 件の機器の {labels} を変更します。よろしいですか？",
+                                   parent=self):
+            return
+        try:
+            result = EquipmentBulkEdit.apply(self.equipment_codes, changes)
+        except Exception as e:
+            messagebox.showerror("エラー", f"一括編集中にエラーが発生しました（何も変更されていません）:\n{e}", parent=self)
+            return
+        # 一覧の該当行は変更通知でメイン画面が更新する
+        messagebox.showinfo(
+            "完了",
+            f"{result['updated']} 件を変更しました"
+            f"（{len(self.equipment_codes) - result['updated']} 件はすでに同じ値のため変更なし）。\n"
+            "「編集」メニューの「一括編集の取り消し」で元に戻せます。",
+            parent=self,
+        )
+        self.destroy()
+
+
+def undo_last_bulk_edit(parent):
+    """自分が行った直近の一括編集を、確認のうえ取り消す"""
+    batches = EquipmentBulkEdit.recent_batches(limit=1, actor=AuditLog.actor())
+    if not batches:
+        messagebox.showinfo("一括編集の取り消し", "取り消せる一括編集はありません。", parent=parent)
+        return
+    batch = batches[0]
+    when = datetime.fromtimestamp(batch["ts"]).strftime("%Y-%m-%d %H:%M")
+    fields = {column: label for label, column, _ in BulkEditDialog.FIELDS}
+    labels = "・".join(fields.get(column, column) for column in batch["changes"])
+    if not messagebox.askyesno("一括編集の取り消し",
+                               f"{when} に {batch['row_count']} 件の {labels} を変更した一括編集を取り消しますか？",
+                               parent=parent):
+        return
+    try:
+        result = EquipmentBulkEdit.undo(batch["batch_id"])
+    except Exception as e:
+        messagebox.showerror("エラー", f"取り消し中にエラーが発生しました:\n{e}", parent=parent)
+        return
+    message = f"{result['restored']} 件を元に戻しました。"
+    if result["skipped"]:
+        message += f"\nその後に変更された {len(result['skipped'])} 件は戻していません: " + ", ".join(str(code) for code in result["skipped"][:20])
+    messagebox.showinfo("一括編集の取り消し", message, parent=parent)
@@ -0,0 +1,187 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from typing import Any, Callable, Dict, Optional
+
+from models.events import ModelEvents
+from models.location_index import LocationIndex
+from models.master_model import MasterModel
+from views.treeview_sorter import text_key
+from views.ui_state import UIState
+
+
+class LocationTreeWindow(tk.Toplevel):
+    """
+    部門 → 部屋 → 機器分類 の階層ごとに、機器数を状態別に表示する画面。
+
+    階層全体の件数は LocationIndex の集計表から1回で読み込むため、階層を開くときに検索は行いません。
+    機器・マスタの変更通知を受けると集計表を読み直し、件数の変わった行だけを書き換えます
+    （部屋の追加や部門の付け替えなどで階層が変わった場合は、開いている階層を保ったまま作り直す）。
+    部屋・機器分類の行をダブルクリックすると、その条件でメイン画面の検索を実行します。
+    """
+
+    # 変更通知が続いた場合に、まとめて1回だけ読み直すまでの待ち時間
+    REFRESH_DELAY_MS = 300
+
+    LEVEL_MASTERS = {"department": "department_master", "room": "room_master", "category": "categorie_master"}
+
+    def __init__(self, parent, on_open: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Args:
+            on_open: 部屋・機器分類の行をダブルクリックしたときに、検索条件
+                     ({"room_id": ..., "category_id": ...}) を受け取る関数
+        """
+        super().__init__(parent)
+        self.parent = parent
+        self.on_open = on_open
+        self.title("部門・部屋別の機器数")
+        self.geometry("900x600")
+        UIState.bind_window(self, "location_tree_window")
+
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self._refresh_job = None
+        # 名称・列が変わったため、次の refresh で階層を作り直す
+        self._stale_labels = False
+        self._load_lookups()
+        self._create_widgets()
+        self.refresh()
+
+        ModelEvents.subscribe("equipment", self._on_changed)
+        ModelEvents.subscribe("master", self._on_master_changed)
+        self.bind("<Destroy>", self._on_destroy)
+
+    def _load_lookups(self):
+        self.lookups = {master: MasterModel.get_kv_lookup(master)
+                        for master in (*self.LEVEL_MASTERS.values(), "statuse_master")}
+        # 状態の列（状態マスタの順。マスタに無い状態は「その他」にまとめる）
+        self.status_ids = sorted(self.lookups["statuse_master"])
+
+    def _create_widgets(self):
+        """画面ウィジェットの配置"""
+        frame_btns = ttk.Frame(self)
+        frame_btns.pack(fill="x", padx=10, pady=5)
+        ttk.Button(frame_btns, text="すべて開く", command=lambda: self._expand_all(True)).pack(side="left", padx=5)
+        ttk.Button(frame_btns, text="すべて閉じる", command=lambda: self._expand_all(False)).pack(side="left", padx=5)
+        ttk.Button(frame_btns, text="最新の情報に更新", command=self.refresh).pack(side="right", padx=5)
+
+        frame_tree = ttk.Frame(self)
+        frame_tree.pack(fill="both", expand=True, padx=10, pady=5)
+        self.tree = ttk.Treeview(frame_tree, show="tree headings")
+        self._configure_columns()
+        self.tree.tag_configure("department", font=("Helvetica", 9, "bold"))
+        self.tree.bind("<Double-1>", self._on_double_click)
+        UIState.bind_treeview(self.tree, "location_tree_window.tree")
+
+        vsb = ttk.Scrollbar(frame_tree, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        vsb.pack(side="right", fill="y")
+
+    def _configure_columns(self):
+        columns = ["total"] + [f"s{status_id}" for status_id in self.status_ids] + ["other"]
+        self.tree["columns"] = columns
+        self.tree.heading("#0", text="部門 / 部屋 / 機器分類")
+        self.tree.column("#0", width=260)
+        self.tree.heading("total", text="合計")
+        for status_id in self.status_ids:
+            self.tree.heading(f"s{status_id}", text=self.lookups["statuse_master"][status_id])
+        self.tree.heading("other", text="その他")
+        for col in columns:
+            self.tree.column(col, width=80, anchor="e")
+
+    # ========= 表示 =========
+    def _label(self, node: Dict[str, Any]) -> str:
+        if not node["id"]:
+            return "（未設定）"
+        return self.lookups[self.LEVEL_MASTERS[node["level"]]].get(node["id"], f"不明 ({node['id']})")
+
+    def _values(self, node: Dict[str, Any]):
+        by_status = node["by_status"]
+        known = [by_status.get(status_id, 0) for status_id in self.status_ids]
+        return [node["total"], *known, node["total"] - sum(known)]
+
+    def refresh(self):
+        """集計表を読み直して表示に反映する"""
+        self._refresh_job = None
+        try:
+            nodes = LocationIndex.tree()
+        except Exception as e:
+            messagebox.showerror("エラー", f"機器数の読み込み中にエラーが発生しました:\n{e}", parent=self)
+            return
+        if not self._stale_labels and self.nodes and nodes.keys() == self.nodes.keys():
+            # 階層が同じであれば、件数の変わった行だけを書き換える
+            for iid, node in nodes.items():
+                if node["by_status"] != self.nodes[iid]["by_status"]:
+                    self.tree.item(iid, values=self._values(node))
+        else:
+            self._rebuild(nodes)
+            self._stale_labels = False
+        self.nodes = nodes
+
+    def _rebuild(self, nodes: Dict[str, Dict[str, Any]]):
+        """階層を作り直す（開いていた行・選択中の行は引き継ぐ）"""
+        opened = {iid for iid in self.nodes if self.tree.exists(iid) and self.tree.item(iid, "open")}
+        selection = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+
+        children: Dict[str, list] = {}
+        for iid, node in nodes.items():
+            children.setdefault(node["parent"], []).append(iid)
+
+        def insert(parent: str) -> None:
+            for iid in sorted(children.get(parent, []),
+                              key=lambda i: (not nodes[i]["id"], text_key(self._label(nodes[i])))):
+                node = nodes[iid]
+                self.tree.insert(parent, "end", iid=iid, text=self._label(node), values=self._values(node),
+                                 open=iid in opened, tags=(node["level"],))
+                insert(iid)
+
+        insert("")
+        kept = [iid for iid in selection if iid in nodes]
+        if kept:
+            self.tree.selection_set(kept)
+
+    def _expand_all(self, open_: bool):
+        for iid, node in self.nodes.items():
+            if node["level"] != "category":
+                self.tree.item(iid, open=open_)
+
+    # ========= 操作・変更通知 =========
+    def _on_double_click(self, event):
+        iid = self.tree.identify_row(event.y)
+        node = self.nodes.get(iid)
+        if node is None or node["level"] == "department" or self.on_open is None:
+            return  # 部門の行は既定の動作（開く・閉じる）だけ
+        room = node if node["level"] == "room" else self.nodes[node["parent"]]
+        if not room["id"]:
+            messagebox.showinfo("情報", "部屋が未設定の機器は、部屋を条件にして検索できません。", parent=self)
+            return
+        conditions = {"room_id": room["id"]}
+        if node["level"] == "category" and node["id"]:
+            conditions["category_id"] = node["id"]
+        self.on_open(conditions)
+
+    def _schedule_refresh(self):
+        if self._refresh_job is None:
+            self._refresh_job = self.after(self.REFRESH_DELAY_MS, self.refresh)
+
+    def _on_changed(self, payload):
+        self._schedule_refresh()
+
+    def _on_master_changed(self, payload):
+        """マスタの名称・状態の種類・部屋の部門が変わった場合は、名称と列を読み直して作り直す"""
+        table = payload.get("table")
+        if table is not None and table not in (*self.LEVEL_MASTERS.values(), "statuse_master"):
+            return
+        self._load_lookups()
+        self._configure_columns()
+        self._stale_labels = True
+        self._schedule_refresh()
+
+    def _on_destroy(self, event):
+        # 子ウィジェットの破棄でも呼ばれるため、この画面自体が閉じられたときだけ購読を解除する
+        if event.widget is not self:
+            return
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+        ModelEvents.unsubscribe("equipment", self._on_changed)
+        ModelEvents.unsubscribe("master", self._on_master_changed)
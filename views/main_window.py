@@ -1,43 +1,106 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, simpledialog, filedialog
 import tkinter.font as tkFont
 import os
-import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # 作成したModel層から必要なクラスをインポート
 from models.master_model import MasterModel
 from models.equipment_model import EquipmentModel
+from models.equipment_result import EquipmentResultSet
+from models.replica_manager import ReplicaManager
+from models.change_watcher import ChangeWatcher
+from models.db_maintenance import DBMaintenance
+from models.events import ModelEvents
+from models.saved_search import SavedSearch
 
 # ※修理履歴画面やマスタ編集画面をviewsフォルダ内に配置する想定のインポート
 # (既存のファイルをそのまま呼ぶ場合は、パスに合わせて書き換えてください)
 from views.repair_window import RepairInfoWindow
-# from open_master_list import open_master_list_window  # 必要に応じて
+from views.analytics_window import AnalyticsWindow
+from views.location_tree_window import LocationTreeWindow
+from views.master_editor import MasterEditorWindow
+from views.bulk_edit_dialog import BulkEditDialog, undo_last_bulk_edit
+from views.repair_campaign_dialog import RepairCampaignDialog
+from views.treeview_sorter import TreeviewSorter, text_key, code_key, date_key
+from views.ui_state import UIState
+from views.treeview_loader import TreeviewLoader
+from service.repair_service import RepairService
+from service.label_service import LabelService
 
 
 class EquipmentManagerMainWindow:
+    # 検索条件のコンボボックスとマスタテーブルの対応
+    MASTER_COMBOS = {
+        "機器分類": "categorie_master", "状態": "statuse_master", "部門": "department_master",
+        "部屋": "room_master", "製造元": "manufacturer_master", "販売元": "celler_master",
+    }
+
+    # 検索条件の入力欄と EquipmentModel.search_equipments の引数名の対応
+    CONDITION_KEYS = {
+        "器材番号": "equipment_code", "機器名": "name", "機器名カナ": "name_kana",
+        "機器分類": "category_id", "状態": "statuse_id", "部門": "department_id", "部屋": "room_id",
+        "製造元": "manufacturer_id", "販売元": "celler_id", "備考": "remarks",
+    }
+
+    # 列ID -> 旧画面 (equipment_info.py) の column_widths.json の見出し名
+    LEGACY_COLUMN_NAMES = {
+        "category": "機器分類", "code": "機器コード", "name": "機器名", "status": "機器状況",
+        "dept": "部門", "room": "部屋", "maker": "製造元", "vendor": "販売元",
+        "remarks": "備考", "p_date": "購入日", "model": "型番",
+    }
+
+    # 変更行がこの件数を超える場合は、行ごとに反映せず検索し直す
+    MAX_DIFF_ROWS = 1000
+
+    # 操作が無い状態が続いているかを確認する間隔（DBの保守処理を待機中に実行するため）
+    IDLE_CHECK_MS = 60 * 1000
+
+    # 保存した検索の結果が古い場合に、検索し直すためのスレッド
+    _search_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="saved-search")
+    # ラベルの PDF を作成するスレッド（画像の作成は LabelService のプロセスプールで行う）
+    _label_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="labels")
+
     def __init__(self, root):
         self.root = root
         self.root.title("器材管理システム (MVC版)")
         self.root.geometry("1400x750")
+        # 前回終了時の位置・大きさ・列幅・検索条件などを、最初の描画の前に復元する
+        UIState.bind_window(self.root, "main_window")
 
         # 画面表示用のマスタデータをModelから取得 (IDから名称への変換用ルックアップ)
-        self.lookups = {
-            "categorie_master": MasterModel.get_kv_lookup("categorie_master"),
-            "statuse_master": MasterModel.get_kv_lookup("statuse_master"),
-            "department_master": MasterModel.get_kv_lookup("department_master"),
-            "room_master": MasterModel.get_kv_lookup("room_master"),
-            "manufacturer_master": MasterModel.get_kv_lookup("manufacturer_master"),
-            "celler_master": MasterModel.get_kv_lookup("celler_master"),
-        }
+        self._load_lookups()
 
         self.entries = {}
+        # 直近の検索結果（描画・修理画面・Excel出力で共有する）と、その検索条件
+        self.result = EquipmentResultSet()
+        self.conditions = {}
+        # 検索のたびに増やし、実行中の保存した検索の再検証が古くなったことを判定する
+        self._search_generation = 0
         self._create_widgets()
         self._create_menus()
         
-        # 起動時に全件検索をかけて初期データを表示
+        # 起動時は前回の検索条件（無ければ全件）で検索して表示
+        self._set_conditions(UIState.get("main_window", "conditions") or {})
         self.search_equipments()
 
+        # 他画面・他端末での変更は、検索結果の該当行だけに反映する
+        ModelEvents.subscribe("equipment", self._on_equipment_changed)
+        ModelEvents.subscribe("master", self._on_master_changed)
+        self.root.after(ChangeWatcher.POLL_INTERVAL_MS, self._poll_changes)
+
+        # 一定時間操作が無ければ、統計情報の更新などのDB保守をバックグラウンドで行う
+        self._last_activity = time.monotonic()
+        for sequence in ("<Any-KeyPress>", "<Any-ButtonPress>", "<MouseWheel>"):
+            self.root.bind_all(sequence, self._touch_activity, add="+")
+        self.root.after(self.IDLE_CHECK_MS, self._run_maintenance_when_idle)
+
+    def _load_lookups(self):
+        """IDから名称への変換用ルックアップをマスタから読み込む"""
+        self.lookups = {master: MasterModel.get_kv_lookup(master) for master in self.MASTER_COMBOS.values()}
+
     def _create_widgets(self):
         """画面ウィジェットの配置"""
         # フォント設定
@@ -89,13 +152,24 @@ class EquipmentManagerMainWindow:
         btn_export = ttk.Button(frame_buttons, text="Excel出力", command=self.export_to_excel)
         btn_export.pack(side="left", padx=5)
 
+        btn_bulk = ttk.Button(frame_buttons, text="選択した機器を一括編集", command=self.open_bulk_edit)
+        btn_bulk.pack(side="left", padx=5)
+
+        btn_campaign = ttk.Button(frame_buttons, text="選択した機器に修理を一括登録", command=self.open_repair_campaign)
+        btn_campaign.pack(side="left", padx=5)
+
+        # 件数（一覧への表示中は進み具合）
+        self.lbl_count = ttk.Label(frame_buttons, text="")
+        self.lbl_count.pack(side="right", padx=5)
+
         # 2. 検索結果表示エリア (下部)
         frame_table = ttk.LabelFrame(self.root, text="機器一覧 (ダブルクリックで修理履歴を表示)", padding=10)
         frame_table.pack(fill="both", expand=True, padx=10, pady=5)
 
         # Treeviewの作成
         columns = ("category", "code", "name", "status", "dept", "room", "maker", "vendor", "remarks", "p_date", "model")
-        self.tree = ttk.Treeview(frame_table, columns=columns, show="headings")
+        # Ctrl / Shift + クリックで複数行を選択できる（一括編集の対象）
+        self.tree = ttk.Treeview(frame_table, columns=columns, show="headings", selectmode="extended")
         
         # 列ヘッダー定義
         headers = {
@@ -107,6 +181,22 @@ class EquipmentManagerMainWindow:
             self.tree.heading(col, text=text)
             self.tree.column(col, width=100, anchor="center" if "date" in col or "code" in col else "w")
 
+        # 見出しクリックで検索結果を並べ替える (機器名は読みがなで五十音順)
+        self.sorter = TreeviewSorter(self.tree, {
+            "category": lambda r: text_key(r.categorie_name),
+            "code": lambda r: code_key(r.equipment_code),
+            "name": lambda r: text_key(r.name_kana or r.name),
+            "status": lambda r: text_key(r.status_name),
+            "dept": lambda r: text_key(r.department_name),
+            "room": lambda r: text_key(r.room_name),
+            "maker": lambda r: text_key(r.manufacturer_name),
+            "vendor": lambda r: text_key(r.celler_name),
+            "remarks": lambda r: text_key(r.remarks),
+            "p_date": lambda r: date_key(r.purchase_date),
+            "model": lambda r: code_key(r.model),
+        }, self._sortable_rows)
+        UIState.bind_treeview(self.tree, "main_window", self.sorter, legacy_names=self.LEGACY_COLUMN_NAMES)
+
         # スクロールバー
         vsb = ttk.Scrollbar(frame_table, orient="vertical", command=self.tree.yview)
         hsb = ttk.Scrollbar(frame_table, orient="horizontal", command=self.tree.xview)
@@ -119,24 +209,69 @@ class EquipmentManagerMainWindow:
         frame_table.grid_rowconfigure(0, weight=100)
         frame_table.grid_columnconfigure(0, weight=100)
 
+        # 行の背景色の色付け定義
+        self.tree.tag_configure("repairing", background="#ffcccc")
+        self.tree.tag_configure("scrapped", background="#d3d3d3")
+
+        # 検索結果は画面を固めないよう少しずつ挿入する（新しい検索が始まると打ち切る）
+        self.loader = TreeviewLoader(self.tree, progress=self._show_progress)
+
+        # ローカル複製を使う場合は、同期の遅れを画面下部に表示する
+        if ReplicaManager.ENABLED:
+            self.lbl_replica = ttk.Label(self.root, text="ローカル複製: 準備中", anchor="e")
+            self.lbl_replica.pack(fill="x", padx=10, pady=(0, 5))
+            self._update_replica_status()
+
         # ダブルクリックで修理画面を開くイベントをバインド
         self.tree.bind("<Double-1>", self.open_repair_info)
 
+        # 行の選択・ホバー時に修理画面のデータを先読みしておく
+        self._hover_item = None
+        self.tree.bind("<<TreeviewSelect>>", self._prefetch_selected)
+        self.tree.bind("<Motion>", self._prefetch_hovered)
+
+    def _update_replica_status(self):
+        """ローカル複製の遅延（未反映件数・最終同期からの秒数）を5秒ごとに表示更新する"""
+        status = ReplicaManager.status()
+        if status["error"]:
+            text = f"ローカル複製: 同期エラー ({status['error']})"
+        elif not status["active"]:
+            text = "ローカル複製: 準備中（共有DBを直接参照しています）"
+        else:
+            text = f"ローカル複製: 未反映 {status['lag_changes']} 件 / 最終同期 {status['lag_seconds']:.0f} 秒前"
+        self.lbl_replica.config(text=text)
+        self.root.after(5000, self._update_replica_status)
+
     def _create_menus(self):
         """メニューバーの作成"""
         menubar = tk.Menu(self.root)
         master_menu = tk.Menu(menubar, tearoff=0)
-        # 必要に応じてマスタ一覧画面を呼び出すように設定
-        # master_menu.add_command(label="マスタ一覧表示", command=lambda: open_master_list_window(self.root, "C:/DataBase/equipment_management.db"))
+        for table, label in MasterEditorWindow.TABLE_LABELS.items():
+            master_menu.add_command(label=f"{label}マスタ", command=lambda t=table: MasterEditorWindow(self.root, t))
         menubar.add_cascade(label="マスタ管理", menu=master_menu)
+
+        edit_menu = tk.Menu(menubar, tearoff=0)
+        edit_menu.add_command(label="選択した機器を一括編集", command=self.open_bulk_edit)
+        edit_menu.add_command(label="一括編集の取り消し", command=lambda: undo_last_bulk_edit(self.root))
+        edit_menu.add_separator()
+        edit_menu.add_command(label="選択した機器に修理を一括登録", command=self.open_repair_campaign)
+        edit_menu.add_separator()
+        edit_menu.add_command(label="ラベルを作成（選択した機器 / 検索結果）...", command=self.create_labels)
+        menubar.add_cascade(label="編集", menu=edit_menu)
+
+        self.saved_search_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="保存した検索", menu=self.saved_search_menu)
+        self._rebuild_saved_search_menu()
+
+        analytics_menu = tk.Menu(menubar, tearoff=0)
+        analytics_menu.add_command(label="故障・修理コスト分析", command=lambda: AnalyticsWindow(self.root))
+        analytics_menu.add_command(label="部門・部屋別の機器数",
+                                   command=lambda: LocationTreeWindow(self.root, on_open=self.open_location))
+        menubar.add_cascade(label="分析", menu=analytics_menu)
         self.root.config(menu=menubar)
 
     def search_equipments(self):
         """UIの入力値を読み取り、Modelを呼び出して検索結果をTreeviewに描画する"""
-        # Treeviewのクリア
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
         # 画面の入力値を取得
         def get_master_id(label, lookup_dict):
             """コンボボックスの文字列から対応するマスタIDを逆引きするヘルパー"""
@@ -149,62 +284,228 @@ class EquipmentManagerMainWindow:
             return None
 
         # 各種条件を整備 (Modelの引数名に合わせる)
-        category_id = get_master_id("機器分類", self.lookups["categorie_master"])
-        status_id = get_master_id("状態", self.lookups["statuse_master"])
-        department_id = get_master_id("部門", self.lookups["department_master"])
-        room_id = get_master_id("部屋", self.lookups["room_master"])
-        manufacturer_id = get_master_id("製造元", self.lookups["manufacturer_master"])
-        celler_id = get_master_id("販売元", self.lookups["celler_master"])
-
-        # SQLやDB接続はここには一切書かず、Modelに丸投げする
-        records = EquipmentModel.search_equipments(
+        # 他端末の変更を反映するときに同じ条件で絞り込むため、条件は保持しておく
+        self.conditions = dict(
             equipment_code=self.entries["器材番号"].get().strip(),
             name=self.entries["機器名"].get().strip(),
             name_kana=self.entries["機器名カナ"].get().strip(),
-            category_id=category_id,
-            statuse_id=status_id,
-            department_id=department_id,
-            room_id=room_id,
-            manufacturer_id=manufacturer_id,
-            celler_id=celler_id,
+            category_id=get_master_id("機器分類", self.lookups["categorie_master"]),
+            statuse_id=get_master_id("状態", self.lookups["statuse_master"]),
+            department_id=get_master_id("部門", self.lookups["department_master"]),
+            room_id=get_master_id("部屋", self.lookups["room_master"]),
+            manufacturer_id=get_master_id("製造元", self.lookups["manufacturer_master"]),
+            celler_id=get_master_id("販売元", self.lookups["celler_master"]),
             remarks=self.entries["備考"].get().strip()
         )
+        self._remember_conditions()
+        self._show_result()
 
-        # 取得したデータをTreeview向けに変換して挿入
-        for record in records:
-            # record: (id, equipment_code, name, name_kana, categorie_id, statuse_id, ...)
-            # IDの数値を、事前に取得してあるルックアップ辞書を使って文言に変換
-            cat_name = self.lookups["categorie_master"].get(record[4], "不明")
-            status_name = self.lookups["statuse_master"].get(record[5], "不明")
-            dept_name = self.lookups["department_master"].get(record[6], "不明")
-            room_name = self.lookups["room_master"].get(record[7], "不明")
-            maker_name = self.lookups["manufacturer_master"].get(record[8], "不明")
-            vendor_name = self.lookups["celler_master"].get(record[9], "不明")
-
-            # 状態に応じて行の背景色(タグ)を変えるための判定
-            tag = "normal"
-            if status_name == "修理中":
-                tag = "repairing"
-            elif status_name == "廃棄":
-                tag = "scrapped"
-
-            self.tree.insert("", tk.END, values=(
-                cat_name,          # 機器分類
-                record[1],         # 器材番号 (equipment_code)
-                record[2],         # 機器名 (name)
-                status_name,       # 状態
-                dept_name,         # 部門
-                room_name,         # 部屋
-                maker_name,        # 製造元
-                vendor_name,       # 販売元
-                record[10],        # 備考 (remarks)
-                record[11],        # 購入日 (purchase_date)
-                record[12]         # モデル (model)
-            ), tags=(tag,))
+    def _show_result(self, result=None):
+        """保持している検索条件で検索し直し（result を渡した場合はその結果で）、Treeviewを描画し直す"""
+        self._search_generation += 1
+        # 前の検索結果の挿入が続いていれば打ち切る
+        self.loader.cancel()
 
-        # 行の背景色の色付け定義
-        self.tree.tag_configure("repairing", background="#ffcccc")
-        self.tree.tag_configure("scrapped", background="#d3d3d3")
+        # SQLやDB接続はここには一切書かず、Modelに丸投げする
+        # (マスタ名称を解決済みの EquipmentRecord として受け取り、修理画面でも再利用する)
+        if result is None:
+            result = EquipmentModel.search_records(self.lookups, **self.conditions)
+        self.result = result
+
+        # iid には検索結果内の添字を使い、行からレコードを直接引けるようにする
+        # 挿入し終えたら、並べ替え中であれば新しい検索結果にも同じ並び順を適用する
+        self.loader.load(
+            ((iid, record.display_values(), (self._row_tag(record),)) for iid, record in self.result.items()),
+            total=len(self.result), on_done=self.sorter.reset,
+        )
+
+    def _show_progress(self, done, total):
+        if total is not None and done < total:
+            self.lbl_count.config(text=f"表示中 {done:,} / {total:,} 件")
+        else:
+            self.lbl_count.config(text=f"{done:,} 件")
+
+    @staticmethod
+    def _row_tag(record):
+        """状態に応じて行の背景色(タグ)を変えるための判定"""
+        if record.status_name == "修理中":
+            return "repairing"
+        if record.status_name == "廃棄":
+            return "scrapped"
+        return "normal"
+
+    def _sortable_rows(self):
+        """並べ替え対象の [(iid, EquipmentRecord), ...] を返す"""
+        # 並べ替えは全行が一覧にある前提のため、挿入中であれば残りを先に挿入する
+        self.loader.finish()
+        return list(self.result.items())
+
+    def _poll_changes(self):
+        """他端末による共有DBの変更を定期的に確認する（通知は ModelEvents 経由で各画面へ届く）"""
+        ChangeWatcher.poll()
+        self.root.after(ChangeWatcher.POLL_INTERVAL_MS, self._poll_changes)
+
+    def _touch_activity(self, event=None):
+        self._last_activity = time.monotonic()
+
+    def _run_maintenance_when_idle(self):
+        """IDLE_MINUTES 分操作が無く、前回（他端末を含む）から INTERVAL_HOURS 経過していれば保守処理を始める"""
+        if time.monotonic() - self._last_activity >= DBMaintenance.IDLE_MINUTES * 60:
+            DBMaintenance.run_in_background()
+        self.root.after(self.IDLE_CHECK_MS, self._run_maintenance_when_idle)
+
+    def _on_equipment_changed(self, payload):
+        """
+        変更された機器だけを現在の検索条件で読み直し、Treeviewの該当行を更新・追加・削除する。
+        並べ替え中でも全体は並べ直さない（追加された行は末尾に表示される）。
+        """
+        row_ids = payload.get("row_ids")
+        if not row_ids or len(row_ids) > self.MAX_DIFF_ROWS:
+            self._show_result()
+            return
+        # 行単位で反映するため、挿入中であれば残りを先に挿入する
+        self.loader.finish()
+
+        records = {
+            record.id: record
+            for record in EquipmentModel.search_records_by_ids(self.lookups, row_ids, **self.conditions)
+        }
+        for row_id in row_ids:
+            iid = self.result.find_by_id(row_id)
+            record = records.get(row_id)
+            if record is None:
+                # 削除された、または検索条件に一致しなくなった
+                if iid is not None:
+                    self.result.remove(iid)
+                    self.tree.delete(iid)
+            elif iid is None:
+                iid = self.result.append(record)
+                self.tree.insert("", tk.END, iid=iid, values=record.display_values(), tags=(self._row_tag(record),))
+            else:
+                self.result.replace(iid, record)
+                self.tree.item(iid, values=record.display_values(), tags=(self._row_tag(record),))
+        self.sorter.rows_changed()
+        self._show_progress(len(self.result), None)
+
+    def _on_master_changed(self, payload):
+        """
+        変更されたマスタのルックアップと選択肢だけを読み直して再表示する
+        （テーブルが特定できない通知では全マスタを読み直す。検索に使わないマスタの変更は無視する）
+        """
+        table = payload.get("table")
+        changed = [(label, master_key) for label, master_key in self.MASTER_COMBOS.items()
+                   if table is None or master_key == table]
+        if not changed:
+            return
+        for label, master_key in changed:
+            data = MasterModel.fetch_all(master_key)
+            self.lookups[master_key] = {row[0]: row[1] for row in data}
+            self.entries[label]["values"] = [""] + [row[1] for row in data]
+        self._show_result()
+
+    # ========= 保存した検索 =========
+    def _rebuild_saved_search_menu(self):
+        """「保存した検索」メニューを、共有DBに保存されている検索の一覧で作り直す"""
+        menu = self.saved_search_menu
+        menu.delete(0, "end")
+        menu.add_command(label="現在の検索条件を保存...", command=self.save_current_search)
+        try:
+            searches = SavedSearch.list_all()
+        except Exception as e:
+            print(f"[-] 保存した検索の一覧取得エラー: {e}")
+            searches = []
+        if not searches:
+            return
+        delete_menu = tk.Menu(menu, tearoff=0)
+        for search in searches:
+            delete_menu.add_command(label=search["name"],
+                                    command=lambda s=search: self.delete_saved_search(s["id"], s["name"]))
+        menu.add_cascade(label="保存した検索を削除", menu=delete_menu)
+        menu.add_separator()
+        for search in searches:
+            menu.add_command(label=search["name"], command=lambda i=search["id"]: self.open_saved_search(i))
+
+    def _set_conditions(self, conditions):
+        """検索条件を入力欄に表示する（マスタはIDから名称に変換）"""
+        for label, key in self.CONDITION_KEYS.items():
+            widget = self.entries[label]
+            value = conditions.get(key)
+            if label in self.MASTER_COMBOS:
+                widget.set(self.lookups[self.MASTER_COMBOS[label]].get(value, "") if value else "")
+            else:
+                widget.delete(0, tk.END)
+                widget.insert(0, value or "")
+
+    def _remember_conditions(self):
+        """次回の起動時に復元するため、実行した検索条件を画面状態に記録する"""
+        UIState.set("main_window", "conditions", {key: value for key, value in self.conditions.items() if value})
+
+    def save_current_search(self):
+        """直前に実行した検索の条件を、名前を付けて保存する"""
+        name = simpledialog.askstring("検索条件の保存", "保存する名前を入力してください（同じ名前は上書きします）:",
+                                      parent=self.root)
+        if not name or not name.strip():
+            return
+        try:
+            SavedSearch.save(name, self.conditions)
+        except Exception as e:
+            messagebox.showerror("エラー", f"検索条件の保存中にエラーが発生しました:\n{e}")
+            return
+        self._rebuild_saved_search_menu()
+
+    def delete_saved_search(self, search_id, name):
+        if not messagebox.askyesno("確認", f"保存した検索「{name}」を削除しますか？"):
+            return
+        try:
+            SavedSearch.delete(search_id)
+        except Exception as e:
+            messagebox.showerror("エラー", f"保存した検索の削除中にエラーが発生しました:\n{e}")
+        self._rebuild_saved_search_menu()
+
+    def open_saved_search(self, search_id):
+        """
+        保存した検索を開く。前回の結果が有効ならその機器IDから一覧を表示して終わり、
+        古ければ前回の結果をいったん表示し、バックグラウンドで検索し直した差分だけを反映する。
+        """
+        try:
+            saved = SavedSearch.load(search_id)
+            if saved["result_ids"] is None:
+                # 1度も実行されていない（保存直後の検索に失敗した）場合はここで検索する
+                saved["result_ids"] = SavedSearch.refresh(search_id)
+                saved["fresh"] = True
+            result = EquipmentModel.records_by_ids(self.lookups, saved["result_ids"])
+        except Exception as e:
+            messagebox.showerror("エラー", f"保存した検索を開けませんでした:\n{e}")
+            self._rebuild_saved_search_menu()
+            return
+
+        self._set_conditions(saved["conditions"])
+        self.conditions = {key: saved["conditions"].get(key) for key in self.CONDITION_KEYS.values()}
+        self._remember_conditions()
+        self._show_result(result)
+        if saved["fresh"]:
+            return
+
+        generation = self._search_generation
+        future = self._search_executor.submit(SavedSearch.refresh, search_id)
+
+        def poll():
+            if generation != self._search_generation:
+                return  # 別の検索が始まったので破棄
+            if not future.done():
+                self.root.after(50, poll)
+                return
+            try:
+                current = future.result()
+            except Exception as e:
+                print(f"[-] 保存した検索の再検索エラー: {e}")
+                return
+            # 増えた・減った機器だけを、通常の変更通知と同じ方法で一覧に反映する
+            changed = set(current) ^ set(saved["result_ids"])
+            if changed:
+                self._on_equipment_changed({"row_ids": sorted(changed)})
+
+        self.root.after(50, poll)
 
     def reset_conditions(self):
         """検索条件のクリア"""
@@ -215,37 +516,110 @@ class EquipmentManagerMainWindow:
                 widget.delete(0, tk.END)
         self.search_equipments()
 
+    def _prefetch_selected(self, event):
+        """選択行の修理画面データをバックグラウンドで先読みする"""
+        # 機器詳細は検索結果のレコードを使い回すため、修理履歴だけを読み込む
+        for item in self.tree.selection()[:1]:
+            record = self.result.get(item)
+            if record is not None:
+                RepairService.prefetch(record.equipment_code, parts=("history",))
+
+    def _prefetch_hovered(self, event):
+        """マウスが乗った行の修理画面データを先読みする（同じ行の上では1回だけ）"""
+        item = self.tree.identify_row(event.y)
+        if not item or item == self._hover_item:
+            return
+        self._hover_item = item
+        record = self.result.get(item)
+        if record is not None:
+            RepairService.prefetch(record.equipment_code, parts=("history",))
+
     def open_repair_info(self, event):
         """Treeviewの行ダブルクリック時に修理履歴ウィンドウを開く"""
         selected = self.tree.selection()
         if not selected:
             return
         
-        # 選択行の「器材番号(2番目の要素)」を取得
-        row_values = self.tree.item(selected[0], "values")
-        equipment_code = row_values[1]
+        # 選択行の検索結果レコードを取得
+        record = self.result.get(selected[0])
+        if record is None:
+            return
+
+        # 修理履歴画面を呼び出す (保持しているレコードを渡し、機器詳細の再検索を省く)
+        RepairInfoWindow(self.root, record.equipment_code, record=record)
+
+    def open_location(self, conditions):
+        """部門・部屋別の機器数の画面で選んだ部屋（と機器分類）を条件にして検索する"""
+        self._set_conditions(conditions)
+        self.search_equipments()
+
+    def open_bulk_edit(self):
+        """選択中の行の機器をまとめて編集するダイアログを開く"""
+        records = [self.result.get(iid) for iid in self.tree.selection()]
+        codes = [record.equipment_code for record in records if record is not None]
+        if not codes:
+            messagebox.showwarning("注意", "一括編集する機器を一覧で選択してください（Ctrl / Shift + クリックで複数選択）。")
+            return
+        BulkEditDialog(self.root, codes, self.lookups)
+
+    def open_repair_campaign(self):
+        """選択中の行の機器に、年次保守などの同じ内容の修理履歴をまとめて登録するダイアログを開く"""
+        records = [self.result.get(iid) for iid in self.tree.selection()]
+        codes = [record.equipment_code for record in records if record is not None]
+        if not codes:
+            messagebox.showwarning("注意", "修理を登録する機器を一覧で選択してください（Ctrl / Shift + クリックで複数選択）。")
+            return
+        RepairCampaignDialog(self.root, codes)
+
+    def create_labels(self):
+        """選択中の機器（未選択なら検索結果の全件）のラベルを PDF に出力する"""
+        selection = sorted(self.tree.selection(), key=self.tree.index)
+        iids = selection or self.sorter.current_order() or [iid for iid, _ in self.result.items()]
+        records = [record for record in (self.result.get(iid) for iid in iids) if record is not None]
+        if not records:
+            messagebox.showinfo("情報", "ラベルを作成する機器がありません。")
+            return
+        path = filedialog.asksaveasfilename(
+            parent=self.root, title="ラベルの保存先", defaultextension=".pdf", filetypes=[("PDF", "*.pdf")],
+            initialdir="export_folder", initialfile=f"labels_{datetime.now():%Y%m%d_%H%M%S}.pdf")
+        if not path:
+            return
 
-        # 修理履歴画面を呼び出す
-        RepairInfoWindow(self.root, equipment_code)
+        self.lbl_count.config(text=f"ラベルを作成中... 0 / {len(records)} 枚")
+        progress = {"done": 0}
+        future = self._label_executor.submit(
+            LabelService.generate, LabelService.from_records(records), path, total=len(records),
+            progress=lambda done, total: progress.update(done=done))
+
+        def poll():
+            if not future.done():
+                self.lbl_count.config(text=f"ラベルを作成中... {progress['done']} / {len(records)} 枚")
+                self.root.after(200, poll)
+                return
+            self._show_progress(len(self.result), len(self.result))
+            try:
+                stats = future.result()
+            except Exception as e:
+                messagebox.showerror("エラー", f"ラベルの作成中にエラーが発生しました:\n{e}")
+                return
+            messagebox.showinfo("成功", f"ラベルを出力しました（{stats['labels']} 枚 / {stats['pages']} ページ）。\n{path}")
+
+        self.root.after(200, poll)
 
     def export_to_excel(self):
-        """Excel出力スクリプトの呼び出し (元のロジックを維持)"""
-        all_data = [self.tree.item(item, "values") for item in self.tree.get_children()]
-        if not all_data:
+        """検索結果をExcelへ出力する (Treeviewから値を読み戻さず、保持しているレコードから直接出力)"""
+        if not len(self.result):
             messagebox.showinfo("情報", "エクスポートするデータがありません。")
             return
 
-        headers = ["機器分類", "機器コード", "機器名", "状態", "部門", "部屋",
-                   "製造元", "販売元", "備考", "購入日", "モデル"]
-        
-        # 既存の外部スクリプト連携ロジックを実行
         try:
-            import json
-            json_data = json.dumps(all_data, ensure_ascii=False)
-            json_headers = json.dumps(headers, ensure_ascii=False)
-
-            # 別途用意されているはずの export_to_excel.py を呼び出し
-            subprocess.run(["python", "export_to_excel.py", json_data, json_headers], check=True)
-            messagebox.showinfo("成功", "Excelファイルを出力しました。")
+            # openpyxl の読み込みに時間がかかるため、出力時にだけインポートする
+            from export_to_excel import export_to_excel
+
+            filename = f"equipment_{datetime.now():%Y%m%d_%H%M%S}.xlsx"
+            # 画面で並べ替えている場合は、その並び順で出力する
+            export_to_excel(self.result.iter_display_rows(self.sorter.current_order()), EquipmentResultSet.HEADERS,
+                            output_folder="export_folder", filename=filename)
+            messagebox.showinfo("成功", f"Excelファイルを出力しました。\n{os.path.join('export_folder', filename)}")
         except Exception as e:
-            messagebox.showerror("エラー", f"Excel出力中にエラーが発生しました:\n{e}")
\ No newline at end of file
+            messagebox.showerror("エラー", f"Excel出力中にエラーが発生しました:\n{e}")
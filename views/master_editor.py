@@ -0,0 +1,273 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from typing import Any, Dict, List, Optional
+
+from models.events import ModelEvents
+from models.master_model import MasterModel
+
+
+class MasterEditorWindow(tk.Toplevel):
+    """
+    マスタテーブルの一覧・編集画面。
+
+    - 絞り込み欄に入力すると、入力が止まってから FILTER_DELAY_MS 後に名称（数字なら ID も）で絞り込みます。
+    - 一覧は ID 順に MasterModel.PAGE_SIZE 件ずつ表示し、前後のページはキーセット（直前ページの最終 ID）で取得します。
+    - セルをダブルクリックするとその場で編集でき、変更・追加した行は「保存」でまとめて1トランザクションで保存します。
+      未保存の変更はページを移動しても保持されます。
+    """
+
+    TABLE_LABELS = {
+        "categorie_master": "機器分類", "statuse_master": "状態", "department_master": "部門",
+        "room_master": "部屋", "manufacturer_master": "製造元", "celler_master": "販売元",
+        "repair_type_master": "修理種別", "repair_status_master": "修理状態",
+    }
+
+    FILTER_DELAY_MS = 300
+    NEW_ROW_PREFIX = "new-"
+
+    def __init__(self, parent, table_name: str):
+        super().__init__(parent)
+        MasterModel.check_table(table_name)
+        self.table_name = table_name
+        self.columns = MasterModel.get_columns(table_name)
+        self.id_column = next(col for col in self.columns if col.lower() == "id")
+        self.title(f"マスタ編集 - {self.TABLE_LABELS.get(table_name, table_name)}")
+        self.geometry("600x550")
+
+        # ページ i の先頭より前の ID（1ページ目は None）。次のページへ進むたびに追加する
+        self.page_anchors: List[Optional[int]] = [None]
+        self.page_index = 0
+        self.has_next = False
+        # 未保存の変更: {ID: {カラム: 値}} と {行のiid: {カラム: 値}}（追加行）
+        self.pending_updates: Dict[int, Dict[str, Any]] = {}
+        self.pending_inserts: Dict[str, Dict[str, Any]] = {}
+        self._new_row_seq = 0
+        self._filter_job = None
+        self._editor: Optional[tk.Entry] = None
+        self._editing: Optional[tuple] = None
+
+        self._create_widgets()
+        self.reload()
+
+        # 保存後（自端末・他端末とも）、このテーブルの変更通知で一覧を読み直す
+        ModelEvents.subscribe("master", self._on_master_changed)
+        self.bind("<Destroy>", self._on_destroy)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+    def _create_widgets(self):
+        """画面ウィジェットの配置"""
+        frame_filter = ttk.Frame(self, padding=(10, 10, 10, 0))
+        frame_filter.pack(fill="x")
+        ttk.Label(frame_filter, text="絞り込み").pack(side="left")
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", self._schedule_filter)
+        entry_filter = ttk.Entry(frame_filter, textvariable=self.filter_var, width=30)
+        entry_filter.pack(side="left", padx=5)
+        entry_filter.focus_set()
+        self.lbl_count = ttk.Label(frame_filter, text="")
+        self.lbl_count.pack(side="right")
+
+        frame_table = ttk.Frame(self, padding=10)
+        frame_table.pack(fill="both", expand=True)
+        self.tree = ttk.Treeview(frame_table, columns=self.columns, show="headings", selectmode="extended")
+        for col in self.columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=80 if col == self.id_column else 400, anchor="w")
+        self.tree.tag_configure("dirty", background="#fff3c4")
+        vsb = ttk.Scrollbar(frame_table, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        vsb.pack(side="right", fill="y")
+        self.tree.bind("<Double-1>", self._begin_edit)
+
+        frame_page = ttk.Frame(self, padding=(10, 0))
+        frame_page.pack(fill="x")
+        self.btn_prev = ttk.Button(frame_page, text="< 前へ", command=self.prev_page)
+        self.btn_prev.pack(side="left")
+        self.lbl_page = ttk.Label(frame_page, text="")
+        self.lbl_page.pack(side="left", padx=10)
+        self.btn_next = ttk.Button(frame_page, text="次へ >", command=self.next_page)
+        self.btn_next.pack(side="left")
+
+        frame_btn = ttk.Frame(self, padding=10)
+        frame_btn.pack(fill="x")
+        ttk.Button(frame_btn, text="行を追加", command=self.add_row).pack(side="left", padx=5)
+        ttk.Button(frame_btn, text="保存", command=self.save).pack(side="left", padx=5)
+        ttk.Button(frame_btn, text="変更を破棄", command=self.discard).pack(side="left", padx=5)
+        ttk.Button(frame_btn, text="閉じる", command=self.close).pack(side="right", padx=5)
+        self.lbl_pending = ttk.Label(frame_btn, text="")
+        self.lbl_pending.pack(side="right", padx=10)
+
+    # ========= 一覧の表示 =========
+    def _keyword(self) -> Optional[str]:
+        return self.filter_var.get().strip() or None
+
+    def _schedule_filter(self, *args):
+        """入力のたびに検索せず、入力が止まってから絞り込む"""
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(self.FILTER_DELAY_MS, self._apply_filter)
+
+    def _apply_filter(self):
+        self._filter_job = None
+        self.page_anchors = [None]
+        self.page_index = 0
+        self.reload()
+
+    def reload(self):
+        """現在のページを読み直して描画する（追加行は常に先頭に表示する）"""
+        self._cancel_edit()
+        keyword = self._keyword()
+        try:
+            # 1件多く読み、次のページがあるかを判定する
+            rows = MasterModel.fetch_page(self.table_name, keyword, self.page_anchors[self.page_index],
+                                          MasterModel.PAGE_SIZE + 1)
+            total = MasterModel.count(self.table_name, keyword)
+        except Exception as e:
+            messagebox.showerror("エラー", f"マスタの読み込み中にエラーが発生しました:\n{e}", parent=self)
+            return
+        self.has_next = len(rows) > MasterModel.PAGE_SIZE
+        rows = rows[:MasterModel.PAGE_SIZE]
+
+        self.tree.delete(*self.tree.get_children())
+        for iid, values in self.pending_inserts.items():
+            self.tree.insert("", "end", iid=iid, values=self._display_values("(新規)", values), tags=("dirty",))
+        for row in rows:
+            row_id = row[self.columns.index(self.id_column)]
+            changes = self.pending_updates.get(row_id)
+            values = [changes.get(col, value) if changes else value for col, value in zip(self.columns, row)]
+            self.tree.insert("", "end", iid=str(row_id), values=values, tags=("dirty",) if changes else ())
+
+        pages = max((total + MasterModel.PAGE_SIZE - 1) // MasterModel.PAGE_SIZE, 1)
+        self.lbl_count.config(text=f"{total} 件")
+        self.lbl_page.config(text=f"{self.page_index + 1} / {pages} ページ")
+        self.btn_prev.config(state="normal" if self.page_index > 0 else "disabled")
+        self.btn_next.config(state="normal" if self.has_next else "disabled")
+        self._update_pending_label()
+
+    def _display_values(self, id_text: str, values: Dict[str, Any]) -> List[Any]:
+        return [id_text if col == self.id_column else values.get(col, "") for col in self.columns]
+
+    def next_page(self):
+        children = [iid for iid in self.tree.get_children() if not iid.startswith(self.NEW_ROW_PREFIX)]
+        if not self.has_next or not children:
+            return
+        del self.page_anchors[self.page_index + 1:]
+        self.page_anchors.append(int(children[-1]))
+        self.page_index += 1
+        self.reload()
+
+    def prev_page(self):
+        if self.page_index > 0:
+            self.page_index -= 1
+            self.reload()
+
+    # ========= セルの編集 =========
+    def _begin_edit(self, event):
+        """ダブルクリックしたセルの上に入力欄を重ねて編集する"""
+        iid = self.tree.identify_row(event.y)
+        column = self.tree.identify_column(event.x)
+        if not iid or not column:
+            return
+        col = self.columns[int(column[1:]) - 1]
+        if col == self.id_column:
+            # ID は参照元（機器・修理）との対応に使われるため変更させない
+            return
+        bbox = self.tree.bbox(iid, column)
+        if not bbox:
+            return
+        self._cancel_edit()
+        x, y, width, height = bbox
+        editor = tk.Entry(self.tree)
+        editor.insert(0, self.tree.set(iid, col))
+        editor.select_range(0, "end")
+        editor.place(x=x, y=y, width=width, height=height)
+        editor.focus_set()
+        editor.bind("<Return>", lambda e: self._commit_edit(iid, col))
+        editor.bind("<FocusOut>", lambda e: self._commit_edit(iid, col))
+        editor.bind("<Escape>", lambda e: self._cancel_edit())
+        self._editor = editor
+        self._editing = (iid, col)
+
+    def _commit_edit(self, iid: str, col: str):
+        if self._editor is None:
+            return
+        value = self._editor.get().strip()
+        self._cancel_edit()
+        if value == self.tree.set(iid, col):
+            return
+        self.tree.set(iid, col, value)
+        self.tree.item(iid, tags=("dirty",))
+        if iid.startswith(self.NEW_ROW_PREFIX):
+            self.pending_inserts[iid][col] = value
+        else:
+            self.pending_updates.setdefault(int(iid), {})[col] = value
+        self._update_pending_label()
+
+    def _cancel_edit(self):
+        if self._editor is not None:
+            editor, self._editor, self._editing = self._editor, None, None
+            editor.destroy()
+
+    def add_row(self):
+        """先頭に空の追加行を作り、名称の入力を始める"""
+        self._new_row_seq += 1
+        iid = f"{self.NEW_ROW_PREFIX}{self._new_row_seq}"
+        self.pending_inserts[iid] = {col: "" for col in self.columns if col != self.id_column}
+        self.tree.insert("", 0, iid=iid, values=self._display_values("(新規)", {}), tags=("dirty",))
+        self.tree.see(iid)
+        self._update_pending_label()
+
+    def _update_pending_label(self):
+        count = len(self.pending_updates) + len(self.pending_inserts)
+        self.lbl_pending.config(text=f"未保存 {count} 行" if count else "")
+
+    # ========= 保存 =========
+    def save(self):
+        """未保存の変更・追加を1トランザクションでまとめて保存する"""
+        if self._editing is not None:
+            # 編集中のセルも保存対象に含める
+            self._commit_edit(*self._editing)
+        if not self.pending_updates and not self.pending_inserts:
+            return
+        empty = [values for values in list(self.pending_updates.values()) + list(self.pending_inserts.values())
+                 if any(value == "" for value in values.values())]
+        if empty:
+            messagebox.showwarning("注意", "空欄のままの項目があります。すべて入力してください。", parent=self)
+            return
+        # 保存中に届く変更通知 (_on_master_changed) で読み直す一覧に、保存済みの行を未保存として残さない
+        updates, inserts = self.pending_updates, self.pending_inserts
+        self.pending_updates, self.pending_inserts = {}, {}
+        try:
+            new_ids = MasterModel.save_rows(self.table_name, updates, list(inserts.values()))
+        except Exception as e:
+            self.pending_updates, self.pending_inserts = updates, inserts
+            messagebox.showerror("保存エラー", f"保存中にエラーが発生しました（何も保存されていません）:\n{e}",
+                                 parent=self)
+            return
+        updated = len(updates)
+        messagebox.showinfo("完了", f"変更 {updated} 行・追加 {len(new_ids)} 行を保存しました。", parent=self)
+
+    def discard(self):
+        if not self.pending_updates and not self.pending_inserts:
+            return
+        if messagebox.askyesno("確認", "未保存の変更を破棄しますか？", parent=self):
+            self.pending_updates = {}
+            self.pending_inserts = {}
+            self.reload()
+
+    def close(self):
+        if (self.pending_updates or self.pending_inserts) and not messagebox.askyesno(
+                "確認", "未保存の変更があります。破棄して閉じますか？", parent=self):
+            return
+        self.destroy()
+
+    # ========= 変更通知 =========
+    def _on_master_changed(self, payload):
+        """このテーブルが変更されたら現在のページを読み直す（未保存の変更は表示上そのまま残す）"""
+        if payload.get("table") in (None, self.table_name):
+            self.reload()
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            ModelEvents.unsubscribe("master", self._on_master_changed)
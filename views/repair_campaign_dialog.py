@@ -0,0 +1,122 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import datetime, date
+
+from models.master_model import MasterModel
+from models.repair_model import RepairModel
+
+
+class RepairCampaignDialog(tk.Toplevel):
+    """
+    年次保守などで複数の機器に同じ内容の修理履歴を登録するダイアログ。
+    共通の項目（状態・日付・対応・業者・技術者など）を1回入力すると、
+    RepairModel.add_repair_records で全機器分を1つのトランザクションでまとめて追加します。
+    機器が1台だけの場合は、通常の修理履歴の追加画面として使用します。
+    """
+
+    # (ラベル, repair のカラム, マスタテーブル名 or None)
+    FIELDS = [
+        ("状態", "repairstatuses", "repair_status_master"),
+        ("依頼日", "request_date", None),
+        ("完了日", "completion_date", None),
+        ("対応", "repairtype", "repair_type_master"),
+        ("業者", "vendor", "celler_master"),
+        ("技術者", "technician", None),
+        ("詳細", "details", None),
+        ("備考", "remarks", None),
+    ]
+    DATE_COLUMNS = ("request_date", "completion_date")
+    TEXT_COLUMNS = ("details", "remarks")
+    REQUIRED_COLUMNS = ("repairstatuses", "request_date", "repairtype")
+
+    def __init__(self, parent, equipment_codes):
+        super().__init__(parent)
+        # 同じ機器を重複して登録しない（選択順は保持する）
+        self.equipment_codes = list(dict.fromkeys(str(code) for code in equipment_codes))
+        self.lookups = {master: MasterModel.get_kv_lookup(master) for _, _, master in self.FIELDS if master}
+        if len(self.equipment_codes) == 1:
+            self.title(f"修理履歴の追加 - 器材番号: {self.equipment_codes[0]}")
+        else:
+            self.title(f"修理・保守の一括登録 ({len(self.equipment_codes)} 件)")
+        self.resizable(False, False)
+        self.transient(parent)
+
+        self.inputs = {}
+        self._create_widgets()
+        self.grab_set()
+
+    def _create_widgets(self):
+        """画面ウィジェットの配置"""
+        frame = ttk.Frame(self, padding=10)
+        frame.pack(fill="both", expand=True)
+        if len(self.equipment_codes) > 1:
+            codes = ", ".join(self.equipment_codes[:10]) + (" ..." if len(self.equipment_codes) > 10 else "")
+            ttk.Label(frame, text=f"次の {len(self.equipment_codes)} 件の機器に、同じ内容の修理履歴を登録します。\n{codes}",
+                      wraplength=420).grid(row=0, column=0, columnspan=2, sticky="w", pady=(0, 10))
+
+        for i, (label, column, master) in enumerate(self.FIELDS, start=1):
+            text = f"{label} *" if column in self.REQUIRED_COLUMNS else label
+            ttk.Label(frame, text=text).grid(row=i, column=0, sticky="ne", padx=5, pady=3)
+            if master:
+                widget = ttk.Combobox(frame, state="readonly", width=28, values=list(self.lookups[master].values()))
+            elif column in self.TEXT_COLUMNS:
+                widget = tk.Text(frame, width=40, height=3)
+            else:
+                widget = ttk.Entry(frame, width=30)
+            widget.grid(row=i, column=1, sticky="w", padx=5, pady=3)
+            self.inputs[column] = widget
+
+        # 依頼日は当日を初期値にする
+        self.inputs["request_date"].insert(0, date.today().isoformat())
+        ttk.Label(frame, text="日付は YYYY-MM-DD 形式で入力してください。* は必須項目です。", foreground="gray") \
+            .grid(row=len(self.FIELDS) + 1, column=0, columnspan=2, sticky="w", pady=(5, 0))
+
+        frame_btn = ttk.Frame(frame)
+        frame_btn.grid(row=len(self.FIELDS) + 2, column=0, columnspan=2, pady=(10, 0))
+        ttk.Button(frame_btn, text="登録", command=self.save).pack(side="left", padx=5)
+        ttk.Button(frame_btn, text="キャンセル", command=self.destroy).pack(side="left", padx=5)
+
+    def _collect_data(self):
+        """入力値を repair のカラム名の辞書にする（マスタは名称から ID に変換）。不備があれば ValueError"""
+        data = {}
+        for label, column, master in self.FIELDS:
+            widget = self.inputs[column]
+            text = widget.get("1.0", "end").strip() if isinstance(widget, tk.Text) else widget.get().strip()
+            if not text:
+                if column in self.REQUIRED_COLUMNS:
+                    raise ValueError(f"{label} を入力してください")
+                data[column] = None
+                continue
+            if master:
+                ids = [key for key, name in self.lookups[master].items() if name == text]
+                data[column] = ids[0] if ids else None
+            elif column in self.DATE_COLUMNS:
+                try:
+                    datetime.strptime(text, "%Y-%m-%d")
+                except ValueError:
+                    raise ValueError(f"{label} は YYYY-MM-DD 形式で入力してください（入力値: {text}）")
+                data[column] = text
+            else:
+                data[column] = text
+        if data["completion_date"] and data["completion_date"] < data["request_date"]:
+            raise ValueError("完了日が依頼日より前になっています")
+        return data
+
+    def save(self):
+        try:
+            data = self._collect_data()
+        except ValueError as e:
+            messagebox.showwarning("注意", str(e), parent=self)
+            return
+        count = len(self.equipment_codes)
+        if count > 1 and not messagebox.askyesno("確認", f"{count} 件の機器に修理履歴を登録します。よろしいですか？",
+                                                 parent=self):
+            return
+        repair_ids = RepairModel.add_repair_records(self.equipment_codes, data)
+        if not repair_ids:
+            messagebox.showerror("エラー", "修理履歴の登録中にエラーが発生しました（何も登録されていません）。", parent=self)
+            return
+        # 開いている修理履歴画面・集計は変更通知で追加分だけ更新される
+        if count > 1:
+            messagebox.showinfo("完了", f"{len(repair_ids)} 件の修理履歴を登録しました。", parent=self)
+        self.destroy()
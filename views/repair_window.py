@@ -1,10 +1,18 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import tkinter.font as tkFont
+from typing import Optional
 
 # 作成したModel層から必要なクラスをインポート
 from models.master_model import MasterModel
 from models.repair_model import RepairModel
+from models.equipment_record import EquipmentRecord
+from models.events import ModelEvents
+from service.repair_service import RepairService
+from views.repair_campaign_dialog import RepairCampaignDialog
+from views.treeview_sorter import TreeviewSorter, text_key, date_key
+from views.ui_state import UIState
+from views.treeview_loader import TreeviewLoader
 
 # ※修理情報を登録・編集する画面（別ウィンドウ）を同じviewsフォルダからインポートする想定
 # (既存のファイルを再利用する場合は、配置パスに合わせて書き換えてください)
@@ -25,13 +33,16 @@ class RepairInfoWindow(tk.Toplevel):
         ("備考", "remarks"), ("購入日", "purchase_date"), ("モデル(シリアル)", "model")
     ]
 
-    def __init__(self, parent, equipment_code: str):
+    def __init__(self, parent, equipment_code: str, record: Optional[EquipmentRecord] = None):
         super().__init__(parent)
         self.parent = parent
         self.equipment_code = equipment_code
+        # 呼び出し元の検索結果レコード (古くなっていなければ機器詳細の再検索を省略する)
+        self.record = record
 
         self.title(f"修理履歴管理 - 器材番号: {self.equipment_code}")
         self.geometry("1000x650")
+        UIState.bind_window(self, "repair_window")
         
         # モーダルウィンドウ（この画面を閉じるまでメイン画面を操作できない）にする設定
         self.grab_set()
@@ -42,6 +53,12 @@ class RepairInfoWindow(tk.Toplevel):
         self.load_equipment_detail()
         self.refresh_repair_history()
 
+        # 他画面・他端末での変更を、開いている間だけ受け取る
+        ModelEvents.subscribe("repair", self._on_repair_changed)
+        ModelEvents.subscribe("equipment", self._on_equipment_changed)
+        ModelEvents.subscribe("master", self._on_equipment_changed)
+        self.bind("<Destroy>", self._on_destroy)
+
     def _create_widgets(self):
         """画面ウィジェットの配置"""
         # 1. 機器の基本情報表示エリア (上部)
@@ -75,7 +92,7 @@ class RepairInfoWindow(tk.Toplevel):
         btn_edit = ttk.Button(frame_btns, text="選択した履歴の修正", command=self._open_edit_repair)
         btn_edit.pack(side="left", padx=5)
 
-        btn_refresh = ttk.Button(frame_btns, text="履歴の更新", command=self.refresh_repair_history)
+        btn_refresh = ttk.Button(frame_btns, text="履歴の更新", command=self.reload)
         btn_refresh.pack(side="right", padx=5)
 
         # Treeview（履歴の一覧表）
@@ -92,6 +109,22 @@ class RepairInfoWindow(tk.Toplevel):
             self.repair_tree.heading(col, text=text)
             self.repair_tree.column(col, width=110, anchor="w" if col in ["details", "remarks"] else "center")
 
+        # 見出しクリックで履歴を並べ替える (行データは get_history_by_equipment の1行)
+        self.history_rows = []
+        self.sorter = TreeviewSorter(self.repair_tree, {
+            "status": lambda r: text_key(r[1]),
+            "req_date": lambda r: date_key(r[2]),
+            "comp_date": lambda r: date_key(r[3]),
+            "type": lambda r: text_key(r[4]),
+            "vendor": lambda r: text_key(r[5]),
+            "technician": lambda r: text_key(r[6]),
+            "details": lambda r: text_key(r[7]),
+            "remarks": lambda r: text_key(r[8]),
+        }, self._sortable_rows)
+        self.loader = TreeviewLoader(self.repair_tree)
+        # 列幅・列の並び・並べ替えは前回の状態を復元する（履歴の読み込み時に並べ替えられる）
+        UIState.bind_treeview(self.repair_tree, "repair_window.history", self.sorter)
+
         # スクロールバー
         vsb = ttk.Scrollbar(frame_history, orient="vertical", command=self.repair_tree.yview)
         hsb = ttk.Scrollbar(frame_history, orient="horizontal", command=self.repair_tree.xview)
@@ -104,7 +137,11 @@ class RepairInfoWindow(tk.Toplevel):
     def load_equipment_detail(self):
         """Modelから機器の最新詳細情報を取得し、画面上部のラベルにセットする"""
         # SQLを使わず、辞書形式で整形されたデータを1行で取得
-        detail = RepairModel.get_equipment_detail_by_code(self.equipment_code)
+        # 検索結果のレコードが新しければそれを使い、古ければキャッシュ・DBから取得する
+        if self.record is not None and not self.record.is_stale():
+            detail = self.record.to_detail()
+        else:
+            detail = RepairService.get_equipment_detail(self.equipment_code)
         
         if not detail:
             messagebox.showerror("エラー", "指定された機器の情報が見つかりませんでした。")
@@ -118,27 +155,88 @@ class RepairInfoWindow(tk.Toplevel):
 
     def refresh_repair_history(self):
         """Modelから修理履歴を取得し、Treeviewの表示を最新にする"""
-        # Treeviewの既存データをクリア
-        for item in self.repair_tree.get_children():
-            self.repair_tree.delete(item)
+        self.loader.cancel()
 
         # Modelからマスタ名がLEFT JOIN結合済みの綺麗なレコードリストを取得
-        repairs = RepairModel.get_history_by_equipment(self.equipment_code)
+        # (追加・更新時はキャッシュが破棄されるため、常に最新の内容になる)
+        repairs = RepairService.get_history(self.equipment_code)
+
+        # row: (id, status, request_date, completion_date, repair_type, vendor, technician, details, remarks)
+        # row[0] はレコードのID（非表示）、row[1:] が画面に渡すデータ
+        self.history_rows = [(str(row[0]), row) for row in repairs]
+
+        # 既存の行を削除して少しずつ挿入し、挿入し終えたら並べ替え中であれば同じ並び順を適用する
+        self.loader.load(((iid, row[1:], ()) for iid, row in self.history_rows),
+                         total=len(self.history_rows), on_done=self.sorter.reset)
+
+    def _sortable_rows(self):
+        """並べ替え対象の [(iid, 行), ...] を返す（挿入中であれば残りを先に挿入する）"""
+        self.loader.finish()
+        return self.history_rows
 
-        for row in repairs:
-            # row: (id, status, request_date, completion_date, repair_type, vendor, technician, details, remarks)
-            # row[0] はレコードのID（非表示）、row[1:] が画面に渡すデータ
-            repair_id = row[0]
-            self.repair_tree.insert("", tk.END, iid=str(repair_id), values=row[1:])
+    def _on_repair_changed(self, payload):
+        """この機器の修理履歴が変更された場合、変更された行だけを読み直して一覧に反映する"""
+        codes = ModelEvents.equipment_codes(payload)
+        if codes is not None and str(self.equipment_code) not in codes:
+            return
+        row_ids = payload.get("row_ids")
+        if not row_ids:
+            self.refresh_repair_history()
+            return
+        # 行単位で反映するため、挿入中であれば残りを先に挿入する
+        self.loader.finish()
+
+        rows = {row[0]: row for row in RepairModel.get_history_rows_by_ids(self.equipment_code, row_ids)}
+        positions = {iid: i for i, (iid, _) in enumerate(self.history_rows)}
+        removed = set()
+        for repair_id in row_ids:
+            iid = str(repair_id)
+            row = rows.get(repair_id)
+            if row is None:
+                # 削除された、または別の機器へ付け替えられた
+                if iid in positions:
+                    self.repair_tree.delete(iid)
+                    removed.add(iid)
+            elif iid in positions:
+                self.repair_tree.item(iid, values=row[1:])
+                self.history_rows[positions[iid]] = (iid, row)
+            else:
+                # 新しい履歴は一覧の先頭（依頼日の新しい順）に表示する
+                self.repair_tree.insert("", 0, iid=iid, values=row[1:])
+                self.history_rows.insert(0, (iid, row))
+                positions = {iid: i for i, (iid, _) in enumerate(self.history_rows)}
+        if removed:
+            self.history_rows = [(iid, row) for iid, row in self.history_rows if iid not in removed]
+        self.sorter.rows_changed()
+
+    def _on_equipment_changed(self, payload):
+        """この機器の情報（またはマスタ名称）が変更された場合、上部の機器情報を読み直す"""
+        codes = ModelEvents.equipment_codes(payload)
+        if codes is not None and str(self.equipment_code) not in codes:
+            return
+        self.record = None
+        self.load_equipment_detail()
+
+    def _on_destroy(self, event):
+        # 子ウィジェットの破棄でも呼ばれるため、この画面自体が閉じられたときだけ購読を解除する
+        if event.widget is not self:
+            return
+        ModelEvents.unsubscribe("repair", self._on_repair_changed)
+        ModelEvents.unsubscribe("equipment", self._on_equipment_changed)
+        ModelEvents.unsubscribe("master", self._on_equipment_changed)
+
+    def reload(self):
+        """他端末での更新も反映するため、キャッシュを破棄してDBから読み直す"""
+        RepairService.invalidate(self.equipment_code)
+        self.record = None
+        self.load_equipment_detail()
+        self.refresh_repair_history()
 
     def _open_add_repair(self):
         """新規修理履歴の追加ウィンドウを開く"""
         try:
-            # TODO: 今後 views/edit_repair_window.py を作成した際に連携させます
-            messagebox.showinfo("開発中", f"器材【{self.equipment_code}】の新規修理登録画面を開きます（次のステップで実装）")
-            
-            # 実装後の呼び出しイメージ:
-            # EditRepairWindow(parent=self, equipment_code=self.equipment_code, repair_id=None, callback=self.refresh_repair_history)
+            # 追加した履歴は変更通知 (_on_repair_changed) で一覧に反映される
+            RepairCampaignDialog(self, [self.equipment_code])
         except Exception as e:
             messagebox.showerror("例外発生", f"修理情報追加画面の起動中にエラーが発生しました:\n{e}")
 
@@ -0,0 +1,105 @@
+import time
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence, Tuple
+
+from tkinter import ttk
+
+
+class TreeviewLoader:
+    """
+    Treeview に検索結果などの多数の行を、画面を固めずに少しずつ挿入するヘルパー。
+
+    - 表示中の行は delete(*children) の1回でまとめて削除します。
+    - load() の中で BUDGET_MS 分だけ挿入してから戻るため、先頭の行は次の描画に間に合います。
+      残りは after_idle で、1回あたり BUDGET_MS 以内に収まる件数ずつ挿入します（その間もクリック・スクロールを受け付ける）。
+    - 挿入の途中で load() を呼び直すと、実行中の挿入は打ち切られます（新しい検索が始まった場合など）。
+    - 全行がそろっている必要がある処理（並べ替え・行単位の差分反映）の前には finish() で残りを一度に挿入します。
+    """
+
+    # 1回の挿入処理に使う時間の上限（1フレーム 16ms に収まるようにする）
+    BUDGET_MS = 12
+    # 経過時間を確認する間隔（行数）。毎行 perf_counter を呼ばないため
+    CHECK_EVERY = 50
+
+    def __init__(self, tree: ttk.Treeview, progress: Optional[Callable[[int, Optional[int]], None]] = None):
+        """
+        Args:
+            tree: 対象の Treeview
+            progress: 挿入が進むたびに (挿入済みの行数, 全行数 or None) を受け取る関数
+        """
+        self.tree = tree
+        self.progress = progress
+        self._rows: Optional[Iterator[Tuple[str, Sequence[Any], Tuple[str, ...]]]] = None
+        self._total: Optional[int] = None
+        self._done = 0
+        self._on_done: Optional[Callable[[], None]] = None
+        self._generation = 0
+
+    @property
+    def busy(self) -> bool:
+        """挿入の途中であれば True"""
+        return self._rows is not None
+
+    def load(
+        self,
+        rows: Iterable[Tuple[str, Sequence[Any], Tuple[str, ...]]],
+        total: Optional[int] = None,
+        on_done: Optional[Callable[[], None]] = None
+    ) -> None:
+        """
+        表示中の行を削除し、rows の (iid, values, tags) を順に挿入します。
+        on_done は全行の挿入が終わったときに1回だけ呼ばれます（打ち切られた場合は呼ばれない）。
+        """
+        self.cancel()
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self._rows = iter(rows)
+        self._total = total
+        self._done = 0
+        self._on_done = on_done
+        self._step(self._generation)
+
+    def cancel(self) -> None:
+        """実行中の挿入を打ち切る（挿入済みの行はそのまま残る）"""
+        self._generation += 1
+        self._rows = None
+        self._on_done = None
+
+    def finish(self) -> None:
+        """残りの行をすべてこの場で挿入する"""
+        if self._rows is not None:
+            self._insert(self._rows, budget=None)
+            self._complete()
+
+    def _step(self, generation: int) -> None:
+        if generation != self._generation or self._rows is None:
+            return  # 新しい load() / cancel() で打ち切られた
+        if self._insert(self._rows, budget=self.BUDGET_MS / 1000):
+            if self.progress is not None:
+                self.progress(self._done, self._total)
+            self.tree.after_idle(self._step, generation)
+        else:
+            self._complete()
+
+    def _insert(self, rows: Iterator[Tuple[str, Sequence[Any], Tuple[str, ...]]], budget: Optional[float]) -> bool:
+        """時間の上限まで挿入し、まだ行が残っていれば True を返す"""
+        deadline = time.perf_counter() + budget if budget is not None else None
+        insert = self.tree.insert
+        count = 0
+        for iid, values, tags in rows:
+            insert("", "end", iid=iid, values=values, tags=tags)
+            count += 1
+            if deadline is not None and count % self.CHECK_EVERY == 0 and time.perf_counter() >= deadline:
+                self._done += count
+                return True
+        self._done += count
+        return False
+
+    def _complete(self) -> None:
+        on_done = self._on_done
+        self._rows = None
+        self._on_done = None
+        if self.progress is not None:
+            self.progress(self._done, self._done)
+        if on_done is not None:
+            on_done()
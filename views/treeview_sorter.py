@@ -0,0 +1,227 @@
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from tkinter import ttk
+
+
+# カタカナ -> ひらがな の変換表（五十音順で並べるため読みを揃える）
+_KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(ord("ァ"), ord("ヶ") + 1)}
+_DIGITS = re.compile(r"(\d+)")
+_DATE = re.compile(r"(\d{4})\D(\d{1,2})\D(\d{1,2})")
+
+
+def text_key(value: Any) -> Tuple[int, str]:
+    """
+    日本語の名称用の並べ替えキー。
+    全角/半角の違い (NFKC) とカタカナ/ひらがなの違いを吸収し、空欄は末尾に並べます。
+    """
+    if value is None or value == "":
+        return (1, "")
+    text = unicodedata.normalize("NFKC", str(value)).translate(_KATAKANA_TO_HIRAGANA).casefold()
+    return (0, text)
+
+
+def code_key(value: Any) -> Tuple[Any, ...]:
+    """
+    器材番号・型番用の並べ替えキー。
+    数字部分を数値として比較するため "M-2" < "M-10"、"01002" < "1003" のように並びます。
+    """
+    if value is None or value == "":
+        return ((2, ""),)
+    parts = _DIGITS.split(unicodedata.normalize("NFKC", str(value)))
+    return tuple((0, int(p)) if p.isdigit() else (1, p.casefold()) for p in parts if p)
+
+
+def date_key(value: Any) -> Tuple[int, int, int, int]:
+    """'YYYY-MM-DD' / 'YYYY/MM/DD' などの日付用の並べ替えキー（空欄・不正値は末尾）"""
+    match = _DATE.search(str(value or ""))
+    if not match:
+        return (1, 0, 0, 0)
+    year, month, day = (int(g) for g in match.groups())
+    return (0, year, month, day)
+
+
+class TreeviewSorter:
+    """
+    Treeview の列見出しクリックで、保持済みのデータを再検索せずに並べ替えるヘルパー。
+
+    - 列ごとの並べ替えキーは初回クリック時に1度だけ計算し、データが変わるまで使い回します。
+    - 見出しクリックで昇順/降順を切り替え、Shift+クリックで第2キー以降を追加します（安定ソート）。
+    - 件数が多い場合はキー計算と並べ替えをワーカースレッドで行い、画面を固めません。
+    - 並べ替え後は、まず画面に見えている行だけを移動し、残りは after_idle で少しずつ移動します。
+    """
+
+    # この件数を超えるとワーカースレッドで並べ替える
+    LARGE_RESULT_THRESHOLD = 5000
+    # 見えている範囲の後に、1回のアイドル処理で移動する行数
+    CHUNK_SIZE = 500
+
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="treeview-sort")
+
+    def __init__(
+        self,
+        tree: ttk.Treeview,
+        key_funcs: Dict[str, Callable[[Any], Any]],
+        rows_provider: Callable[[], Sequence[Tuple[str, Any]]]
+    ):
+        """
+        Args:
+            tree: 対象の Treeview
+            key_funcs: 列ID -> (行データ -> 並べ替えキー) の関数
+            rows_provider: 現在表示中の [(iid, 行データ), ...] を返す関数
+        """
+        self.tree = tree
+        self.key_funcs = key_funcs
+        self.rows_provider = rows_provider
+        # [(列ID, 降順かどうか), ...] 先頭が第1キー
+        self.sort_spec: List[Tuple[str, bool]] = []
+        self._headings = {col: tree.heading(col, "text") for col in key_funcs}
+        self._key_cache: Dict[str, List[Any]] = {}
+        self._order: Optional[List[str]] = None
+        self._generation = 0
+        self._shift_pressed = False
+        # 見出しクリックで並べ替えの条件が変わったときに呼ぶ関数（画面状態の保存用）
+        self.on_sort_changed: Optional[Callable[[], None]] = None
+
+        for col in key_funcs:
+            tree.heading(col, command=lambda c=col: self.on_heading_click(c))
+        # 見出しの command にはキー修飾の情報が渡らないため、押下時に Shift の状態を記録する
+        tree.bind("<ButtonPress-1>", self._remember_modifier, add="+")
+
+    def _remember_modifier(self, event) -> None:
+        self._shift_pressed = bool(event.state & 0x0001)
+
+    def reset(self) -> None:
+        """表示データが入れ替わったときに呼び出し、キャッシュを破棄して現在の並び順を再適用します"""
+        self._generation += 1
+        # ワーカースレッドが古い辞書へ書き込んでも影響しないよう、辞書ごと差し替える
+        self._key_cache = {}
+        self._order = None
+        if self.sort_spec:
+            self.apply()
+
+    def rows_changed(self) -> None:
+        """
+        表示中の一部の行だけが追加・更新・削除されたときに呼び出します。
+        全体は並べ直さず（追加行は末尾のまま）、キャッシュと出力用の並びだけを現在の表示に合わせます。
+        """
+        sorting = self.sort_spec and self._order is None
+        self._generation += 1
+        self._key_cache = {}
+        if sorting:
+            # 並べ替えの計算中だった場合は、変更後の行でやり直す
+            self.apply()
+        elif self.sort_spec:
+            self._order = list(self.tree.get_children())
+
+    def current_order(self) -> Optional[List[str]]:
+        """並べ替え済みの iid の並び（未ソートなら None）"""
+        return self._order
+
+    def set_sort(self, spec: List[Tuple[str, bool]]) -> None:
+        """並べ替えの条件を設定し見出しに表示する（並べ替えは次の reset で行う。保存した画面状態の復元用）"""
+        self.sort_spec = [(col, desc) for col, desc in spec if col in self.key_funcs]
+        self._update_headings()
+
+    def on_heading_click(self, column: str) -> None:
+        """見出しクリック: 同じ列なら昇順/降順を反転、Shift 付きなら並べ替えキーを追加"""
+        spec = dict(self.sort_spec)
+        if self._shift_pressed and self.sort_spec:
+            if column in spec:
+                self.sort_spec = [(c, (not d) if c == column else d) for c, d in self.sort_spec]
+            else:
+                self.sort_spec.append((column, False))
+        else:
+            descending = not spec[column] if self.sort_spec and self.sort_spec[0][0] == column else False
+            self.sort_spec = [(column, descending)]
+        self._shift_pressed = False
+        self._update_headings()
+        self.apply()
+        if self.on_sort_changed is not None:
+            self.on_sort_changed()
+
+    def _update_headings(self) -> None:
+        """見出しに並べ替え方向（複数キーの場合は優先順位も）を表示する"""
+        spec = {col: (i, desc) for i, (col, desc) in enumerate(self.sort_spec)}
+        for col, text in self._headings.items():
+            if col in spec:
+                priority, desc = spec[col]
+                mark = "▼" if desc else "▲"
+                suffix = f" {mark}{priority + 1}" if len(self.sort_spec) > 1 else f" {mark}"
+                self.tree.heading(col, text=text + suffix)
+            else:
+                self.tree.heading(col, text=text)
+
+    def _compute_order(
+        self,
+        rows: Sequence[Tuple[str, Any]],
+        spec: List[Tuple[str, bool]],
+        key_cache: Dict[str, List[Any]]
+    ) -> List[str]:
+        """並べ替えキーを（未計算の列だけ）求め、安定ソートで iid の並びを返す"""
+        for col, _ in spec:
+            if col not in key_cache:
+                key_func = self.key_funcs[col]
+                key_cache[col] = [key_func(row) for _, row in rows]
+        indexes = list(range(len(rows)))
+        # 優先度の低いキーから順に安定ソートすると、複数列での並べ替えになる
+        for col, descending in reversed(spec):
+            indexes.sort(key=key_cache[col].__getitem__, reverse=descending)
+        return [rows[i][0] for i in indexes]
+
+    def apply(self) -> None:
+        """現在の並べ替え条件で表示を並べ替える"""
+        if not self.sort_spec:
+            return
+        rows = self.rows_provider()
+        spec = list(self.sort_spec)
+        generation = self._generation = self._generation + 1
+
+        if len(rows) <= self.LARGE_RESULT_THRESHOLD:
+            self._show_order(self._compute_order(rows, spec, self._key_cache), generation)
+            return
+
+        self.tree.configure(cursor="watch")
+        future = self._executor.submit(self._compute_order, rows, spec, self._key_cache)
+
+        def poll():
+            if generation != self._generation:
+                self.tree.configure(cursor="")
+                return  # 新しい並べ替え・検索が始まったので破棄
+            if not future.done():
+                self.tree.after(20, poll)
+                return
+            self.tree.configure(cursor="")
+            try:
+                self._show_order(future.result(), generation)
+            except Exception as e:
+                print(f"[-] 並べ替えエラー: {e}")
+
+        self.tree.after(20, poll)
+
+    def _visible_row_count(self) -> int:
+        """画面に表示できるおおよその行数"""
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        return max(self.tree.winfo_height() // row_height + 1, 1)
+
+    def _show_order(self, order: List[str], generation: int) -> None:
+        """先頭（見えている範囲）の行を即座に移動し、残りは after_idle で分割して移動する"""
+        self._order = order
+        self.tree.yview_moveto(0)
+        visible = self._visible_row_count()
+        for index, iid in enumerate(order[:visible]):
+            self.tree.move(iid, "", index)
+
+        def move_chunk(start: int):
+            if generation != self._generation:
+                return
+            end = min(start + self.CHUNK_SIZE, len(order))
+            for index in range(start, end):
+                self.tree.move(order[index], "", index)
+            if end < len(order):
+                self.tree.after_idle(move_chunk, end)
+
+        if visible < len(order):
+            self.tree.after_idle(move_chunk, visible)
@@ -0,0 +1,255 @@
+import json
+import os
+import re
+import threading
+import tkinter as tk
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from tkinter import ttk
+
+from models.db_manager import DBManager
+
+
+class UIState:
+    """
+    画面の状態（列幅・列の並び・並べ替え・ウィンドウの位置と大きさ・最後の検索条件）を、端末ごとの JSON ファイルに保存・復元するクラス。
+
+    - preload() で起動直後にファイルの読み込みを別スレッドで始め、最初に値が必要になったとき（画面の生成中）に1度だけ結果を受け取ります。
+      画面の生成は mainloop より前のため、復元した状態は最初の描画の前に反映されます。
+    - set() で値が変わるたびに保存を予約し、SAVE_DELAY_MS 操作が止まってから別スレッドでまとめて書き込みます
+      （列幅のドラッグ中やウィンドウの移動中に何度も書き込まない）。書き込みは一時ファイルからの置き換えで行います。
+    - 終了時は flush() で未保存の変更をすぐに書き込みます。
+
+    保存内容は画面ごとの区画 (section) に分けた辞書です。例:
+        {"main_window": {"geometry": "1400x750+10+10", "columns": {"widths": {...}, "order": [...], "sort": [["code", false]]}}}
+
+    config.json の設定例:
+        "ui_state": {"path": "ui_state.json", "save_delay_ms": 1000}
+    """
+
+    _settings: Dict[str, Any] = DBManager._config.get("ui_state", {})
+    PATH: str = _settings.get("path", "ui_state.json")
+    SAVE_DELAY_MS: int = _settings.get("save_delay_ms", 1000)
+
+    # ui_state.json が無い場合に列幅の初期値として読み込む旧画面の設定ファイル（見出し名 -> 幅）
+    LEGACY_WIDTHS_PATH = "column_widths.json"
+
+    _state: Dict[str, Dict[str, Any]] = {}
+    _legacy_widths: Dict[str, int] = {}
+    _loaded = False
+    _future: Optional[Future] = None
+    _lock = threading.Lock()
+    _timer: Optional[threading.Timer] = None
+    _dirty = False
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ui-state")
+
+    # ========= 読み込み =========
+    @classmethod
+    def preload(cls) -> None:
+        """ファイルの読み込みをバックグラウンドで開始する（起動処理の最初に呼ぶ）"""
+        if cls._future is None and not cls._loaded:
+            cls._future = cls._executor.submit(cls._read)
+
+    @classmethod
+    def _read(cls) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, int]]:
+        """(保存されている状態, 旧画面の列幅) を返す"""
+        try:
+            with open(cls.PATH, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            return (state if isinstance(state, dict) else {}), {}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"[-] 画面状態ファイルの読み込みエラー ({cls.PATH}): {e}")
+            return {}, {}
+        try:
+            with open(cls.LEGACY_WIDTHS_PATH, "r", encoding="utf-8") as f:
+                return {}, json.load(f)
+        except (OSError, ValueError):
+            return {}, {}
+
+    @classmethod
+    def _ensure_loaded(cls) -> None:
+        if cls._loaded:
+            return
+        cls.preload()
+        state, legacy_widths = cls._future.result()
+        with cls._lock:
+            if not cls._loaded:
+                cls._state, cls._legacy_widths = state, legacy_widths
+                cls._loaded = True
+
+    @classmethod
+    def get(cls, section: str, key: str, default: Any = None) -> Any:
+        cls._ensure_loaded()
+        with cls._lock:
+            return cls._state.get(section, {}).get(key, default)
+
+    # ========= 保存 =========
+    @classmethod
+    def set(cls, section: str, key: str, value: Any) -> None:
+        """値を更新し、SAVE_DELAY_MS 後の保存を予約する（値が変わらなければ何もしない）"""
+        cls._ensure_loaded()
+        with cls._lock:
+            values = cls._state.setdefault(section, {})
+            if values.get(key) == value:
+                return
+            values[key] = value
+            cls._dirty = True
+            if cls._timer is not None:
+                cls._timer.cancel()
+            cls._timer = threading.Timer(cls.SAVE_DELAY_MS / 1000, cls._save_async)
+            cls._timer.daemon = True
+            cls._timer.start()
+
+    @classmethod
+    def _snapshot(cls) -> Optional[str]:
+        """未保存の変更があれば、保存する JSON 文字列を返す"""
+        with cls._lock:
+            if not cls._dirty:
+                return None
+            cls._dirty = False
+            cls._timer = None
+            return json.dumps(cls._state, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def _save_async(cls) -> None:
+        text = cls._snapshot()
+        if text is not None:
+            cls._executor.submit(cls._write, text)
+
+    @classmethod
+    def _write(cls, text: str) -> None:
+        tmp_path = f"{cls.PATH}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, cls.PATH)
+        except OSError as e:
+            print(f"[-] 画面状態ファイルの保存エラー ({cls.PATH}): {e}")
+
+    @classmethod
+    def flush(cls) -> None:
+        """予約中の保存を取り消し、未保存の変更をすぐに書き込む（終了時に呼ぶ）"""
+        with cls._lock:
+            if cls._timer is not None:
+                cls._timer.cancel()
+        text = cls._snapshot()
+        if text is not None:
+            # 書き込み中の保存があれば、その後に書く
+            cls._executor.submit(cls._write, text).result()
+
+    # ========= 画面への反映 =========
+    @classmethod
+    def bind_window(cls, window: tk.Wm, section: str) -> None:
+        """保存されている位置・大きさをウィンドウに反映し、以後の変更を記録する"""
+        geometry = cls.get(section, "geometry")
+        if geometry:
+            window.geometry(cls._fit_to_screen(window, geometry))
+        if cls.get(section, "zoomed"):
+            try:
+                window.state("zoomed")
+            except tk.TclError:
+                pass  # zoomed が使えない環境（X11 など）
+
+        def on_configure(event):
+            if event.widget is not window:
+                return
+            zoomed = window.state() == "zoomed"
+            cls.set(section, "zoomed", zoomed)
+            if not zoomed and window.state() == "normal":
+                cls.set(section, "geometry", window.wm_geometry())
+
+        window.bind("<Configure>", on_configure, add="+")
+
+    @staticmethod
+    def _fit_to_screen(window: tk.Wm, geometry: str) -> str:
+        """前回と画面構成が変わって位置が画面外になる場合は、大きさだけを復元する"""
+        match = re.fullmatch(r"(\d+)x(\d+)\+(-?\d+)\+(-?\d+)", geometry)
+        if not match:
+            return geometry
+        width, height, x, y = (int(g) for g in match.groups())
+        if 0 <= x < window.winfo_screenwidth() - 50 and 0 <= y < window.winfo_screenheight() - 50:
+            return geometry
+        return f"{width}x{height}"
+
+    @classmethod
+    def bind_treeview(cls, tree: ttk.Treeview, section: str, sorter=None,
+                      legacy_names: Optional[Dict[str, str]] = None) -> None:
+        """
+        保存されている列幅・列の並び（表示する列）・並べ替えを Treeview に反映し、以後の変更を記録します。
+        見出しを右クリックすると、列の移動・非表示のメニューを表示します。
+            sorter: TreeviewSorter（指定すると並べ替えの条件も保存・復元する）
+            legacy_names: 列ID -> 旧画面の column_widths.json の見出し名（ui_state.json が無い場合の初期値）
+        """
+        columns = list(tree["columns"])
+        saved = cls.get(section, "columns") or {}
+        widths = dict(saved.get("widths") or {})
+        if not widths and legacy_names:
+            widths = {col: cls._legacy_widths[name] for col, name in legacy_names.items() if name in cls._legacy_widths}
+        for col, width in widths.items():
+            if col in columns:
+                tree.column(col, width=int(width))
+        order = [col for col in saved.get("order") or [] if col in columns]
+        if order:
+            tree["displaycolumns"] = order
+        if sorter is not None:
+            spec = [(col, bool(desc)) for col, desc in saved.get("sort") or [] if col in sorter.key_funcs]
+            if spec:
+                sorter.set_sort(spec)
+
+        def record(*_):
+            # 画面側で列を作り直す場合（状態マスタの変更など）があるため、記録する時点の列を読む
+            current = list(tree["columns"])
+            display = list(tree["displaycolumns"])
+            cls.set(section, "columns", {
+                "widths": {col: tree.column(col, "width") for col in current},
+                "order": [] if display in (["#all"], current) else display,
+                "sort": [list(item) for item in sorter.sort_spec] if sorter is not None else [],
+            })
+
+        # 列幅は見出しの境界をドラッグして離したときに変わる
+        tree.bind("<ButtonRelease-1>", record, add="+")
+        if sorter is not None:
+            sorter.on_sort_changed = record
+        tree.bind("<Button-3>", lambda e: cls._column_menu(tree, e, record), add="+")
+
+    @staticmethod
+    def _column_menu(tree: ttk.Treeview, event, on_change) -> None:
+        """見出しの右クリックメニュー（列の移動・非表示・すべて表示）"""
+        if tree.identify_region(event.x, event.y) != "heading":
+            return
+        columns = list(tree["columns"])
+        display: List[str] = list(tree["displaycolumns"])
+        if display == ["#all"]:
+            display = columns
+        index = int(tree.identify_column(event.x)[1:]) - 1
+        if not 0 <= index < len(display):
+            return
+
+        def move(offset):
+            order = list(display)
+            target = index + offset
+            if 0 <= target < len(order):
+                order[index], order[target] = order[target], order[index]
+                tree["displaycolumns"] = order
+                on_change()
+
+        def hide():
+            if len(display) > 1:
+                tree["displaycolumns"] = [col for i, col in enumerate(display) if i != index]
+                on_change()
+
+        def show_all():
+            tree["displaycolumns"] = display + [col for col in columns if col not in display]
+            on_change()
+
+        menu = tk.Menu(tree, tearoff=0)
+        menu.add_command(label="左へ移動", command=lambda: move(-1), state="normal" if index > 0 else "disabled")
+        menu.add_command(label="右へ移動", command=lambda: move(1),
+                         state="normal" if index < len(display) - 1 else "disabled")
+        menu.add_command(label="この列を隠す", command=hide, state="normal" if len(display) > 1 else "disabled")
+        menu.add_command(label="すべての列を表示", command=show_all,
+                         state="normal" if len(display) < len(columns) else "disabled")
+        menu.tk_popup(event.x_root, event.y_root)